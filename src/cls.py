@@ -3,15 +3,15 @@ import sys
 import csv
 import glob
 import time
-import motif
 import random
 import argparse
 import multiprocessing as mp
+import multiprocessing.pool
 
 from libs import *
 
 class Workers(object):
-	def __init__(self, cpus):
+	def __init__(self, cpus, threads=False):
 		#CPU counts specified by user
 		self.cpus = cpus
 		
@@ -24,7 +24,11 @@ class Workers(object):
 		if self.cpus > mp.cpu_count():
 			self.cpus = mp.cpu_count()
 
-		self.pool = mp.Pool(self.cpus)
+		#threads share sequence memory, the scanners release GIL
+		if threads:
+			self.pool = mp.pool.ThreadPool(self.cpus)
+		else:
+			self.pool = mp.Pool(self.cpus)
 
 	def add_task(self, job, args):
 		self.pool.apply_async(
@@ -37,8 +41,8 @@ class Workers(object):
 
 	def success(self, res):
 		self.tasks -= 1
-		if res:
-			self.results[res[0][0]] = res
+		name, index, hits = res
+		self.results.setdefault(name, {})[index] = hits
 
 	def failure(self, error):
 		print(error)
@@ -75,10 +79,17 @@ def save_result(fw, outfmt, rows, ssr_type='SSR'):
 		write_line(row)
 
 
-def search_ssr(name, seq, repeats, level):
-	motifs = motif.StandardMotif(level)
-	ssrs = tandem.search_ssr(seq, repeats)
-	return [[name, motifs.standard(ssr[0])] + list(ssr) for ssr in ssrs]
+def search_window(name, index, func, seq, offset, args, options):
+	return name, index, window.scan_window(func, seq, offset, args, options)
+
+def search_region(name, index, func, seq, start, stop, args, options):
+	return name, index, window.scan_region(func, seq, start, stop, args, options)
+
+def format_ssr(name, ssrs, level):
+	#motifs are standardized by scanner if level is not 0
+	if level:
+		return [[name] + list(ssr) for ssr in ssrs]
+	return [[name, ssr[0]] + list(ssr) for ssr in ssrs]
 
 def concatenate_cssr(seqname, cssrs):
 	start = cssrs[0][3]
@@ -90,9 +101,11 @@ def concatenate_cssr(seqname, cssrs):
 	structure = "-".join(["(%s)%s" % (cssr[0], cssr[2]) for cssr in cssrs])
 	return (seqname, start, end, motif, complexity, length, gap, structure)
 
-def search_cssr(name, seq, repeats, dmax):
-	ssrs = tandem.search_ssr(seq, repeats)
+def format_cssr(name, ssrs, dmax):
 	res = []
+	if not ssrs:
+		return res
+
 	cssrs = [ssrs[0]]
 	for ssr in ssrs[1:]:
 		d = ssr[3] - cssrs[-1][4] - 1
@@ -110,24 +123,34 @@ def search_cssr(name, seq, repeats, dmax):
 
 	return res
 
-def search_issr(name, seq, level, min_srep, min_slen, max_edits, mis_penalty, gap_penalty, min_score):
-	motifs = motif.StandardMotif(level)
-	issrs = tandem.search_issr(seq, min_srep, min_slen, max_edits, mis_penalty, gap_penalty, min_score, 500)
-	return [[name, motifs.standard(ssr[0])] + list(ssr) for ssr in issrs]
+def format_issr(name, issrs, level):
+	if level:
+		return [[name] + list(ssr) for ssr in issrs]
+	return [[name, ssr[0]] + list(ssr) for ssr in issrs]
 
-def search_vntr(name, seq, min_mlen, max_mlen, min_rep):
-	vntrs = tandem.search_vntr(seq, min_mlen, max_mlen, min_rep)
+def format_vntr(name, vntrs):
+	#standard motif is the first field
 	return [[name] + list(vntr) for vntr in vntrs]
 
 class Jobs(object):
 	def __init__(self, args):
 		self.args = args
 
-		#open fasta file
-		self.seqs = fasta.GzipFasta(args.infile)
+		#open fasta file, only target regions are read if provided
+		if args.regions:
+			features = args.features.split(',') if args.features else None
+			self.seqs = region.RegionFasta(args.infile, region.read_regions(args.regions, features))
+		else:
+			self.seqs = fasta.GzipFasta(args.infile)
+
+		#split long sequence into windows
+		self.windows = self.get_windows()
+		self.regions = {}
+		self.masked = 0
+		self.jobs = self.iter_jobs()
 
-		#create multiple process pool
-		self.pool = Workers(self.args.cpus)
+		#create multiple process pool, only results are kept in native mode
+		self.pool = Workers(self.args.cpus, self.args.threads or self.args.native)
 
 		#start process job
 		self.run_jobs()
@@ -146,8 +169,42 @@ class Jobs(object):
 	def __setstate__(self, state):
 		self.__dict__.update(state)
 
+	def iter_jobs(self):
+		for name, seq in self.seqs:
+			regions = self.windows.split(len(seq), self.args.cpus)
+			self.regions[name] = regions
+
+			if self.args.mask == 'skip':
+				self.masked += tandem.count_masked(seq)
+
+			for index, (_, start, stop) in enumerate(regions):
+				#threads share the whole sequence without copy
+				if self.args.threads:
+					yield (name, index, self.windows.func, seq, start, stop, self.windows.args, self.windows.options)
+				else:
+					yield (name, index, self.windows.func, seq[start:stop], start, self.windows.args, self.windows.options)
+
+	def run_native(self):
+		#sequences are scanned in groups on the native thread pool
+		for group in window.batch_groups(self.seqs):
+			for (name, seq), hits in zip(group, self.windows.batch(group, self.args.cpus)):
+				if self.args.mask == 'skip':
+					self.masked += tandem.count_masked(seq)
+
+				self.regions[name] = [(0, 0, len(seq))]
+				self.pool.results[name] = {0: hits}
+
 	def run_jobs(self):
-		target = self.get_func()
+		if self.args.native:
+			self.run_native()
+			self.pool.release()
+			self.save_result()
+			return
+
+		if self.args.threads:
+			target = search_region
+		else:
+			target = search_window
 		while 1:
 			if not self.pool.full():
 				job = self.get_job()
@@ -181,7 +238,21 @@ class Jobs(object):
 
 		for k in self.seqs.keys():
 			if k in self.pool.results:
-				for row in self.pool.results[k]:
+				regions = self.regions[k]
+				parts = [self.pool.results[k][i] for i in range(len(regions))]
+
+				#merge the hits of windows, sequence is only read for long one
+				if len(parts) > 1:
+					hits = self.windows.stitch(self.seqs[k], regions, parts)
+				else:
+					hits = parts[0]
+
+				#hits of region are mapped back to the whole sequence
+				name = k
+				if self.args.regions:
+					name, hits = region.locate(k, hits)
+
+				for row in self.format_rows(name, hits):
 					write_line(row)
 
 		if self.args.outfile == 'stdout':
@@ -189,10 +260,19 @@ class Jobs(object):
 		else:
 			fw.close()
 
-	def get_func(self):
+		if self.args.mask == 'skip':
+			sys.stderr.write("{} soft-masked bases were skipped\n".format(self.masked))
+
+	def get_windows(self):
 		pass
 
 	def get_job(self):
+		try:
+			return next(self.jobs)
+		except StopIteration:
+			return None
+
+	def format_rows(self, name, hits):
 		pass
 
 	def format_gff(self, row):
@@ -202,16 +282,11 @@ class SSRSearchJob(Jobs):
 	def __init__(self, args):
 		super(SSRSearchJob, self).__init__(args)
 
-	def get_func(self):
-		return search_ssr
+	def get_windows(self):
+		return window.ssr_windows(self.args.repeats, self.args.mask, self.args.level)
 
-	def get_job(self):
-		try:
-			name, seq = next(self.seqs)
-		except StopIteration:
-			return None
-		
-		return (name, seq, self.args.repeats, self.args.level)
+	def format_rows(self, name, hits):
+		return format_ssr(name, hits, self.args.level)
 
 	def format_gff(self, row):
 		types = {1:'Mono', 2:'Di', 3:'Tri', 4:'Tetra', 5:'Penta', 6:'Hexa'}
@@ -225,16 +300,11 @@ class CSSRSearchJob(Jobs):
 	def __init__(self, args):
 		super(CSSRSearchJob, self).__init__(args)
 
-	def get_func(self):
-		return search_cssr
+	def get_windows(self):
+		return window.ssr_windows(self.args.repeats, self.args.mask)
 
-	def get_job(self):
-		try:
-			name, seq = next(self.seqs)
-		except StopIteration:
-			return None
-		
-		return (name, seq, self.args.repeats, self.args.dmax)
+	def format_rows(self, name, hits):
+		return format_cssr(name, list(hits), self.args.dmax)
 
 	def format_gff(self, row):
 		self.row_num += 1
@@ -247,23 +317,21 @@ class ISSRSearchJob(Jobs):
 	def __init__(self, args):
 		super(ISSRSearchJob, self).__init__(args)
 
-	def get_func(self):
-		return search_issr
+	def get_windows(self):
+		return window.issr_windows(self.args.min_seed_repeats, self.args.min_seed_length,
+			self.args.max_consecutive_edits, self.args.mis_penalty, self.args.gap_penalty,
+			self.args.min_required_score, 500, self.args.mask, self.args.level, self.args.cigar)
 
-	def get_job(self):
-		try:
-			name, seq = next(self.seqs)
-		except StopIteration:
-			return None
-		
-		return (name, seq, self.args.level, self.args.min_seed_repeats, self.args.min_seed_length, 
-			self.args.max_consecutive_edits, self.args.mis_penalty, self.args.gap_penalty, self.args.min_required_score)
+	def format_rows(self, name, hits):
+		return format_issr(name, hits, self.args.level)
 
 	def format_gff(self, row):
 		types = {1:'Mono', 2:'Di', 3:'Tri', 4:'Tetra', 5:'Penta', 6:'Hexa'}
 		self.row_num += 1
 		attrs = 'ID={};Motif={};Standard={};Type={};Length={};Match={};Subsitution={};Insertion={};Deletion={};Score={}'.format(
 			self.row_num, row[2], row[1], types[row[3]], row[4], row[6], row[7], row[8], row[9], row[10], row[11])
+		if self.args.cigar:
+			attrs += ';Cigar={}'.format(row[12])
 		fields = [row[0], 'Krait', self.args.ssr_type.upper(), row[4], row[5], '.', '.', '.', attrs]
 		return fields
 
@@ -271,22 +339,18 @@ class VNTRSearchJob(Jobs):
 	def __init__(self, args):
 		super(VNTRSearchJob, self).__init__(args)
 
-	def get_func(self):
-		return search_vntr
+	def get_windows(self):
+		return window.vntr_windows(self.args.min_motif_length, self.args.max_motif_length, self.args.min_repeats, self.args.mask,
+			compact=not self.args.keep_all)
 
-	def get_job(self):
-		try:
-			name, seq = next(self.seqs)
-		except StopIteration:
-			return None
-		
-		return (name, seq, self.args.min_motif_length, self.args.max_motif_length, self.args.min_repeats)
+	def format_rows(self, name, hits):
+		return format_vntr(name, hits)
 
 	def format_gff(self, row):
 		self.row_num += 1
-		attrs = 'ID={};Motif={};Type={};Repeat={};Length={}'.format(
-			self.row_num, row[1], row[2], row[3], row[6])
-		fields = [row[0], 'Krait', self.args.ssr_type.upper(), row[4], row[5], '.', '.', '.', attrs]
+		attrs = 'ID={};Motif={};Standard={};Type={};Repeat={};Length={}'.format(
+			self.row_num, row[2], row[1], row[3], row[4], row[7])
+		fields = [row[0], 'Krait', self.args.ssr_type.upper(), row[5], row[6], '.', '.', '.', attrs]
 		return fields
 
 def search_tandem(args):
@@ -399,6 +463,33 @@ Cite:
 		metavar = '',
 		help = 'number of threads'
 	)
+	parser_search.add_argument('--threads',
+		dest = 'threads',
+		action = 'store_true',
+		help = 'run in threads sharing sequence memory instead of processes'
+	)
+	parser_search.add_argument('--native',
+		dest = 'native',
+		action = 'store_true',
+		help = 'run in the native thread pool of tandem module without python scheduling'
+	)
+	parser_search.add_argument('--mask',
+		dest = 'mask',
+		default = 'none',
+		choices = window.MASK_MODES,
+		metavar = '',
+		help = 'soft-masked lowercase bases are kept, scanned as uppercase or skipped [none, upper, skip]'
+	)
+	parser_search.add_argument('--regions',
+		dest = 'regions',
+		metavar = 'bed',
+		help = 'only search target regions in BED, GFF or GTF file'
+	)
+	parser_search.add_argument('--features',
+		dest = 'features',
+		metavar = '',
+		help = 'comma separated feature types of target regions in GFF or GTF file, e.g. exon,CDS'
+	)
 	parser_search.add_argument('-l', '--level',
 		dest = 'level',
 		default = 3,
@@ -469,6 +560,11 @@ Cite:
 		type = int,
 		help = "minimum required score"
 	)
+	issr_group.add_argument('--cigar',
+		dest = 'cigar',
+		action = 'store_true',
+		help = "output the alignment of each iSSR to perfect repeat as CIGAR"
+	)
 
 	vntr_group = parser_search.add_argument_group('VNTR', 'VNTR search parameter')
 	vntr_group.add_argument('--min-motif-len',
@@ -492,6 +588,11 @@ Cite:
 		type = int,
 		help = "minimum repeats"
 	)
+	vntr_group.add_argument('--keep-all',
+		dest = 'keep_all',
+		action = 'store_true',
+		help = "keep the first found calls instead of the primitive motif covering the most bases"
+	)
 
 	#extract flanking sequence parameters
 	parser_flank = subparsers.add_parser('flank',
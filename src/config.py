@@ -27,11 +27,16 @@ TEMPLATE_DIR = os.path.join(ROOT_PATH, 'template/')
 
 #create tables in database
 CREATE_TABLES_SQL = """
-CREATE TABLE IF NOT EXISTS `ssr`(
+CREATE TABLE IF NOT EXISTS `motif`(
+	id INTEGER PRIMARY KEY,
+	motif TEXT UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS `ssr_data`(
 	id INTEGER PRIMARY KEY,
 	sequence TEXT,
-	standard TEXT,
-	motif TEXT,
+	standard INTEGER,
+	motif INTEGER,
 	type INTEGER,
 	repeat INTEGER,
 	start INTEGER,
@@ -54,6 +59,7 @@ CREATE TABLE IF NOT EXISTS `cssr`(
 CREATE TABLE IF NOT EXISTS `vntr`(
 	id INTEGER PRIMARY KEY,
 	sequence TEXT,
+	standard TEXT,
 	motif TEXT,
 	type INTEGER,
 	repeat INTEGER,
@@ -62,11 +68,11 @@ CREATE TABLE IF NOT EXISTS `vntr`(
 	length INTEGER
 );
 
-CREATE TABLE IF NOT EXISTS `issr`(
+CREATE TABLE IF NOT EXISTS `issr_data`(
 	id INTEGER PRIMARY KEY,
 	sequence TEXT,
-	standard TEXT,
-	motif TEXT,
+	standard INTEGER,
+	motif INTEGER,
 	type INTEGER,
 	start INTEGER,
 	end INTEGER,
@@ -75,7 +81,25 @@ CREATE TABLE IF NOT EXISTS `issr`(
 	subsitution INTEGER,
 	insertion INTEGER,
 	deletion INTEGER,
-	score INTEGER
+	score INTEGER,
+	cigar TEXT
+);
+
+CREATE TABLE IF NOT EXISTS `issr_seed`(
+	id INTEGER PRIMARY KEY,
+	sequence TEXT,
+	motif INTEGER,
+	type INTEGER,
+	position INTEGER,
+	seed INTEGER,
+	start INTEGER,
+	end INTEGER,
+	match INTEGER,
+	subsitution INTEGER,
+	insertion INTEGER,
+	deletion INTEGER,
+	hit INTEGER,
+	cigar TEXT
 );
 
 CREATE TABLE IF NOT EXISTS `fasta`(
@@ -147,6 +171,88 @@ CREATE TABLE IF NOT EXISTS `option`(
 
 """
 
+#pairs of adjacent perfect ssrs in the same sequence with distance not
+#more than the only binding, as the fields (id, sequence, motif, repeat,
+#start, end, length) of the ssr followed by the same fields of the next
+#one except sequence, next id is the id of the next ssr, a.id+1 when ids
+#have no gaps
+CSSR_LINKS_SQL = """
+SELECT a.id, a.sequence, x.motif, a.repeat, a.start, a.end, a.length,
+	b.id, y.motif, b.repeat, b.start, b.end, b.length
+FROM ssr_data AS a
+JOIN ssr_data AS b ON b.id={next_id}
+JOIN motif AS x ON x.id=a.motif
+JOIN motif AS y ON y.id=b.motif
+WHERE b.sequence=a.sequence AND b.start-a.end-1<=?
+ORDER BY a.id;
+"""
+
+#motif and standard of ssr and issr are stored as ids in motif table,
+#the views keep the text columns for displaying and exporting
+CREATE_VIEWS_SQL = """
+CREATE VIEW IF NOT EXISTS `ssr` AS SELECT
+	s.id AS id,
+	s.sequence AS sequence,
+	a.motif AS standard,
+	b.motif AS motif,
+	s.type AS type,
+	s.repeat AS repeat,
+	s.start AS start,
+	s.end AS end,
+	s.length AS length
+FROM ssr_data AS s
+JOIN motif AS a ON a.id=s.standard
+JOIN motif AS b ON b.id=s.motif;
+
+CREATE TRIGGER IF NOT EXISTS `ssr_insert` INSTEAD OF INSERT ON `ssr`
+BEGIN
+	INSERT OR IGNORE INTO motif (motif) VALUES (NEW.standard), (NEW.motif);
+	INSERT INTO ssr_data VALUES (NEW.id, NEW.sequence,
+		(SELECT id FROM motif WHERE motif=NEW.standard),
+		(SELECT id FROM motif WHERE motif=NEW.motif),
+		NEW.type, NEW.repeat, NEW.start, NEW.end, NEW.length);
+END;
+
+CREATE TRIGGER IF NOT EXISTS `ssr_delete` INSTEAD OF DELETE ON `ssr`
+BEGIN
+	DELETE FROM ssr_data WHERE id=OLD.id;
+END;
+
+CREATE VIEW IF NOT EXISTS `issr` AS SELECT
+	s.id AS id,
+	s.sequence AS sequence,
+	a.motif AS standard,
+	b.motif AS motif,
+	s.type AS type,
+	s.start AS start,
+	s.end AS end,
+	s.length AS length,
+	s.match AS match,
+	s.subsitution AS subsitution,
+	s.insertion AS insertion,
+	s.deletion AS deletion,
+	s.score AS score,
+	s.cigar AS cigar
+FROM issr_data AS s
+JOIN motif AS a ON a.id=s.standard
+JOIN motif AS b ON b.id=s.motif;
+
+CREATE TRIGGER IF NOT EXISTS `issr_insert` INSTEAD OF INSERT ON `issr`
+BEGIN
+	INSERT OR IGNORE INTO motif (motif) VALUES (NEW.standard), (NEW.motif);
+	INSERT INTO issr_data VALUES (NEW.id, NEW.sequence,
+		(SELECT id FROM motif WHERE motif=NEW.standard),
+		(SELECT id FROM motif WHERE motif=NEW.motif),
+		NEW.type, NEW.start, NEW.end, NEW.length, NEW.match,
+		NEW.subsitution, NEW.insertion, NEW.deletion, NEW.score, NEW.cigar);
+END;
+
+CREATE TRIGGER IF NOT EXISTS `issr_delete` INSTEAD OF DELETE ON `issr`
+BEGIN
+	DELETE FROM issr_data WHERE id=OLD.id;
+END;
+"""
+
 STYLE_QSS = """
 *{
 	font-family: "Roboto";
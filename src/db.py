@@ -1,10 +1,13 @@
 # -*- coding: utf-8 -*-
+import os
 import sys
 import apsw
 import random
 
 import config
 import utils
+from motifs import MotifStandard
+from libs import tandem, window
 
 class Row:
 	def __init__(self, names, values):
@@ -42,6 +45,9 @@ def row_factory(cursor, row):
 	fields = [name for name, _ in cursor.getdescription()]
 	return Row(fields, row)
 
+#views of tables with motif ids
+COMPACT_TABLES = {'ssr': 'ssr_data', 'issr': 'issr_data'}
+
 conn = apsw.Connection(':memory:')
 conn.setrowtrace(row_factory)
 conn.cursor().execute("PRAGMA synchronous=0")
@@ -60,6 +66,74 @@ class Database:
 	def create_table(self):
 		self.query(config.CREATE_TABLES_SQL)
 
+		#all mono to hexa motifs have fixed ids in motif table
+		if self.is_empty('motif'):
+			rows = [(m,) for m in MotifStandard().generate_motifs()]
+			self.insert("INSERT INTO motif (motif) VALUES (?)", rows)
+
+		self.migrate_tables()
+		self.query(config.CREATE_VIEWS_SQL)
+
+	def migrate_tables(self):
+		'''
+		convert ssr and issr tables with text motifs in old project to
+		tables with motif ids, the old tables are replaced by views, and
+		add standard motifs to old vntr table and alignments to old issr
+		table
+		'''
+		for view, table in COMPACT_TABLES.items():
+			if self.get_one("SELECT type FROM sqlite_master WHERE name='%s'" % view) != 'table':
+				continue
+
+			olds = [row[1] for row in self.query("PRAGMA table_info(%s)" % view)]
+			columns = []
+			for row in self.query("PRAGMA table_info(%s)" % table):
+				if row[1] in ('standard', 'motif'):
+					columns.append("(SELECT id FROM motif WHERE motif=t.%s)" % row[1])
+				elif row[1] in olds:
+					columns.append("t.%s" % row[1])
+				else:
+					columns.append("NULL")
+
+			self.begin()
+			self.query("INSERT OR IGNORE INTO motif (motif) SELECT standard FROM %s UNION SELECT motif FROM %s" % (view, view))
+			self.query("INSERT INTO %s SELECT %s FROM %s AS t" % (table, ",".join(columns), view))
+			self.query("DROP TABLE %s" % view)
+			self.commit()
+
+		#vntr table in old project has no standard motif column
+		if 'standard' not in [row[1] for row in self.query("PRAGMA table_info(vntr)")]:
+			conn.createscalarfunction('standard', lambda m: tandem.standard(m, window.VNTR_LEVEL), 1)
+			self.begin()
+			self.query("ALTER TABLE vntr RENAME TO vntr_old")
+			self.query(config.CREATE_TABLES_SQL)
+			self.query("INSERT INTO vntr SELECT id,sequence,standard(motif),motif,type,repeat,start,end,length FROM vntr_old")
+			self.query("DROP TABLE vntr_old")
+			self.commit()
+
+		#issr table in old project has no cigar column, the view with
+		#its triggers is created again
+		if 'cigar' not in [row[1] for row in self.query("PRAGMA table_info(issr_data)")]:
+			self.query("ALTER TABLE issr_data ADD COLUMN cigar TEXT")
+			self.query("DROP VIEW IF EXISTS issr")
+
+	def get_motif_ids(self, motifs):
+		'''
+		get ids of motifs in motif table, new motifs are added to table
+		@para motifs list, motif strings
+		@return list, motif ids
+		'''
+		cursor = self.get_cursor()
+		ids = []
+		for motif in motifs:
+			row = cursor.execute("SELECT id FROM motif WHERE motif=? LIMIT 1", (motif,)).fetchone()
+			if row is None:
+				cursor.execute("INSERT INTO motif (motif) VALUES (?)", (motif,))
+				ids.append(self.get_last_insert_rowid())
+			else:
+				ids.append(row[0])
+		return ids
+
 	def get_last_insert_rowid(self):
 		return conn.last_insert_rowid()
 
@@ -75,6 +149,9 @@ class Database:
 			return [col[0] for col in cursor.getdescription()]
 
 	def drop_tables(self):
+		for view in self.get_column("SELECT name FROM sqlite_master WHERE type='view'"):
+			self.query("DROP VIEW %s" % view)
+
 		for table in self.get_tables():
 			self.query("DROP TABLE %s" % table)
 		self.query("DROP INDEX IF EXISTS loc")
@@ -159,7 +236,120 @@ class Database:
 		self.query("COMMIT;")
 
 	def clear(self, table):
-		self.query("DELETE FROM %s" % table)
+		self.query("DELETE FROM %s" % COMPACT_TABLES.get(table, table))
 
 	def changes(self):
 		return conn.changes()
+
+
+class Checkpoint:
+	'''
+	durable copy of search results in a file attached to the in-memory
+	database, the rows of finished sequences are copied to the file with
+	the names of sequences in one transaction, so that the search broken
+	by a crash can be continued by the same search, motifs are kept as
+	text in file and mapped to motif ids again when restored
+	@para db Database, in-memory database
+	@para name str, search name used as checkpoint file name
+	@para parameters str, search parameters and input files, checkpoint
+		of other parameters is discarded
+	@para tables list, tables filled by the search
+	'''
+	def __init__(self, db, name, parameters, tables):
+		self.db = db
+		self.schema = '%s_checkpoint' % name
+		self.path = os.path.join(config.CACHE_PATH, '%s.db' % self.schema)
+		self.tables = tables
+		self.finished = set()
+		self.copied = {}
+
+		os.makedirs(config.CACHE_PATH, exist_ok=True)
+		self.detach()
+		self.attach()
+		if self.db.get_one("SELECT value FROM %s.parameters" % self.schema) not in (None, parameters):
+			self.detach()
+			os.remove(self.path)
+			self.attach()
+
+		self.db.query("DELETE FROM %s.parameters" % self.schema)
+		self.db.get_cursor().execute("INSERT INTO %s.parameters VALUES (?)" % self.schema, (parameters,))
+
+	def attach(self):
+		self.db.get_cursor().execute("ATTACH DATABASE ? AS %s" % self.schema, (self.path,))
+		self.db.query("CREATE TABLE IF NOT EXISTS %s.parameters (value TEXT)" % self.schema)
+		self.db.query("CREATE TABLE IF NOT EXISTS %s.finished (fasta TEXT, sequence TEXT, masked INTEGER)" % self.schema)
+		for table in self.tables:
+			self.db.query("CREATE TABLE IF NOT EXISTS %s.%s AS SELECT %s FROM main.%s AS t WHERE 0" % (
+				self.schema, table, self.columns(table, "(SELECT motif FROM main.motif WHERE id=t.%s)"), table))
+
+	def detach(self):
+		if self.schema in [row[1] for row in self.db.query("PRAGMA database_list")]:
+			self.db.query("DETACH DATABASE %s" % self.schema)
+
+	def columns(self, table, motif):
+		'''
+		@para table str, table name
+		@para motif str, expression of motif id columns
+		@return str, columns of table to be selected from t
+		'''
+		motifs = self.motif_columns(table)
+		columns = []
+		for row in self.db.query("PRAGMA main.table_info(%s)" % table):
+			if row[1] in motifs:
+				columns.append("%s AS %s" % (motif % row[1], row[1]))
+			else:
+				columns.append("t.%s" % row[1])
+		return ",".join(columns)
+
+	def motif_columns(self, table):
+		return [row[1] for row in self.db.query("PRAGMA main.table_info(%s)" % table)
+			if row[1] in ('standard', 'motif') and row[2] == 'INTEGER']
+
+	def restore(self):
+		'''
+		copy the rows of finished sequences to the tables of in-memory
+		database, the ids of rows are kept, tables must be empty
+		@return int, soft-masked bases skipped in finished sequences
+		'''
+		rows = self.db.get_all("SELECT fasta, sequence, masked FROM %s.finished" % self.schema)
+		self.finished = {(row[0], row[1]) for row in rows}
+
+		self.db.begin()
+		for table in self.tables:
+			for column in self.motif_columns(table):
+				self.db.query("INSERT OR IGNORE INTO main.motif (motif) SELECT %s FROM %s.%s" % (column, self.schema, table))
+
+			self.db.query("INSERT INTO main.%s SELECT %s FROM %s.%s AS t" % (
+				table, self.columns(table, "(SELECT id FROM main.motif WHERE motif=t.%s)"), self.schema, table))
+			self.copied[table] = self.db.get_one("SELECT MAX(id) FROM main.%s" % table) or 0
+		self.db.commit()
+
+		return sum(row[2] or 0 for row in rows)
+
+	def mark(self, fasta, names, masked):
+		'''
+		copy the new rows in tables to file as the results of finished
+		sequences, the rows must be inserted before marking
+		@para fasta str, fasta file path
+		@para names list, names of finished sequences
+		@para masked list, soft-masked bases skipped in each sequence
+		'''
+		cursor = self.db.get_cursor()
+		self.db.begin()
+		for table in self.tables:
+			cursor.execute("INSERT INTO %s.%s SELECT %s FROM main.%s AS t WHERE t.id>?" % (
+				self.schema, table, self.columns(table, "(SELECT motif FROM main.motif WHERE id=t.%s)"), table),
+				(self.copied.get(table, 0),))
+			self.copied[table] = self.db.get_one("SELECT MAX(id) FROM main.%s" % table) or 0
+
+		rows = [(fasta, name, bases) for name, bases in zip(names, masked)]
+		cursor.executemany("INSERT INTO %s.finished VALUES (?,?,?)" % self.schema, rows)
+		self.db.commit()
+
+	def close(self):
+		'''
+		remove the checkpoint when search is completed
+		'''
+		self.detach()
+		if os.path.exists(self.path):
+			os.remove(self.path)
@@ -105,7 +105,11 @@ class ISSRSeqDetail(Detail):
 		ssr = self.db.get_row(sql)
 		seq, left, right = self.getSequence(ssr.sequence, ssr.start, ssr.end)
 
-		origin, copy = issr.generate_alignment(seq, self.srep, self.slen, self.error, 500)
+		#alignment is realigned for the iSSR in old project without cigar
+		if ssr.cigar:
+			origin, copy = issr.cigar_alignment(seq, ssr.motif, ssr.cigar)
+		else:
+			origin, copy = issr.generate_alignment(seq, self.srep, self.slen, self.error, 500)
 
 		tandem = "%s%s%s" % (self.formatFlank(left), self.formatTarget(seq), self.formatFlank(right))
 		alignment = self.format_align(origin, copy)
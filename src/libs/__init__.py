@@ -6,3 +6,8 @@ from . import tandem
 #from . import fasta
 from . import ncls
 from . import issr
+from . import window
+from . import hits
+from . import rescore
+from . import refilter
+from . import region
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+'''
+columnar hits returned by tandem search functions with columns=True,
+the hits are kept in a numpy structured array with an interned motif
+id column instead of one python tuple per hit.
+'''
+import numpy
+
+from . import tandem
+
+#max hits in a batch of iterated scan
+BATCH_SIZE = 100000
+
+SSR_DTYPE = numpy.dtype([
+	('motif', 'i4'),
+	('type', 'i4'),
+	('repeat', 'i4'),
+	('start', 'i4'),
+	('end', 'i4'),
+	('length', 'i4')
+])
+
+ISSR_DTYPE = numpy.dtype([
+	('motif', 'i4'),
+	('type', 'i4'),
+	('start', 'i4'),
+	('end', 'i4'),
+	('length', 'i4'),
+	('match', 'i4'),
+	('substitution', 'i4'),
+	('insertion', 'i4'),
+	('deletion', 'i4'),
+	('score', 'i4')
+])
+
+#extended seed of imperfect SSR search, hit is 0 for rejected seed, 1 for
+#extended hit and 2 for perfect seed hit
+SEED_DTYPE = numpy.dtype([
+	('motif', 'i4'),
+	('type', 'i4'),
+	('position', 'i4'),
+	('seed', 'i4'),
+	('start', 'i4'),
+	('end', 'i4'),
+	('match', 'i4'),
+	('substitution', 'i4'),
+	('insertion', 'i4'),
+	('deletion', 'i4'),
+	('hit', 'i4')
+])
+
+#record type of tandem search functions
+DTYPES = {
+	'search_ssr': SSR_DTYPE,
+	'search_vntr': SSR_DTYPE,
+	'search_issr': ISSR_DTYPE
+}
+
+#batch iterator of tandem search functions
+ITERATORS = {
+	'search_ssr': tandem.iter_ssr,
+	'search_vntr': tandem.iter_vntr,
+	'search_issr': tandem.iter_issr
+}
+
+class Hits:
+	'''
+	@para motifs list, motif strings indexed by motif id
+	@para records numpy array, hit records sorted by end position
+	@para standards list, standard motifs indexed by motif id, None if
+		motifs are not standardized
+	@para cigars list, CIGAR alignment of each hit, None if not kept
+	@para seeds numpy array, extended seeds sorted by seed start in scan
+		order, None if not kept
+	'''
+	def __init__(self, motifs, records, standards=None, cigars=None, seeds=None):
+		self.motifs = motifs
+		self.records = records
+		self.standards = standards
+		self.cigars = cigars
+		self.seeds = seeds
+
+	@classmethod
+	def from_result(cls, result, dtype):
+		'''
+		create hits from the result of tandem function in columns mode
+		@para result tuple, (motifs, bytes) or (motifs, bytes, standards),
+			(motifs, bytes, standards, cigars, seeds) if alignments or
+			extended seeds are kept
+		@para dtype numpy dtype, record type
+		@return Hits object
+		'''
+		motifs, buff = result[:2]
+		standards = result[2] if len(result) > 2 else None
+		cigars = result[3] if len(result) > 3 else None
+		seeds = numpy.frombuffer(result[4], SEED_DTYPE) if len(result) > 4 and result[4] is not None else None
+		return cls(motifs, numpy.frombuffer(buff, dtype), standards, cigars, seeds)
+
+	@classmethod
+	def search(cls, func, seq, *args, **kwargs):
+		'''
+		call tandem search function in columns mode
+		@para func callable, tandem search function
+		@para seq str or bytes-like, sequence to search
+		@para kwargs dict, offset and length of region to search, mask
+			mode, standard level, cigar and seeds of imperfect SSRs
+		@return Hits object
+		'''
+		return cls.from_result(func(seq, *args, columns=True, **kwargs), DTYPES[func.__name__])
+
+	@classmethod
+	def iterate(cls, func, seq, *args, batch=BATCH_SIZE, **kwargs):
+		'''
+		scan sequence and yield hits in batches while scanning
+		@para func callable, tandem search function
+		@para seq str or bytes-like, sequence to search
+		@para batch int, max hits in a batch
+		@para kwargs dict, offset and length of region to search, mask
+			mode and standard level
+		@return generator, (Hits, position) tuples, position is the 0-based
+			position where the scan of next batch starts, the last one is
+			the end of the region
+		'''
+		dtype = DTYPES[func.__name__]
+		scanner = ITERATORS[func.__name__](seq, *args, columns=True, batch=batch, **kwargs)
+		position = None
+		for result in scanner:
+			position = scanner.position
+			yield cls.from_result(result, dtype), position
+
+		if position != scanner.position:
+			standards = [] if kwargs.get('level') else None
+			cigars = [] if kwargs.get('cigar') else None
+			seeds = numpy.empty(0, SEED_DTYPE) if kwargs.get('seeds') else None
+			yield cls([], numpy.empty(0, dtype), standards, cigars, seeds), scanner.position
+
+	@classmethod
+	def batch(cls, func, seqs, *args, threads=1, **kwargs):
+		'''
+		scan several sequences on the native thread pool of tandem module
+		@para func callable, tandem search function
+		@para seqs list, str or bytes-like sequences, or (seq, offset,
+			length) tuples to scan a region of sequence
+		@para threads int, number of native threads
+		@para kwargs dict, the same keyword options of search function
+		@return list, Hits of each sequence in the same order
+		'''
+		dtype = DTYPES[func.__name__]
+		results = tandem.search_batch(func, seqs, args, threads, dict(kwargs, columns=True))
+		return [cls.from_result(result, dtype) for result in results]
+
+	@classmethod
+	def concat(cls, parts):
+		'''
+		concatenate hits, motif ids are remapped to a merged motif list
+		@para parts list, at least one Hits object
+		@return Hits object
+		'''
+		ids = {}
+		standards = {}
+		records = []
+		cigars = []
+		seeds = []
+		for part in parts:
+			mapping = numpy.array([ids.setdefault(m, len(ids)) for m in part.motifs], dtype='i4')
+			rec = part.records.copy()
+			if len(rec):
+				rec['motif'] = mapping[rec['motif']]
+			records.append(rec)
+
+			if part.seeds is not None:
+				rec = part.seeds.copy()
+				if len(rec):
+					rec['motif'] = mapping[rec['motif']]
+				seeds.append(rec)
+
+			if part.standards is not None:
+				standards.update(zip(part.motifs, part.standards))
+
+			if part.cigars is not None:
+				cigars.extend(part.cigars)
+
+		if parts[0].cigars is None:
+			cigars = None
+
+		seeds = numpy.concatenate(seeds) if parts[0].seeds is not None else None
+
+		if parts[0].standards is None:
+			return cls(list(ids), numpy.concatenate(records), None, cigars, seeds)
+
+		return cls(list(ids), numpy.concatenate(records), [standards[m] for m in ids], cigars, seeds)
+
+	def __len__(self):
+		return len(self.records)
+
+	def __iter__(self):
+		'''
+		yield hits as tuples with motif string in the first field, the same
+		as the tuples returned by tandem search functions, the standard
+		motif is the first field if motifs are standardized and the CIGAR
+		is the last field if alignments are kept
+		'''
+		motifs = self.motifs
+		standards = self.standards
+		if standards is None:
+			rows = ((motifs[rec[0]],) + rec[1:] for rec in self.records.tolist())
+		else:
+			rows = ((standards[rec[0]], motifs[rec[0]]) + rec[1:] for rec in self.records.tolist())
+
+		if self.cigars is None:
+			yield from rows
+		else:
+			for row, cigar in zip(rows, self.cigars):
+				yield row + (cigar,)
+
+	@property
+	def starts(self):
+		return self.records['start']
+
+	@property
+	def ends(self):
+		return self.records['end']
+
+	def shift(self, offset):
+		'''
+		move hits by offset bases
+		@para offset int, bases to add to start and end
+		@return Hits object
+		'''
+		records = self.records.copy()
+		records['start'] += offset
+		records['end'] += offset
+
+		seeds = self.seeds
+		if seeds is not None:
+			seeds = seeds.copy()
+			seeds['position'] += offset
+			seeds['start'] += offset
+			seeds['end'] += offset
+
+		return Hits(self.motifs, records, self.standards, self.cigars, seeds)
+
+	def select(self, lo, hi=None):
+		'''
+		select hits with lo < end <= hi, the extended seeds are selected by
+		seed start in the same way, they are scanned before 0-based hi
+		@para lo int, exclusive lower bound of end
+		@para hi int, inclusive upper bound of end, None for no bound
+		@return Hits object
+		'''
+		ends = self.records['end']
+		i = numpy.searchsorted(ends, lo, 'right')
+		j = len(ends) if hi is None else numpy.searchsorted(ends, hi, 'right')
+		cigars = None if self.cigars is None else self.cigars[i:j]
+
+		seeds = self.seeds
+		if seeds is not None:
+			starts = seeds['position']
+			k = numpy.searchsorted(starts, lo, 'right')
+			seeds = seeds[k:] if hi is None else seeds[k:numpy.searchsorted(starts, hi, 'right')]
+
+		return Hits(self.motifs, self.records[i:j], self.standards, cigars, seeds)
@@ -1,4 +1,5 @@
 #!/usr/bin/env python
+import re
 
 def initial_matrix(size):
 	matrix = []
@@ -406,6 +407,44 @@ def generate_alignment(seq, seed_repeats, seed_minlen, max_errors, size):
 			j += 1
 		i += 1
 
+def cigar_alignment(seq, motif, cigar):
+	'''
+	generate alignment of imperfect SSR from the CIGAR kept by search,
+	the reference is the perfect repeat of motif and a leading N skips
+	the bases of the first motif copy before the start of alignment
+	@para seq str, sequence of imperfect SSR
+	@para motif str, motif of imperfect SSR
+	@para cigar str, runs of =, X, I, D and N operations
+	@return tuple, (origin, copy) lists of aligned bases with gaps
+	'''
+	mlen = len(motif)
+	origin = []
+	copy = []
+	i = 0
+	j = 0
+	for size, op in re.findall(r'(\d+)([=XIDN])', cigar):
+		size = int(size)
+		if op == 'N':
+			j += size
+			continue
+
+		for _ in range(size):
+			if op == 'I':
+				origin.append(seq[i])
+				copy.append('-')
+				i += 1
+			elif op == 'D':
+				origin.append('-')
+				copy.append(motif[j%mlen])
+				j += 1
+			else:
+				origin.append(seq[i])
+				copy.append(motif[j%mlen])
+				i += 1
+				j += 1
+
+	return origin, copy
+
 
 if __name__ == '__main__':
 	#fasta = pyfaidx.Fasta('test.fa')
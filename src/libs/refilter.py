@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+'''
+select perfect SSRs or VNTRs again from the hits kept by a search when
+the min repeats become stricter.
+
+A hit of search that still has the min repeats is found by the new scan
+if both scans start from the same position, and both scans continue from
+its end. A rejected hit was skipped by the search, the bases covered by
+it may hold other hits of the new scan, so the sequence is scanned again
+from the end of the last kept hit until the new scan finds a hit of
+search that is kept, after which the scans are the same again.
+'''
+from .hits import Hits
+
+def refilter(seq, records, passed, windows):
+	'''
+	select hits of a sequence with stricter min repeats
+	@para seq callable, return the whole sequence, only called when some
+		regions have to be scanned again
+	@para records numpy array, hit records of search in scan order with
+		SSR_DTYPE
+	@para passed numpy array, bool of hits that have the new min repeats
+	@para windows Windows, windows of search with new parameters, the
+		other parameters and mask mode are the same as search
+	@return tuple, (keep, hits) bool of hits of search kept in result and
+		Hits found by scanning again, None if no region is scanned
+	'''
+	keep = passed.copy()
+	if keep.all():
+		return keep, None
+
+	starts = records['start'].tolist()
+	ends = records['end'].tolist()
+	kept = {(s, t, r): k for k, (s, t, r) in enumerate(zip(starts, records['type'].tolist(),
+		records['repeat'].tolist())) if passed[k]}
+
+	sequence = seq()
+	parts = []
+	pos = 0
+	n = 0
+	while n < len(starts):
+		if passed[n]:
+			pos = ends[n]
+			n += 1
+			continue
+
+		hits, k = rescan(sequence, windows, pos, kept)
+		if hits is not None:
+			parts.append(hits)
+
+		#hits of search before the same hit are replaced by new hits
+		if k is None:
+			keep[n:] = False
+			break
+
+		keep[n:k] = False
+		pos = ends[k]
+		n = k + 1
+
+	if not parts:
+		return keep, None
+
+	return keep, Hits.concat(parts)
+
+def rescan(seq, windows, start, kept):
+	'''
+	scan the sequence from start until a hit is the same as a kept hit of
+	search, the scan stops after each hit to be checked
+	@para seq str, the whole sequence
+	@para windows Windows, windows of search with new parameters
+	@para start int, 0-based position where the scan starts
+	@para kept dict, index of kept hits of search by (start, type, repeat)
+	@return tuple, (Hits, index) hits found before the same hit and index
+		of the same hit, index is None if the scan reaches the end
+	'''
+	parts = []
+	for hits, _ in Hits.iterate(windows.func, seq, *windows.args, batch=1, offset=start,
+		length=len(seq)-start, **windows.options):
+		if not len(hits):
+			continue
+
+		record = hits.records[0]
+		k = kept.get((int(record['start']), int(record['type']), int(record['repeat'])))
+		if k is not None:
+			break
+
+		parts.append(hits)
+	else:
+		k = None
+
+	return (Hits.concat(parts) if parts else None), k
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+'''
+target regions for the search restricted to a region set, the regions
+are fetched through fasta index and scanned as sequences named with
+their positions, the hits are mapped back to the whole sequence.
+'''
+import gzip
+
+import pyfastx
+
+def read_regions(region_file, features=None):
+	'''
+	read target regions from BED, GFF or GTF file, the overlapping and
+	adjacent regions of a sequence are merged
+	@para region_file str, BED, GFF or GTF file, may be gzipped
+	@para features list, feature types kept in GFF or GTF, e.g. exon,
+		None to keep all features
+	@return dict, sorted 0-based (start, end) regions of each sequence
+	'''
+	if region_file.endswith('.gz'):
+		fh = gzip.open(region_file, 'rt')
+	else:
+		fh = open(region_file)
+
+	if features:
+		features = {feature.upper() for feature in features}
+
+	regions = {}
+	gff = None
+	with fh:
+		for line in fh:
+			if line[0] == '#' or line.startswith(('track', 'browser')):
+				continue
+
+			cols = line.strip().split('\t')
+			if len(cols) < 3:
+				continue
+
+			#the first record decides the format
+			if gff is None:
+				gff = len(cols) >= 9 and cols[3].isdigit() and cols[4].isdigit()
+
+			if gff:
+				if features and cols[2].upper() not in features:
+					continue
+				regions.setdefault(cols[0], []).append((int(cols[3])-1, int(cols[4])))
+			else:
+				regions.setdefault(cols[0], []).append((int(cols[1]), int(cols[2])))
+
+	for name in regions:
+		merged = []
+		for start, end in sorted(regions[name]):
+			if merged and start <= merged[-1][1]:
+				merged[-1][1] = max(merged[-1][1], end)
+			else:
+				merged.append([start, end])
+		regions[name] = [(start, end) for start, end in merged]
+
+	return regions
+
+def label(name, start, end):
+	'''
+	@para start int, 0-based start of region
+	@para end int, end of region
+	@return str, region name with 1-based positions, e.g. chr1:101-200
+	'''
+	return "%s:%d-%d" % (name, start+1, end)
+
+def locate(name, hits):
+	'''
+	map the hits of a region back to the whole sequence
+	@para name str, region name from label
+	@para hits Hits, hits of region
+	@return tuple, (sequence name, Hits)
+	'''
+	name, span = name.rsplit(':', 1)
+	return name, hits.shift(int(span.split('-')[0]) - 1)
+
+class RegionFasta:
+	'''
+	target regions of an indexed fasta file used as sequences, only the
+	bases in regions are read
+	@para fasta_file str, fasta file path
+	@para regions dict, 0-based (start, end) regions of each sequence
+	'''
+	def __init__(self, fasta_file, regions):
+		self.fasta = pyfastx.Fasta(fasta_file)
+		self.spans = {}
+		for name in self.fasta.keys():
+			if name not in regions:
+				continue
+
+			length = len(self.fasta[name])
+			for start, end in regions[name]:
+				end = min(end, length)
+				if start < end:
+					self.spans[label(name, start, end)] = (name, start, end)
+
+	def __iter__(self):
+		for key in self.spans:
+			yield key, self[key]
+
+	def __len__(self):
+		return len(self.spans)
+
+	def __contains__(self, key):
+		return key in self.spans
+
+	def __getitem__(self, key):
+		name, start, end = self.spans[key]
+		return self.fasta.fetch(name, (start+1, end))
+
+	def keys(self):
+		return iter(self.spans)
+
+	@property
+	def size(self):
+		return sum(end - start for _, start, end in self.spans.values())
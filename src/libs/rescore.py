@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+'''
+select imperfect SSRs again from the extended seeds kept by a search
+when only the penalties or the required score are changed.
+
+The extension of a seed does not depend on the penalties and required
+score, only the hits selected by the greedy scan do. A seed is visited
+by the scan if it is not covered by a hit found before it, so the scan
+is replayed on the kept seeds. The seeds covered by the hits of search
+were not extended, when the replay reaches them, the sequence is scanned
+again from there until a position visited by both scans and not covered
+by any hit of search, after which the replay continues.
+'''
+import bisect
+
+import numpy
+
+from . import tandem
+from .hits import Hits, ISSR_DTYPE
+
+def seed_scores(seeds, mis_penalty, gap_penalty):
+	'''
+	@para seeds numpy array, extended seeds with SEED_DTYPE
+	@return numpy array, score of extension of each seed
+	'''
+	return seeds['match'] - seeds['substitution']*mis_penalty - (seeds['insertion']+seeds['deletion'])*gap_penalty
+
+def hit_ends(seeds, full, alone):
+	'''
+	@para full numpy array, bool of seeds reported with extension
+	@para alone numpy array, bool of perfect seeds reported alone
+	@return numpy array, 1-based end of hit of each seed, 0 for rejected
+	'''
+	return numpy.where(full, seeds['end'], numpy.where(alone, seeds['position']+seeds['seed']-1, 0))
+
+def seed_hits(seeds, index, scores, full, ends):
+	'''
+	@para index list, indexes of seeds reported as hits
+	@return tuple, (ids, records) motif ids of seeds used by hits and
+		hit records with ISSR_DTYPE, the motif of records is index of ids
+	'''
+	index = numpy.array(index, dtype='i8')
+	chosen = seeds[index]
+	extended = full[index]
+	records = numpy.empty(len(index), ISSR_DTYPE)
+	ids, records['motif'] = numpy.unique(chosen['motif'], return_inverse=True)
+	records['type'] = chosen['type']
+	records['start'] = numpy.where(extended, chosen['start'], chosen['position'])
+	records['end'] = ends[index]
+	records['length'] = records['end'] - records['start'] + 1
+	records['match'] = numpy.where(extended, chosen['match'], chosen['seed'])
+	records['substitution'] = numpy.where(extended, chosen['substitution'], 0)
+	records['insertion'] = numpy.where(extended, chosen['insertion'], 0)
+	records['deletion'] = numpy.where(extended, chosen['deletion'], 0)
+	records['score'] = numpy.where(extended, scores[index], chosen['seed'])
+	return ids.tolist(), records
+
+def seed_cigars(seeds, index, full, cigars):
+	'''
+	@para cigars list, CIGAR kept by search for each seed, None for the
+		seed not reported
+	@return list, CIGAR of hits, None for the hit newly extended
+	'''
+	alignments = []
+	for k in index:
+		if not full[k]:
+			alignments.append("%d=" % seeds['seed'][k])
+		elif seeds['hit'][k] == 1:
+			alignments.append(cigars[k])
+		else:
+			alignments.append(None)
+	return alignments
+
+def rescore(seq, seeds, motifs, windows, cigars=None):
+	'''
+	select hits of a sequence with new penalties and required score
+	@para seq callable, return the whole sequence, only called when some
+		regions have to be scanned again
+	@para seeds numpy array, extended seeds of a sequence in scan order
+	@para motifs list, motif strings indexed by motif id of seeds
+	@para windows Windows, windows of imperfect SSR search with new
+		parameters, seeds are the same if the seed parameters, extension
+		size and mask mode are the same as search
+	@para cigars list, CIGAR kept by search for each seed, None for the
+		seed not reported, the CIGAR of hits are not kept if None
+	@return Hits object, the same hits as a new search
+	'''
+	_, _, _, mis_penalty, gap_penalty, min_score, _ = windows.args
+	level = windows.options.get('level', 0)
+	standards = [tandem.standard(m, level) for m in motifs] if level else None
+
+	scores = seed_scores(seeds, mis_penalty, gap_penalty)
+	full = scores >= min_score
+	ends = hit_ends(seeds, full, ~full & (seeds['seed'] >= min_score))
+	olds = hit_ends(seeds, seeds['hit'] == 1, seeds['hit'] == 2)
+
+	positions = (seeds['position'] - 1).tolist()
+	new_ends = ends.tolist()
+	old_ends = olds.tolist()
+
+	#only the seeds reported by one of the scans change the scan
+	candidates = numpy.flatnonzero(ends | olds).tolist()
+
+	#0-based seed positions and ends of hits of search, the positions
+	#after seed and before end of a hit were not visited
+	covers = [(positions[k], old_ends[k]) for k in candidates if old_ends[k]]
+	cover_ends = [e for _, e in covers]
+
+	parts = []
+	index = []
+	sequence = []
+	scanned = 0
+	pos = 0
+	n = 0
+
+	def add_seeds():
+		if index:
+			ids, records = seed_hits(seeds, index, scores, full, ends)
+			alignments = seed_cigars(seeds, index, full, cigars) if cigars is not None else None
+			parts.append(Hits([motifs[i] for i in ids], records, standards and [standards[i] for i in ids], alignments))
+			del index[:]
+
+	while n < len(candidates):
+		k = candidates[n]
+		if positions[k] < pos:
+			#seed is covered by the last hit
+			if old_ends[k] <= pos:
+				n += 1
+				continue
+
+			#the scan continues in a hit of search
+			start = pos
+
+		elif new_ends[k] and new_ends[k] >= old_ends[k]:
+			index.append(k)
+			pos = new_ends[k]
+			n += 1
+			continue
+
+		else:
+			#the scan continues after a rejected or shorter hit of search
+			start = positions[k]
+
+		if not sequence:
+			sequence.append(seq())
+
+		add_seeds()
+		hits, pos = rescan(sequence[0], windows, start, covers[bisect.bisect_right(cover_ends, start):])
+		parts.append(hits)
+		scanned += pos - start + windows.overlap + windows.context
+
+		while n < len(candidates) and positions[candidates[n]] < pos:
+			n += 1
+
+		#the hits of search are hardly reused in the low complexity
+		#sequence, the rest of sequence is scanned as a whole
+		if scanned * 4 > len(sequence[0]) and n < len(candidates):
+			begin = max(0, pos - windows.context)
+			parts.append(Hits.search(windows.func, sequence[0], *windows.args, offset=begin,
+				start=pos-begin, **windows.options))
+			break
+
+	add_seeds()
+
+	if not parts:
+		return Hits(motifs, numpy.empty(0, ISSR_DTYPE), standards, [] if cigars is not None else None)
+
+	return Hits.concat(parts)
+
+def rescan(seq, windows, start, covers):
+	'''
+	scan the sequence from start to the last position in the region that
+	is visited by the new scan and not covered by the hits of search
+	@para seq str, the whole sequence
+	@para windows Windows, windows of imperfect SSR search
+	@para start int, 0-based position where the scan starts
+	@para covers list, 0-based seed positions and ends of hits of search
+		ending after start
+	@return tuple, (Hits, position) the hits before position where the
+		replay continues
+	'''
+	size = windows.overlap
+	while 1:
+		begin = max(0, start - windows.context)
+		stop = min(len(seq), start + size)
+		hits = Hits.search(windows.func, seq, *windows.args, offset=begin, length=stop-begin,
+			start=start-begin, **windows.options)
+
+		#the end of sequence is visited by all scans
+		if stop == len(seq):
+			return hits, stop
+
+		#the scan near the end of region may be affected by the truncated
+		#sequence
+		limit = stop - windows.guard
+		blocks = [(s-1, e) for s, e in zip(hits.starts.tolist(), hits.ends.tolist())]
+		for s, e in covers:
+			if s >= limit:
+				break
+			blocks.append((s+1, e))
+		blocks.sort()
+
+		q = start + 1
+		last = None
+		for s, e in blocks:
+			if s >= limit:
+				break
+			if q < s:
+				last = s - 1
+			q = max(q, e)
+
+		if q < limit:
+			last = limit - 1
+
+		if last is not None:
+			return hits.select(0, last), last
+
+		size *= 2
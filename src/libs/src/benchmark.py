@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+'''
+benchmark perfect SSR and VNTR search engines of tandem module, build the
+module in place first with: python setup.py build_ext --inplace
+usage: python benchmark.py [fasta] [rounds]
+'''
+import os
+import sys
+import gzip
+import time
+
+import tandem
+
+PACKAGE_PATH = os.path.abspath(os.path.dirname(__file__))
+EXAMPLE_FASTA = os.path.join(PACKAGE_PATH, '..', '..', '..', 'example', 'GCF_000005845.2.fna.gz')
+
+#default minimum repeats of Krait and a more sensitive setting
+REPEATS = [
+	[12, 7, 5, 4, 4, 4],
+	[6, 3, 3, 3, 3, 3],
+	[2, 2, 2, 2, 2, 2]
+]
+
+#min motif, max motif and min repeat of VNTR search
+VNTRS = [
+	(7, 30, 2),
+	(7, 100, 2),
+	(10, 300, 2)
+]
+
+def read_fasta(fasta_file):
+	if fasta_file.endswith('.gz'):
+		fh = gzip.open(fasta_file, 'rt')
+	else:
+		fh = open(fasta_file)
+
+	seqs = []
+	with fh:
+		for line in fh:
+			if line[0] == '>':
+				seqs.append([])
+			else:
+				seqs[-1].append(line.strip().upper())
+
+	return [''.join(seq) for seq in seqs]
+
+def timeit(seqs, func, args, engine, rounds):
+	best = None
+	for _ in range(rounds):
+		start = time.perf_counter()
+		results = [func(seq, *args, engine=engine) for seq in seqs]
+		elapsed = time.perf_counter() - start
+		if best is None or elapsed < best:
+			best = elapsed
+	return best, results
+
+if __name__ == '__main__':
+	fasta_file = sys.argv[1] if len(sys.argv) > 1 else EXAMPLE_FASTA
+	rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+	seqs = read_fasta(fasta_file)
+	bases = sum(len(seq) for seq in seqs)
+	print("%s: %d sequences, %d bases" % (os.path.basename(fasta_file), len(seqs), bases))
+
+	for repeats in REPEATS:
+		legacy_time, legacy_ssrs = timeit(seqs, tandem.search_ssr, (repeats,), 'legacy', rounds)
+		linear_time, linear_ssrs = timeit(seqs, tandem.search_ssr, (repeats,), 'linear', rounds)
+
+		if legacy_ssrs != linear_ssrs:
+			sys.exit("results differ with minimum repeats %s" % repeats)
+
+		print("repeats %-20s ssrs %-8d legacy %.3fs  linear %.3fs  speedup %.1fx" % (
+			','.join(map(str, repeats)), sum(map(len, linear_ssrs)),
+			legacy_time, linear_time, legacy_time/linear_time))
+
+	for params in VNTRS:
+		legacy_time, legacy_vntrs = timeit(seqs, tandem.search_vntr, params, 'legacy', rounds)
+		linear_time, linear_vntrs = timeit(seqs, tandem.search_vntr, params, 'linear', rounds)
+
+		if legacy_vntrs != linear_vntrs:
+			sys.exit("results differ with vntr parameters %s" % (params,))
+
+		print("vntr    %-20s vntrs %-7d legacy %.3fs  linear %.3fs  speedup %.1fx" % (
+			','.join(map(str, params)), sum(map(len, linear_vntrs)),
+			legacy_time, linear_time, legacy_time/linear_time))
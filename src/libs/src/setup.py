@@ -23,7 +23,9 @@ libprimer3_paths = [
 ]
 
 extensions = [
+	#batch scans run on pthreads except on windows
 	Extension('tandem', ['tandem.c'],
+		libraries=[] if sys.platform == 'win32' else ['pthread'],
 		extra_compile_args=['-DMS_WIN64'],
 		extra_link_args=['-DMS_WIN64']
 	),
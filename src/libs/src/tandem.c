@@ -1,153 +1,1194 @@
 #include <Python.h>
 
-//search perfect microsatellites
-static PyObject *search_ssr(PyObject *self, PyObject *args)
-{
-	char *seq;
-	int mono = 0;
-	int di = 0;
-	int tri = 0;
-	int tetra = 0;
-	int penta = 0;
-	int hexa = 0;
-	int rep[6];
+#ifdef _WIN32
+#include <windows.h>
+#else
+#include <pthread.h>
+#endif
 
-	size_t len;
+//hit buffer, hits are stored as contiguous int records, the first field
+//of each record is the id of motif interned in the buffer
+typedef struct {
+	int *records;
+	Py_ssize_t count;
+	Py_ssize_t capacity;
+	int fields;
+	char **motifs;
+	int motif_count;
+	int motif_capacity;
+	int *slots;
+	int slot_count;
+	int level;
+	char **standards;
+	char *texts; //text of each hit ended by \0, NULL if not kept
+	size_t text_len;
+	size_t text_capacity;
+	int *seeds; //records of extended seeds, NULL if not kept
+	Py_ssize_t seed_count;
+	Py_ssize_t seed_capacity;
+} hit_buffer;
+
+//fields of extended seed, motif id, type, seed start, seed length, start,
+//end, match, substitution, insertion and deletion of extension and hit
+//type, 0 for rejected, 1 for extended and 2 for perfect seed
+#define SEED_FIELDS 11
+
+//rank of base to sort motifs as A>T>C>G, other bases are the last
+static int base_rank(char b){
+	switch(b){
+		case 'A': case 'a': return 1;
+		case 'T': case 't': return 2;
+		case 'C': case 'c': return 3;
+		case 'G': case 'g': return 4;
+	}
+	return 5;
+}
+
+static char base_complement(char b){
+	switch(b){
+		case 'A': return 'T';
+		case 'T': return 'A';
+		case 'G': return 'C';
+		case 'C': return 'G';
+	}
+	return b;
+}
+
+//base at position i of the k-th form of motif, the motif itself, its
+//reverse complement, complement and reverse
+static char form_base(const char *motif, int len, int k, int i){
+	switch(k){
+		case 1: return base_complement(motif[len-1-i]);
+		case 2: return base_complement(motif[i]);
+		case 3: return motif[len-1-i];
+	}
+	return motif[i];
+}
+
+//start of the first sorted rotation of the k-th form of motif, two
+//candidate starts are compared and the larger one jumps over the compared
+//bases, so it takes linear time for motif of any length
+static int minimal_rotation(const char *motif, int len, int k){
+	int i = 0;
+	int j = 1;
+	int n = 0;
+	int a;
+	int b;
+
+	while(i < len && j < len && n < len){
+		a = base_rank(form_base(motif, len, k, (i+n)%len));
+		b = base_rank(form_base(motif, len, k, (j+n)%len));
+
+		if(a == b){
+			n++;
+			continue;
+		}
+
+		if(a > b){
+			i += n + 1;
+		}else{
+			j += n + 1;
+		}
+
+		if(i == j){
+			j++;
+		}
+		n = 0;
+	}
+
+	return i < j ? i : j;
+}
+
+//the standard motif is the first sorted one of the rotations of motif,
+//of its reverse complement (level 2), complement (level 3) and reverse
+//(level 4), out must have len+1 bytes
+static void standard_motif(const char *motif, int len, int level, char *out){
+	int n = level > 4 ? 4 : level;
+	int k;
+	int r;
+	int i;
+	int d;
+
+	memcpy(out, motif, len);
+	out[len] = '\0';
+
+	for(k=0; k<n; k++){
+		r = minimal_rotation(motif, len, k);
+
+		d = 0;
+		for(i=0; i<len && !d; i++){
+			d = base_rank(form_base(motif, len, k, (r+i)%len)) - base_rank(out[i]);
+		}
+
+		if(d < 0){
+			for(i=0; i<len; i++){
+				out[i] = form_base(motif, len, k, (r+i)%len);
+			}
+		}
+	}
+}
+
+//standard motifs of all mono to hexa motifs consisting of ACGT at each
+//level, motif is indexed by 2-bit code plus the offset of its length
+#define MOTIF_CODES 5460
+static const int code_offset[7] = {0, 0, 4, 20, 84, 340, 1364};
+static const char code_bases[4] = {'A', 'C', 'G', 'T'};
+static unsigned short standard_table[4][MOTIF_CODES];
+
+//2-bit code of motif, -1 if motif has other bases or is longer than hexa
+static int motif_code(const char *motif, int len){
+	int code = 0;
+	int i;
+
+	if(len > 6){
+		return -1;
+	}
+
+	for(i=0; i<len; i++){
+		code <<= 2;
+		switch(motif[i]){
+			case 'A': break;
+			case 'C': code |= 1; break;
+			case 'G': code |= 2; break;
+			case 'T': code |= 3; break;
+			default: return -1;
+		}
+	}
+	return code;
+}
+
+static void code_motif(int code, int len, char *motif){
+	int i;
+	for(i=len-1; i>=0; i--){
+		motif[i] = code_bases[code & 3];
+		code >>= 2;
+	}
+	motif[len] = '\0';
+}
+
+static void init_standards(void){
+	char motif[7];
+	char standard[7];
+	int len;
+	int code;
+	int level;
+
+	for(len=1; len<=6; len++){
+		for(code=0; code<(1<<(2*len)); code++){
+			code_motif(code, len, motif);
+			for(level=1; level<=4; level++){
+				standard_motif(motif, len, level, standard);
+				standard_table[level-1][code_offset[len]+code] = motif_code(standard, len);
+			}
+		}
+	}
+}
+
+//get standard motif from lookup table or compute it for other bases
+static void lookup_standard(const char *motif, int len, int level, char *out){
+	int code = motif_code(motif, len);
+
+	if(level <= 0 || code < 0){
+		standard_motif(motif, len, level, out);
+	}else{
+		code_motif(standard_table[level-1][code_offset[len]+code], len, out);
+	}
+}
+
+static int buffer_init(hit_buffer *buf, int fields, int level, int texts, int seeds){
+	buf->fields = fields;
+	buf->count = 0;
+	buf->capacity = 1024;
+	buf->records = (int *)malloc(sizeof(int)*fields*buf->capacity);
+	buf->motif_count = 0;
+	buf->motif_capacity = 64;
+	buf->motifs = (char **)malloc(sizeof(char *)*buf->motif_capacity);
+	buf->slot_count = 128;
+	buf->slots = (int *)malloc(sizeof(int)*buf->slot_count);
+	buf->level = level;
+	buf->standards = NULL;
+	buf->texts = NULL;
+	buf->text_len = 0;
+	buf->text_capacity = 0;
+	buf->seeds = NULL;
+	buf->seed_count = 0;
+	buf->seed_capacity = 0;
+
+	if(buf->records == NULL || buf->motifs == NULL || buf->slots == NULL){
+		return 0;
+	}
+
+	if(texts){
+		buf->text_capacity = 4096;
+		buf->texts = (char *)malloc(buf->text_capacity);
+		if(buf->texts == NULL){
+			return 0;
+		}
+	}
+
+	if(seeds){
+		buf->seed_capacity = 1024;
+		buf->seeds = (int *)malloc(sizeof(int)*SEED_FIELDS*buf->seed_capacity);
+		if(buf->seeds == NULL){
+			return 0;
+		}
+	}
+
+	//standard motifs are kept with the same id of motifs
+	if(level > 0){
+		buf->standards = (char **)malloc(sizeof(char *)*buf->motif_capacity);
+		if(buf->standards == NULL){
+			return 0;
+		}
+	}
+
+	memset(buf->slots, -1, sizeof(int)*buf->slot_count);
+	return 1;
+}
+
+static void buffer_free(hit_buffer *buf){
+	int i;
+	for(i=0; i<buf->motif_count; i++){
+		free(buf->motifs[i]);
+		if(buf->standards != NULL){
+			free(buf->standards[i]);
+		}
+	}
+	free(buf->motifs);
+	free(buf->standards);
+	free(buf->slots);
+	free(buf->records);
+	free(buf->texts);
+	free(buf->seeds);
+}
+
+//hash of motif, bases are mapped first if map is not NULL
+static unsigned int motif_hash(const char *motif, int len, const unsigned char *map){
+	unsigned int h = 2166136261u;
+	int i;
+	for(i=0; i<len; i++){
+		h = (h ^ (map ? map[(unsigned char)motif[i]] : (unsigned char)motif[i])) * 16777619u;
+	}
+	return h;
+}
+
+//rebuild hash slots with double size
+static int buffer_rehash(hit_buffer *buf){
+	int i;
+	unsigned int k;
+	int *slots = (int *)malloc(sizeof(int)*buf->slot_count*2);
+
+	if(slots == NULL){
+		return 0;
+	}
+
+	free(buf->slots);
+	buf->slots = slots;
+	buf->slot_count *= 2;
+	memset(buf->slots, -1, sizeof(int)*buf->slot_count);
+
+	for(i=0; i<buf->motif_count; i++){
+		k = motif_hash(buf->motifs[i], strlen(buf->motifs[i]), NULL) & (buf->slot_count-1);
+		while(buf->slots[k] != -1){
+			k = (k+1) & (buf->slot_count-1);
+		}
+		buf->slots[k] = i;
+	}
+
+	return 1;
+}
+
+//compare motif with an interned motif after mapping motif bases
+static int motif_equal(const char *interned, const char *motif, int len, const unsigned char *map){
+	int i;
+	for(i=0; i<len; i++){
+		if(interned[i] != (char)map[(unsigned char)motif[i]]){
+			return 0;
+		}
+	}
+	return interned[len] == '\0';
+}
+
+//get the id of motif, the motif is mapped by base map and copied into
+//buffer at the first time
+static int buffer_motif(hit_buffer *buf, const char *motif, int len, const unsigned char *map){
+	unsigned int k = motif_hash(motif, len, map) & (buf->slot_count-1);
+	int id;
+	int i;
+	char **motifs;
+	char *mapped;
+
+	while(buf->slots[k] != -1){
+		id = buf->slots[k];
+		if(motif_equal(buf->motifs[id], motif, len, map)){
+			return id;
+		}
+		k = (k+1) & (buf->slot_count-1);
+	}
+
+	if(buf->motif_count == buf->motif_capacity){
+		motifs = (char **)realloc(buf->motifs, sizeof(char *)*buf->motif_capacity*2);
+		if(motifs == NULL){
+			return -1;
+		}
+		buf->motifs = motifs;
+
+		if(buf->standards != NULL){
+			motifs = (char **)realloc(buf->standards, sizeof(char *)*buf->motif_capacity*2);
+			if(motifs == NULL){
+				return -1;
+			}
+			buf->standards = motifs;
+		}
+
+		buf->motif_capacity *= 2;
+	}
+
+	id = buf->motif_count;
+	mapped = (char *)malloc(len+1);
+	if(mapped == NULL){
+		return -1;
+	}
+	for(i=0; i<len; i++){
+		mapped[i] = map[(unsigned char)motif[i]];
+	}
+	mapped[len] = '\0';
+
+	if(buf->standards != NULL){
+		buf->standards[id] = (char *)malloc(len+1);
+		if(buf->standards[id] == NULL){
+			free(mapped);
+			return -1;
+		}
+		lookup_standard(mapped, len, buf->level, buf->standards[id]);
+	}
+
+	buf->motifs[id] = mapped;
+	buf->motif_count++;
+	buf->slots[k] = id;
+
+	//keep load factor of hash slots under 0.5
+	if(buf->motif_count*2 > buf->slot_count && !buffer_rehash(buf)){
+		return -1;
+	}
+
+	return id;
+}
+
+//append a hit, values are the fields after motif id
+static int buffer_add(hit_buffer *buf, const char *motif, int len, const int *values, const unsigned char *map){
+	int *records;
+	int *record;
+	int id = buffer_motif(buf, motif, len, map);
+
+	if(id < 0){
+		return 0;
+	}
+
+	if(buf->count == buf->capacity){
+		records = (int *)realloc(buf->records, sizeof(int)*buf->fields*buf->capacity*2);
+		if(records == NULL){
+			return 0;
+		}
+		buf->records = records;
+		buf->capacity *= 2;
+	}
+
+	record = buf->records + buf->count*buf->fields;
+	record[0] = id;
+	memcpy(record+1, values, sizeof(int)*(buf->fields-1));
+	buf->count++;
+	return 1;
+}
+
+//get space of len chars at the end of texts for the text of last hit
+static char *buffer_space(hit_buffer *buf, size_t len){
+	char *texts;
+	size_t capacity = buf->text_capacity;
+
+	while(buf->text_len+len > capacity){
+		capacity *= 2;
+	}
+
+	if(capacity > buf->text_capacity){
+		texts = (char *)realloc(buf->texts, capacity);
+		if(texts == NULL){
+			return NULL;
+		}
+		buf->texts = texts;
+		buf->text_capacity = capacity;
+	}
+
+	return buf->texts + buf->text_len;
+}
+
+//convert texts of hits to list
+static PyObject *text_list(hit_buffer *buf){
+	PyObject *result;
+	PyObject *item;
+	const char *text = buf->texts;
+	Py_ssize_t i;
+
+	result = PyList_New(buf->count);
+	if(result == NULL){
+		return NULL;
+	}
+
+	for(i=0; i<buf->count; i++){
+		item = PyUnicode_FromString(text);
+		if(item == NULL){
+			Py_DECREF(result);
+			return NULL;
+		}
+		PyList_SET_ITEM(result, i, item);
+		text += strlen(text) + 1;
+	}
+
+	return result;
+}
+
+//convert motif strings in buffer to list
+static PyObject *motif_list(char **motifs, int count){
+	PyObject *result;
+	PyObject *item;
+	int i;
+
+	result = PyList_New(count);
+	if(result == NULL){
+		return NULL;
+	}
+
+	for(i=0; i<count; i++){
+		item = PyUnicode_FromString(motifs[i]);
+		if(item == NULL){
+			Py_DECREF(result);
+			return NULL;
+		}
+		PyList_SET_ITEM(result, i, item);
+	}
+
+	return result;
+}
+
+//append an extended seed, values are the fields after motif id
+static int buffer_seed(hit_buffer *buf, const char *motif, int len, const int *values, const unsigned char *map){
+	int *seeds;
+	int *record;
+	int id = buffer_motif(buf, motif, len, map);
+
+	if(id < 0){
+		return 0;
+	}
+
+	if(buf->seed_count == buf->seed_capacity){
+		seeds = (int *)realloc(buf->seeds, sizeof(int)*SEED_FIELDS*buf->seed_capacity*2);
+		if(seeds == NULL){
+			return 0;
+		}
+		buf->seeds = seeds;
+		buf->seed_capacity *= 2;
+	}
+
+	record = buf->seeds + buf->seed_count*SEED_FIELDS;
+	record[0] = id;
+	memcpy(record+1, values, sizeof(int)*(SEED_FIELDS-1));
+	buf->seed_count++;
+	return 1;
+}
+
+//new reference of None for the item not kept
+static PyObject *none_object(PyObject *obj){
+	if(obj == NULL){
+		Py_INCREF(Py_None);
+		return Py_None;
+	}
+	return obj;
+}
+
+//convert buffer to (motifs, records) with records as bytes of int array
+//or to list of tuples with motif string and other fields, the standard
+//motifs are added as the last item or the first field if standardized,
+//the texts of hits are added as the last field or in columns mode as
+//(motifs, records, standards, texts, seeds) with the seeds as bytes of
+//int array, None for the items not kept
+static PyObject *buffer_result(hit_buffer *buf, int columns){
+	PyObject *motifs;
+	PyObject *standards = NULL;
+	PyObject *texts = NULL;
+	PyObject *seeds = NULL;
+	PyObject *result;
+	PyObject *tmp;
+	PyObject *item;
+	Py_ssize_t i;
+	int j;
+	int k;
+	int *record;
+
+	motifs = motif_list(buf->motifs, buf->motif_count);
+	if(motifs == NULL){
+		return NULL;
+	}
+
+	if(buf->standards != NULL){
+		standards = motif_list(buf->standards, buf->motif_count);
+		if(standards == NULL){
+			Py_DECREF(motifs);
+			return NULL;
+		}
+	}
+
+	if(buf->texts != NULL){
+		texts = text_list(buf);
+		if(texts == NULL){
+			Py_DECREF(motifs);
+			Py_XDECREF(standards);
+			return NULL;
+		}
+	}
+
+	if(columns){
+		tmp = PyBytes_FromStringAndSize((const char *)buf->records, sizeof(int)*buf->fields*buf->count);
+		if(tmp == NULL){
+			Py_DECREF(motifs);
+			Py_XDECREF(standards);
+			Py_XDECREF(texts);
+			return NULL;
+		}
+
+		if(texts != NULL || buf->seeds != NULL){
+			if(buf->seeds != NULL){
+				seeds = PyBytes_FromStringAndSize((const char *)buf->seeds, sizeof(int)*SEED_FIELDS*buf->seed_count);
+				if(seeds == NULL){
+					Py_DECREF(motifs);
+					Py_DECREF(tmp);
+					Py_XDECREF(standards);
+					Py_XDECREF(texts);
+					return NULL;
+				}
+			}
+
+			return Py_BuildValue("(NNNNN)", motifs, tmp, none_object(standards), none_object(texts), none_object(seeds));
+		}
+
+		if(standards != NULL){
+			return Py_BuildValue("(NNN)", motifs, tmp, standards);
+		}
+		return Py_BuildValue("(NN)", motifs, tmp);
+	}
+
+	result = PyList_New(buf->count);
+	if(result == NULL){
+		Py_DECREF(motifs);
+		Py_XDECREF(standards);
+		Py_XDECREF(texts);
+		return NULL;
+	}
+
+	k = standards != NULL;
+	for(i=0; i<buf->count; i++){
+		record = buf->records + i*buf->fields;
+		tmp = PyTuple_New(buf->fields+k+(texts != NULL));
+		if(tmp == NULL){
+			Py_DECREF(motifs);
+			Py_XDECREF(standards);
+			Py_XDECREF(texts);
+			Py_DECREF(result);
+			return NULL;
+		}
+
+		if(k){
+			item = PyList_GET_ITEM(standards, record[0]);
+			Py_INCREF(item);
+			PyTuple_SET_ITEM(tmp, 0, item);
+		}
+
+		item = PyList_GET_ITEM(motifs, record[0]);
+		Py_INCREF(item);
+		PyTuple_SET_ITEM(tmp, k, item);
+
+		for(j=1; j<buf->fields; j++){
+			PyTuple_SET_ITEM(tmp, j+k, PyLong_FromLong(record[j]));
+		}
+
+		if(texts != NULL){
+			item = PyList_GET_ITEM(texts, i);
+			Py_INCREF(item);
+			PyTuple_SET_ITEM(tmp, buf->fields+k, item);
+		}
+
+		PyList_SET_ITEM(result, i, tmp);
+	}
+
+	Py_DECREF(motifs);
+	Py_XDECREF(standards);
+	Py_XDECREF(texts);
+	return result;
+}
+
+
+//get sequence from str or any bytes-like object without copy, only the
+//region [offset, offset+length) is scanned, length -1 means to the end
+static int get_sequence(PyObject *obj, Py_ssize_t offset, Py_ssize_t length, Py_buffer *view, char **seq, size_t *len){
+	const char *data;
+	Py_ssize_t size;
+
+	view->obj = NULL;
+
+	if(PyUnicode_Check(obj)){
+		data = PyUnicode_AsUTF8AndSize(obj, &size);
+		if(data == NULL){
+			return 0;
+		}
+	}else{
+		if(PyObject_GetBuffer(obj, view, PyBUF_SIMPLE) != 0){
+			return 0;
+		}
+		data = (const char *)view->buf;
+		size = view->len;
+	}
+
+	if(length < 0){
+		length = size - offset;
+	}
+
+	if(offset < 0 || offset > size || length > size - offset){
+		PyErr_SetString(PyExc_ValueError, "offset and length out of sequence range");
+		if(view->obj != NULL){
+			PyBuffer_Release(view);
+		}
+		return 0;
+	}
+
+	*seq = (char *)data + offset;
+	*len = length;
+	return 1;
+}
+
+static void release_sequence(Py_buffer *view){
+	if(view->obj != NULL){
+		PyBuffer_Release(view);
+	}
+}
+
+//base maps of mask modes, soft-masked lowercase bases are compared as
+//they are, compared as uppercase or skipped like N
+static unsigned char mask_none[256];
+static unsigned char mask_upper[256];
+static unsigned char mask_skip[256];
+
+static void init_masks(void){
+	int i;
+	for(i=0; i<256; i++){
+		mask_none[i] = i;
+		mask_upper[i] = (i >= 'a' && i <= 'z') ? i - 32 : i;
+		mask_skip[i] = (i >= 'a' && i <= 'z') ? 78 : i;
+	}
+}
+
+static const unsigned char *get_mask(const char *mask){
+	if(strcmp(mask, "none") == 0){
+		return mask_none;
+	}else if(strcmp(mask, "upper") == 0){
+		return mask_upper;
+	}else if(strcmp(mask, "skip") == 0){
+		return mask_skip;
+	}
+
+	PyErr_SetString(PyExc_ValueError, "mask must be none, upper or skip");
+	return NULL;
+}
+
+//base of sequence at position x after mapping by mask
+#define BASE(x) (map[(unsigned char)seq[x]])
+
+//add a perfect ssr or vntr hit to buffer, start is 0-based in scanned region
+static int add_ssr(hit_buffer *buf, char *seq, const unsigned char *map, int start, int j, int repeat, Py_ssize_t offset){
+	int values[5];
+	values[0] = j;
+	values[1] = repeat;
+	values[2] = offset+start+1;
+	values[3] = offset+start+repeat*j;
+	values[4] = repeat*j;
+	return buffer_add(buf, seq+start, j, values, map);
+}
+
+//the scanners start at position pos and stop after the hit that fills the
+//buffer up to limit hits, pos is set to the position to resume the scan,
+//the scan from a position after a hit does not depend on the bases before
+//it, so a resumed scan reports the same hits as a single scan. limit 0
+//means to scan the whole region.
+
+//legacy engine, try motif length 1 to 6 at each position and rewind the
+//position after failed motif length
+static int scan_ssr_legacy(char *seq, size_t len, const unsigned char *map, int *rep, Py_ssize_t offset, hit_buffer *buf, size_t *pos, Py_ssize_t limit){
+	int start;
+	int length;
+	int repeat;
+	int i;
+	int j;
+
+	for (i=*pos; i<len; i++)
+	{
+		if (BASE(i) == 78)
+		{
+			continue;
+		}
+
+		for (j=1; j<=6; j++)
+		{
+			start = i;
+			length = j;
+
+			while(start+length<len && BASE(i)==BASE(i+j) && BASE(i)!=78){
+				i++;
+				length++;
+			}
+			repeat = length/j;
+			if(repeat>=rep[j-1])
+			{
+				if(!add_ssr(buf, seq, map, start, j, repeat, offset)){
+					return 0;
+				}
+				i = start + repeat*j;
+				j = 0;
+
+				if(limit > 0 && buf->count >= limit){
+					*pos = i;
+					return 1;
+				}
+			}
+			else
+			{
+				i = start;
+			}
+		}
+	}
+
+	*pos = len;
+	return 1;
+}
+
+//first position >= i where the run of motif length j breaks, BASE(x) is
+//equal to BASE(x+j) for all x in [i, break)
+static size_t ssr_break(char *seq, size_t len, const unsigned char *map, size_t i, int j){
+	while(i+j<len && BASE(i)==BASE(i+j) && BASE(i)!=78){
+		i++;
+	}
+	return i;
+}
+
+//first position >= i where motif length j reaches the required repeats,
+//brk keeps the break position of the last candidate of motif length j.
+//A candidate x needs BASE(y)==BASE(y+j) for all y in [x, x+need), so the
+//last position is probed first and all positions before a failed probe
+//are skipped.
+static size_t ssr_candidate(char *seq, size_t len, const unsigned char *map, size_t i, int j, size_t need, size_t *brk){
+	size_t p;
+	size_t q;
+
+	//the run from any position in [i, brk] ends at brk
+	if(*brk >= i && *brk-i >= need){
+		return i;
+	}
+
+	if(need == 0){
+		if(i < len){
+			*brk = ssr_break(seq, len, map, i, j);
+		}
+		return i < len ? i : len;
+	}
+
+	while(1){
+		p = i + need - 1;
+		if(p+j >= len){
+			return len;
+		}
+
+		if(BASE(p)!=BASE(p+j) || BASE(p)==78){
+			i = p + 1;
+			continue;
+		}
+
+		//extend the run containing p backward to i
+		q = p;
+		while(q > i && BASE(q-1)==BASE(q-1+j) && BASE(q-1)!=78){
+			q--;
+		}
+
+		*brk = ssr_break(seq, len, map, p, j);
+		if(*brk-q >= need){
+			return q;
+		}
+
+		i = *brk + 1;
+	}
+}
+
+//linear engine, each motif length keeps its own break position and next
+//candidate position that only move forward, so every base is compared
+//at most once per motif length. The same ssrs are reported as legacy
+//engine, the candidate with the smallest position and motif length wins
+//and the scan restarts from the end of the reported ssr.
+static int scan_ssr_linear(char *seq, size_t len, const unsigned char *map, int *rep, Py_ssize_t offset, hit_buffer *buf, size_t *pos, Py_ssize_t limit){
+	size_t brk[6];
+	size_t cand[6];
+	size_t need[6];
+	size_t i = *pos;
+	int repeat;
+	int j;
+	int k;
+
+	for(j=0; j<6; j++){
+		need[j] = rep[j] > 1 ? (size_t)(rep[j]-1)*(j+1) : 0;
+		brk[j] = ssr_break(seq, len, map, i, j+1);
+		cand[j] = ssr_candidate(seq, len, map, i, j+1, need[j], &brk[j]);
+	}
+
+	while(1){
+		k = 0;
+		for(j=1; j<6; j++){
+			if(cand[j] < cand[k]){
+				k = j;
+			}
+		}
+
+		i = cand[k];
+		if(i >= len){
+			break;
+		}
+
+		//positions of N are skipped by legacy engine
+		if(BASE(i) == 78){
+			cand[k] = ssr_candidate(seq, len, map, i+1, k+1, need[k], &brk[k]);
+			continue;
+		}
+
+		repeat = (brk[k]-i)/(k+1) + 1;
+		if(!add_ssr(buf, seq, map, i, k+1, repeat, offset)){
+			return 0;
+		}
+
+		i += repeat*(k+1);
+		for(j=0; j<6; j++){
+			if(cand[j] < i){
+				cand[j] = ssr_candidate(seq, len, map, i, j+1, need[j], &brk[j]);
+			}
+		}
+
+		if(limit > 0 && buf->count >= limit){
+			*pos = i;
+			return 1;
+		}
+	}
+
+	*pos = len;
+	return 1;
+}
+
+//motif of j bases at start is not a repeat of a shorter motif
+static int is_primitive(char *seq, const unsigned char *map, size_t start, int j){
+	int d;
+	int x;
+
+	for(d=1; d<=j/2; d++){
+		if(j % d){
+			continue;
+		}
+
+		for(x=d; x<j; x++){
+			if(BASE(start+x) != BASE(start+x-d)){
+				break;
+			}
+		}
+
+		if(x == j){
+			return 0;
+		}
+	}
+	return 1;
+}
+
+//length of the run with motif length j at start
+static size_t run_length(char *seq, size_t len, const unsigned char *map, size_t start, int j){
+	size_t x = start;
+	while(x+j<len && BASE(x)==BASE(x+j) && BASE(x)!=78){
+		x++;
+	}
+	return j + x - start;
+}
+
+//the primitive motif length in [j, max] that covers the most bases at
+//start, the shorter one is kept for the same coverage, so a run is not
+//reported as its first short part or with a multiple of its period,
+//length is set to the run length of returned motif length
+static int best_period(char *seq, size_t len, const unsigned char *map, size_t start, int j, int max, int mrep, size_t *length){
+	size_t best = *length/j*j;
+	size_t l;
+	int k;
+
+	for(k=j+1; k<=max && best<len-start; k++){
+		l = run_length(seq, len, map, start, k);
+		if(l/k >= mrep && l/k*k > best && is_primitive(seq, map, start, k)){
+			best = l/k*k;
+			*length = l;
+			j = k;
+		}
+	}
+	return j;
+}
+
+//search perfect satellite variable number tandem repeat, the motif
+//shorter than min motif is skipped, motif up to hexa is skipped when its
+//run is longer than 6 bp and longer one is skipped when it has min repeats,
+//with compact the primitive motif covering the most bases is reported
+static int scan_vntr_legacy(char *seq, size_t len, const unsigned char *map, int min, int max, int mrep, int compact, Py_ssize_t offset, hit_buffer *buf, size_t *pos, Py_ssize_t limit){
 	int start;
 	int length;
 	int repeat;
 	int i;
 	int j;
-	char motif[7] = "\0";
-
-	PyObject *result = PyList_New(0);
-	PyObject *tmp;
-
-	if (!PyArg_ParseTuple(args, "s(iiiiii)", &seq, &mono, &di, &tri, &tetra, &penta, &hexa)){
-		return NULL;
-	}
+	size_t best;
 
-	rep[0] = mono;
-	rep[1] = di;
-	rep[2] = tri;
-	rep[3] = tetra;
-	rep[4] = penta;
-	rep[5] = hexa;
-
-	len = strlen(seq);
-	for (i=0; i<len; i++)
+	for (i=*pos; i<len; i++)
 	{
-		if (seq[i] == 78)
+		if (BASE(i) == 78)
 		{
 			continue;
 		}
 
-		for (j=1; j<=6; j++)
+		for (j=1; j<=max; j++)
 		{
 			start = i;
 			length = j;
-
-			while(start+length<len && seq[i]==seq[i+j] && seq[i]!=78){
+			while(start+length<len && BASE(i)==BASE(i+j) && BASE(i)!=78){
 				i++;
 				length++;
 			}
 			repeat = length/j;
-			if(repeat>=rep[j-1])
-			{
-				strncpy(motif, seq+start, j);
-				motif[j] = '\0';
-				length = repeat*j;
-				tmp = Py_BuildValue("(siiiii)", motif, j, repeat, start+1, start+length, length);
-				PyList_Append(result, tmp);
-				Py_DECREF(tmp);
+			if(j<min && (j<=6 ? length>6 : repeat>=mrep)){
 				i = start + length;
 				j = 0;
 			}
+			else if(j>=min && repeat>=mrep && (!compact || is_primitive(seq, map, start, j)))
+			{
+				if(compact){
+					best = length;
+					j = best_period(seq, len, map, start, j, max, mrep, &best);
+					repeat = best/j;
+				}
+
+				if(!add_ssr(buf, seq, map, start, j, repeat, offset)){
+					return 0;
+				}
+				i = start + j*repeat;
+				j = 0;
+
+				if(limit > 0 && buf->count >= limit){
+					*pos = i;
+					return 1;
+				}
+			}
 			else
 			{
 				i = start;
 			}
 		}
 	}
-	return result;
-};
-//search perfect satellite variable number tandem repeat
-static PyObject *search_vntr(PyObject *self, PyObject *args)
-{
-	char *seq;
-	int max;
-	int min;
-	int mrep;
 
-	size_t len;
-	int start;
-	int length;
-	int repeat;
+	*pos = len;
+	return 1;
+}
+
+//k-mer length of period candidates, a repeat with motif longer than hexa
+//has at least 7 matched bases, so its period is the distance to a later
+//occurrence of the k-mer at repeat start
+#define VNTR_K 7
+
+//2-bit code of base ignoring case, 4 for N and 5 for other bases
+static unsigned char kmer_bases[256];
+
+static void init_kmer_bases(void){
 	int i;
-	int j;
-	char *motif;
+	for(i=0; i<256; i++){
+		kmer_bases[i] = 5;
+	}
+	kmer_bases['A'] = kmer_bases['a'] = 0;
+	kmer_bases['C'] = kmer_bases['c'] = 1;
+	kmer_bases['G'] = kmer_bases['g'] = 2;
+	kmer_bases['T'] = kmer_bases['t'] = 3;
+	kmer_bases['N'] = 4;
+}
 
-	PyObject *result = PyList_New(0);
-	PyObject *tmp;
+//the same search as legacy engine, motifs up to hexa are checked at each
+//position and longer motifs are only checked at the distances to next
+//occurrences of the k-mer in max motif, the next occurrences of k-mers
+//in [i, i+max] are kept in a ring buffer
+static int scan_vntr_linear(char *seq, size_t len, const unsigned char *map, int min, int max, int mrep, int compact, Py_ssize_t offset, hit_buffer *buf, size_t *pos, Py_ssize_t limit){
+	Py_ssize_t *last;
+	Py_ssize_t *ring;
+	int *codes;
+	Py_ssize_t p;
+	Py_ssize_t last_n = -1;
+	size_t mask = 1;
+	size_t added;
+	size_t rolled = 0;
+	size_t good = 0;
+	size_t start;
+	size_t length;
+	size_t i;
+	size_t x;
+	size_t y;
+	unsigned char v;
+	int roll = 0;
+	int repeat;
+	int code;
+	int short_max = max < 6 ? max : 6;
+	int j;
+	int skip;
 
-	if (!PyArg_ParseTuple(args, "siii", &seq, &min, &max, &mrep)){
-		return NULL;
+	while(mask < (size_t)max+2){
+		mask <<= 1;
 	}
 
-	len = strlen(seq);
+	last = (Py_ssize_t *)malloc(sizeof(Py_ssize_t)*(1<<(2*VNTR_K)));
+	ring = (Py_ssize_t *)malloc(sizeof(Py_ssize_t)*mask);
+	codes = (int *)malloc(sizeof(int)*mask);
+	if(last == NULL || ring == NULL || codes == NULL){
+		free(last);
+		free(ring);
+		free(codes);
+		return 0;
+	}
+	memset(last, -1, sizeof(Py_ssize_t)*(1<<(2*VNTR_K)));
+	mask -= 1;
 
-	for (i=0; i<len; i++)
-	{
-		if (seq[i] == 78)
-		{
+	i = *pos;
+	added = i;
+	while(i < len){
+		if(BASE(i) == 78){
+			i++;
 			continue;
 		}
 
-		for (j=1; j<=max; j++)
-		{
-			start = i;
-			length = j;
-			while(start+length<len && seq[i]==seq[i+j] && seq[i]!=78){
-				i++;
-				length++;
+		//add k-mers in [i, i+max] with rolling code, code is -1 if k-mer
+		//has N and -2 if k-mer has other bases
+		if(added < i){
+			added = i;
+		}
+		while(added <= i+max && added+VNTR_K <= len){
+			if(rolled != added+VNTR_K-1){
+				rolled = added;
+				good = 0;
 			}
-			repeat = length/j;
+			for(y=rolled; y<added+VNTR_K; y++){
+				v = kmer_bases[BASE(y)];
+				if(v < 4){
+					roll = ((roll<<2) | v) & ((1<<(2*VNTR_K))-1);
+					good++;
+				}else{
+					good = 0;
+					if(v == 4){
+						last_n = y;
+					}
+				}
+			}
+			rolled = y;
+
+			if(good >= VNTR_K){
+				code = roll;
+			}else{
+				code = last_n >= (Py_ssize_t)added ? -1 : -2;
+			}
+
+			codes[added & mask] = code;
+			ring[added & mask] = -1;
+			if(code >= 0){
+				p = last[code];
+				if(p >= (Py_ssize_t)i){
+					ring[p & mask] = added;
+				}
+				last[code] = added;
+			}
+			added++;
+		}
+
+		start = i;
+		length = 0;
+		skip = 0;
+
+		//motifs up to hexa
+		for(j=1; j<=short_max; j++){
+			x = i;
+			while(x+j<len && BASE(x)==BASE(x+j) && BASE(x)!=78){
+				x++;
+			}
+			length = j + x - i;
 			if(j<min && length>6){
-				i = start + length;
-				j = 0;
+				skip = 1;
+				break;
+			}else if(j>=min && length/j>=mrep && (!compact || is_primitive(seq, map, i, j))){
+				break;
 			}
-			else if(j>=min && repeat>=mrep)
-			{
-				motif = (char *)malloc(j+1);
-				strncpy(motif, seq+start, j);
-				motif[j] = '\0';
-				length = j*repeat;
-				tmp = Py_BuildValue("(siiiii)", motif, j, repeat, start+1, start+length, length);
-				PyList_Append(result, tmp);
-				Py_DECREF(tmp);
-				i = start + length;
-				j = 0;
+		}
+
+		//longer motifs at candidate periods
+		if(j > short_max){
+			code = i+VNTR_K <= len ? codes[i & mask] : -1;
+			p = code == -2 ? (Py_ssize_t)i+short_max+1 : (code >= 0 ? ring[i & mask] : -1);
+			while(p != -1 && p-(Py_ssize_t)i <= max){
+				j = p - i;
+				if(j > short_max){
+					x = i;
+					while(x+j<len && BASE(x)==BASE(x+j) && BASE(x)!=78){
+						x++;
+					}
+					length = j + x - i;
+					if(length/j >= mrep && (j < min || !compact || is_primitive(seq, map, i, j))){
+						skip = j < min;
+						break;
+					}
+				}
+				p = code == -2 ? p+1 : ring[p & mask];
 			}
-			else
-			{
-				i = start;
+
+			if(p == -1 || p-(Py_ssize_t)i > max){
+				i++;
+				continue;
 			}
 		}
+
+		if(skip){
+			i = start + length;
+			continue;
+		}
+
+		if(compact){
+			j = best_period(seq, len, map, start, j, max, mrep, &length);
+		}
+
+		repeat = length/j;
+		if(!add_ssr(buf, seq, map, start, j, repeat, offset)){
+			free(last);
+			free(ring);
+			free(codes);
+			return 0;
+		}
+		i = start + j*repeat;
+
+		if(limit > 0 && buf->count >= limit){
+			*pos = i;
+			break;
+		}
 	}
-	return result;
-};
 
-//search imperfect microsatellites
-//static void print_matrix(int **matrix, int size){
-//	int i;
-//	int j;
-//	for(i=0;i<size;i++){
-//		for(j=0;j<size;j++){
-//			printf("%2d ", *(matrix[i]+j));
-//		}
-//		printf("\n");
-//	}
-//}
+	free(last);
+	free(ring);
+	free(codes);
+	if(i >= len){
+		*pos = len;
+	}
+	return 1;
+}
 
 static int min_three(int a, int b, int c){
 	int d;
@@ -155,185 +1196,200 @@ static int min_three(int a, int b, int c){
 	return d<c?d:c;
 }
 
-static int** initial_matrix(int size){
-	int i;
-	int **matrix = (int **)malloc(sizeof(int *)*size);
-	for(i=0; i<=size; i++){
-		matrix[i] = (int *)malloc(sizeof(int)*size);
-	}
+//edit distance matrix of the extension of motif along sequence, only the
+//cells in the diagonal band |x-y| <= band are kept in one contiguous
+//workspace, row x of motif is stored at x*width and the cell of column y
+//at the offset y-x+band+1 in the row, the cells out of the band are
+//infinite and the first and last cell of each row are kept infinite, so
+//the neighbours of a band cell are read without checking the band
+#define BAND_INF (1<<28)
 
-	for(i=0; i<=size; i++){
-		matrix[i][0] = i;
-		matrix[0][i] = i;
-	}
+typedef struct {
+	int *cells;
+	size_t capacity;
+	int size;
+	int band;
+	int width;
+	int rows;
+	int cols;
+} band_matrix;
 
-	return matrix;
+static void band_init(band_matrix *m, int size){
+	m->cells = NULL;
+	m->capacity = 0;
+	m->size = size;
+	m->band = -1;
 }
 
-static void release_matrix(int **matrix, int size){
-	int i;
-	for(i=0; i<=size; i++){
-		free(matrix[i]);
-	}
-	free(matrix);
+static void band_free(band_matrix *m){
+	free(m->cells);
+	m->cells = NULL;
 }
 
-static int* build_left_matrix(char *seq, char *motif, int **matrix, int start, int size, int max_error){
-	char ref1;
-	char ref2;
-	int i = 0;
-	int j = 0;
-	int x = 0;
-	int y = 0;
-	int last_x = 0;
-	int last_y = 0;
-	size_t mlen = strlen(motif); //motif length
-	int error = 0; //consective errors
-	int smaller;
-	
-	static int res[2]; //result arrary
+//initialize the infinite cells and the cell of column 0 in row x, the
+//cells of row 0 are the distances to column 0
+static void band_row(band_matrix *m, int x){
+	int *row = m->cells + x*m->width;
+	int y;
 
-	for(x=1,y=1; x<=size && y<=size; x++,y++){
-		ref1 = seq[start-y];
-		ref2 = motif[(mlen-x%mlen)%mlen];
-		
-		//fill column, column number fixed
-		if(i != y){
-			for(i=1; i<x; i++){
-				if(ref1 == motif[(mlen-i%mlen)%mlen]){
-					matrix[i][y] = matrix[i-1][y-1];
-				}else{
-					matrix[i][y] = min_three(matrix[i-1][y-1], matrix[i-1][y], matrix[i][y-1]) + 1;
-				}
-			}
+	row[0] = BAND_INF;
+	row[m->width-1] = BAND_INF;
+
+	if(x == 0){
+		for(y=0; y<=m->band; y++){
+			row[y+m->band+1] = y;
 		}
-		//fill row, row number fixed
-		if(j != x){
-			for(j=1; j<y; j++){
-				if(ref2 == seq[start-j]){
-					matrix[x][j] = matrix[x-1][j-1];
-				}else{
-					matrix[x][j] = min_three(matrix[x-1][j-1], matrix[x-1][j], matrix[x][j-1]) + 1;
-				}
-			}
+	}else if(x <= m->band){
+		row[m->band+1-x] = x;
+	}
+}
+
+//clear matrix for a new extension with band, the workspace is enlarged
+//when the band is wider than before, row 0 is kept for the same band
+static int band_reset(band_matrix *m, int band){
+	size_t need;
+	int *cells;
+
+	if(band > m->size+1){
+		band = m->size+1;
+	}
+
+	need = (size_t)(m->size+1)*(2*band+3);
+	if(need > m->capacity){
+		cells = (int *)realloc(m->cells, sizeof(int)*need);
+		if(cells == NULL){
+			return 0;
 		}
+		m->cells = cells;
+		m->capacity = need;
+	}
 
-		i = y;
-		j = x;
+	m->rows = 0;
+	m->cols = 0;
+	if(m->band != band){
+		m->band = band;
+		m->width = 2*band+3;
+		band_row(m, 0);
+	}
+	return 1;
+}
 
-		if(ref1 == ref2){
-			matrix[x][y] = matrix[x-1][y-1];
-			error = 0;
-		}else{
-			if(error == 0){
-				last_x = x - 1;
-				last_y = y - 1;
-			}
-			
-			error++;
+static int band_get(band_matrix *m, int x, int y){
+	if(y-x > m->band || x-y > m->band){
+		return BAND_INF;
+	}
+	return m->cells[x*m->width+y-x+m->band+1];
+}
 
-			if(error > max_error){
-				break;
-			}
-			
-			matrix[x][y] = min_three(matrix[x-1][y-1], matrix[x-1][y], matrix[x][y-1]) + 1;
-		}
-		
-		smaller = min_three(matrix[x][y], matrix[x-1][y], matrix[x][y-1]);
-		if(smaller != matrix[x][y]){
-			if(matrix[x-1][y] != matrix[x][y-1]){
-				if(smaller == matrix[x][y-1]){
-					y -= 1;
-				}else{
-					x -= 1;
-				}
-			}
+//motif base of row x, the motif is read backward when extending to left
+static char motif_base(const char *motif, int mlen, int x, int dir){
+	return dir < 0 ? motif[(mlen-x%mlen)%mlen] : motif[(x-1)%mlen];
+}
+
+static void band_cell(band_matrix *m, int x, int y, int same){
+	int *cell = m->cells + x*m->width + y-x+m->band+1;
+	int cost = *(cell-m->width);
+	if(!same){
+		cost = min_three(cost, *(cell-m->width+1), *(cell-1)) + 1;
+	}
+	*cell = cost;
+}
+
+//fill the band cells of new columns and rows to make the filled part of
+//matrix cover rows 1 to x and columns 1 to y
+static void band_fill(char *seq, const unsigned char *map, const char *motif, int mlen, band_matrix *m, int start, int dir, int x, int y){
+	char ref;
+	int r;
+	int c;
+
+	for(c=m->cols+1; c<=y; c++){
+		ref = BASE(start+dir*c);
+		for(r=c-m->band>1?c-m->band:1; r<=m->rows && r<=c+m->band; r++){
+			band_cell(m, r, c, ref==motif_base(motif, mlen, r, dir));
 		}
 	}
+	if(y > m->cols){
+		m->cols = y;
+	}
 
-	if(error){
-		res[0] = last_x;
-		res[1] = last_y;
-	}else{
-		res[0] = --x;
-		res[1] = --y;
+	for(r=m->rows+1; r<=x; r++){
+		band_row(m, r);
+		ref = motif_base(motif, mlen, r, dir);
+		for(c=r-m->band>1?r-m->band:1; c<=m->cols && c<=r+m->band; c++){
+			band_cell(m, r, c, ref==BASE(start+dir*c));
+		}
+	}
+	if(x > m->rows){
+		m->rows = x;
 	}
-	return res;
 }
 
-static int* build_right_matrix(char *seq, char *motif, int **matrix, int start, int size, int max_error){
+//extend motif from start to left (dir -1) or right (dir 1) along the
+//diagonal until max consecutive edits, res is set to the end cell of
+//extension and the cell where it stops for edits, -1 if it stops for
+//size. The band cells are the same as full matrix if their edit
+//distance is less than band, a path cell reaching band stops the
+//extension and returns 0 to retry with a wider band, so the path and its
+//neighbours are always exact.
+static int band_extend(char *seq, const unsigned char *map, const char *motif, band_matrix *m, int start, int dir, int size, int max_error, int *res){
 	char ref1;
 	char ref2;
-	int i = 0;
-	int j = 0;
 	int x = 0;
 	int y = 0;
 	int last_x = 0;
 	int last_y = 0;
-	size_t mlen = strlen(motif); //motif length
+	int mlen = strlen(motif); //motif length
 	int error = 0; //consective errors
 	int smaller;
-	
-	static int res[2]; //result arrary
+	int cell;
+	int up;
+	int left;
 
 	for(x=1,y=1; x<=size && y<=size; x++,y++){
-		ref1 = seq[start+y];
-		ref2 = motif[(x-1)%mlen];
-		
-		//fill column, column number fixed
-		if(i != y){
-			for(i=1; i<x; i++){
-				if(ref1 == motif[(i-1)%mlen]){
-					matrix[i][y] = matrix[i-1][y-1];
-				}else{
-					matrix[i][y] = min_three(matrix[i-1][y-1], matrix[i-1][y], matrix[i][y-1]) + 1;
-				}
-			}
-		}
-		//fill row, row number fixed
-		if(j != x){
-			for(j=1; j<y; j++){
-				if(ref2 == seq[start+j]){
-					matrix[x][j] = matrix[x-1][j-1];
-				}else{
-					matrix[x][j] = min_three(matrix[x-1][j-1], matrix[x-1][j], matrix[x][j-1]) + 1;
-				}
-			}
-		}
-
-		i = y;
-		j = x;
+		ref1 = BASE(start+dir*y);
+		ref2 = motif_base(motif, mlen, x, dir);
+		band_fill(seq, map, motif, mlen, m, start, dir, x, y);
 
 		if(ref1 == ref2){
-			matrix[x][y] = matrix[x-1][y-1];
 			error = 0;
 		}else{
 			if(error == 0){
 				last_x = x - 1;
 				last_y = y - 1;
 			}
-			
+
 			error++;
 
 			if(error > max_error){
 				break;
 			}
-			
-			matrix[x][y] = min_three(matrix[x-1][y-1], matrix[x-1][y], matrix[x][y-1]) + 1;
 		}
 
-		smaller = min_three(matrix[x][y], matrix[x-1][y], matrix[x][y-1]);
-		if(smaller != matrix[x][y]){
-			if(matrix[x-1][y] != matrix[x][y-1]){
-				if(smaller == matrix[x][y-1]){
-					y -= 1;
-				}else{
-					x -= 1;
-				}
+		cell = band_get(m, x, y);
+		if(cell >= m->band){
+			return 0;
+		}
+
+		up = band_get(m, x-1, y);
+		left = band_get(m, x, y-1);
+		smaller = min_three(cell, up, left);
+		if(smaller != cell && up != left){
+			if(smaller == left){
+				y -= 1;
+			}else{
+				x -= 1;
 			}
 		}
 	}
 
+	if(error > max_error){
+		res[2] = x;
+		res[3] = y;
+	}else{
+		res[2] = -1;
+		res[3] = -1;
+	}
+
 	if(error){
 		res[0] = last_x;
 		res[1] = last_y;
@@ -341,26 +1397,50 @@ static int* build_right_matrix(char *seq, char *motif, int **matrix, int start,
 		res[0] = --x;
 		res[1] = --y;
 	}
-	return res;
+	return 1;
+}
+
+//extend with a band of four times of max edits at first and double the band
+//until the extension is exact
+static int extend_matrix(char *seq, const unsigned char *map, const char *motif, band_matrix *m, int start, int dir, int size, int max_error, int *res){
+	int band = 4*(max_error+1);
+
+	while(1){
+		if(!band_reset(m, band)){
+			return 0;
+		}
+
+		if(band_extend(seq, map, motif, m, start, dir, size, max_error, res)){
+			return 1;
+		}
+
+		band *= 2;
+	}
 }
 
-static int backtrace_matrix(int **matrix, int *diagonal, int *mat, int *sub, int *ins, int *del){
+//count edits on the path from end cell to the origin, rest is set to 1
+//if the path stops at the border before the origin
+static int backtrace_matrix(band_matrix *m, int *diagonal, int *mat, int *sub, int *ins, int *del, int *rest){
 	int i = *diagonal;
 	int j = *(diagonal+1);
 	int cost;
+	int diag;
+	int up;
 	int r = j;
 
 	while(i>0 && j>0){
-		cost = min_three(matrix[i-1][j-1], matrix[i-1][j], matrix[i][j-1]);
-		if(cost == matrix[i-1][j-1]){
-			if(cost == matrix[i][j]){
+		diag = band_get(m, i-1, j-1);
+		up = band_get(m, i-1, j);
+		cost = min_three(diag, up, band_get(m, i, j-1));
+		if(cost == diag){
+			if(cost == band_get(m, i, j)){
 				*mat += 1;
 			}else{
 				*sub += 1;
 			}
 			i--;
 			j--;
-		}else if(cost == matrix[i-1][j]){
+		}else if(cost == up){
 			*del += 1;
 			i--;
 		}else{
@@ -375,56 +1455,254 @@ static int backtrace_matrix(int **matrix, int *diagonal, int *mat, int *sub, int
 		*ins += 1;
 	}
 
+	*rest = i>0 || j>0;
 	return r;
 }
 
-//search imperfect ssr method
-static PyObject *search_issr(PyObject *self, PyObject *args)
+//runs of alignment operations to a perfect repeat of motif, = match,
+//X mismatch, I base inserted in sequence and D motif base deleted
+typedef struct {
+	char *ops;
+	int *lens;
+	int count;
+	int capacity;
+} cigar_runs;
+
+static void cigar_init(cigar_runs *c){
+	c->ops = NULL;
+	c->lens = NULL;
+	c->count = 0;
+	c->capacity = 0;
+}
+
+static void cigar_free(cigar_runs *c){
+	free(c->ops);
+	free(c->lens);
+}
+
+//add len operations, the same operation as last run is merged into it
+static int cigar_push(cigar_runs *c, char op, int len){
+	char *ops;
+	int *lens;
+	int capacity;
+
+	if(len <= 0){
+		return 1;
+	}
+
+	if(c->count && c->ops[c->count-1] == op){
+		c->lens[c->count-1] += len;
+		return 1;
+	}
+
+	if(c->count == c->capacity){
+		capacity = c->capacity ? c->capacity*2 : 64;
+		ops = (char *)realloc(c->ops, capacity);
+		if(ops == NULL){
+			return 0;
+		}
+		c->ops = ops;
+
+		lens = (int *)realloc(c->lens, sizeof(int)*capacity);
+		if(lens == NULL){
+			return 0;
+		}
+		c->lens = lens;
+		c->capacity = capacity;
+	}
+
+	c->ops[c->count] = op;
+	c->lens[c->count] = len;
+	c->count++;
+	return 1;
+}
+
+//add operations on the same path of backtrace_matrix from end cell to
+//the origin, the rest of path at the border is kept as gaps
+static int trace_matrix(band_matrix *m, int *diagonal, cigar_runs *c){
+	int i = *diagonal;
+	int j = *(diagonal+1);
+	int cost;
+	int diag;
+	int up;
+	char op;
+
+	while(i>0 && j>0){
+		diag = band_get(m, i-1, j-1);
+		up = band_get(m, i-1, j);
+		cost = min_three(diag, up, band_get(m, i, j-1));
+		if(cost == diag){
+			op = cost == band_get(m, i, j) ? '=' : 'X';
+			i--;
+			j--;
+		}else if(cost == up){
+			op = 'D';
+			i--;
+		}else{
+			op = 'I';
+			j--;
+		}
+
+		if(!cigar_push(c, op, 1)){
+			return 0;
+		}
+	}
+
+	return cigar_push(c, 'D', i) && cigar_push(c, 'I', j);
+}
+
+//write runs as CIGAR text of last hit in buffer, a leading N skips the
+//bases of the first motif copy before the start of alignment
+static int cigar_text(hit_buffer *buf, cigar_runs *c, int skip){
+	char *text = buffer_space(buf, (size_t)(c->count+1)*12+1);
+	int n = 0;
+	int k;
+
+	if(text == NULL){
+		return 0;
+	}
+
+	if(skip){
+		n += sprintf(text, "%dN", skip);
+	}
+
+	for(k=0; k<c->count; k++){
+		n += sprintf(text+n, "%d%c", c->lens[k], c->ops[k]);
+	}
+
+	text[n] = '\0';
+	buf->text_len += n+1;
+	return 1;
+}
+
+//write the alignment of an extended seed as CIGAR, the extensions are
+//repeated with the same result of the scan, the left runs are in the
+//order of sequence and the right runs are reversed
+static int issr_cigar(char *seq, size_t seqlen, const unsigned char *map, const char *motif, band_matrix *matrix, int seed_start, int seed_end,
+	int size, int max_errors, cigar_runs *runs, hit_buffer *buf){
+	int mlen = strlen(motif);
+	int extend_end[4];
+	size_t extend_len;
+	int bases = 0;
+	int k;
+
+	runs[0].count = 0;
+	runs[1].count = 0;
+
+	extend_len = seed_start;
+	if(extend_len > size){
+		extend_len = size;
+	}
+	if(!extend_matrix(seq, map, motif, matrix, seed_start, -1, extend_len, max_errors, extend_end) || !trace_matrix(matrix, extend_end, &runs[0])){
+		return 0;
+	}
+
+	//motif bases aligned before the seed
+	for(k=0; k<runs[0].count; k++){
+		if(runs[0].ops[k] != 'I'){
+			bases += runs[0].lens[k];
+		}
+	}
+
+	if(!cigar_push(&runs[0], '=', seed_end-seed_start+1)){
+		return 0;
+	}
+
+	extend_len = seqlen - seed_end - 1;
+	if(extend_len > size){
+		extend_len = size;
+	}
+	if(!extend_matrix(seq, map, motif, matrix, seed_end, 1, extend_len, max_errors, extend_end) || !trace_matrix(matrix, extend_end, &runs[1])){
+		return 0;
+	}
+
+	for(k=runs[1].count-1; k>=0; k--){
+		if(!cigar_push(&runs[0], runs[1].ops[k], runs[1].lens[k])){
+			return 0;
+		}
+	}
+
+	return cigar_text(buf, &runs[0], (mlen-bases%mlen)%mlen);
+}
+
+//a rejected seed of each motif length and phase, the seed start is
+//indexed by seed start % motif length plus the offset of motif length
+#define ISSR_SLOTS 21
+static const int slot_offset[7] = {0, 0, 1, 3, 6, 10, 15};
+
+typedef struct {
+	int seed_start;
+	int seed_end;
+	char motif[7];
+	int left_x;
+	int left_y;
+	int right_len;
+	int right[4];
+} issr_slot;
+
+//counters of qualified seeds, seeds skipped in a rejected extension and
+//reused right extensions, summed over all scans in the process
+#define ISSR_SEEDS 0
+#define ISSR_SKIPPED 1
+#define ISSR_REUSED 2
+static size_t issr_totals[3];
+
+//search imperfect ssr method, params are seed repeats, seed length,
+//max consecutive edits, mismatch penalty, gap penalty, required score and
+//extension size, the CIGAR of each hit is kept if runs is not NULL and
+//every extended seed is kept if seeds of buffer is not NULL, so that the
+//hits can be selected again with other penalties and required score
+//
+//a later seed of the same motif and phase in the run of rejected seed has
+//the same right extension, and its left extension is the left extension
+//of rejected seed shifted by the bases between them if the extension
+//stops for edits within size and its path ends at the origin, so it
+//gets the same result and is rejected without extension, otherwise only
+//the right extension is reused
+static int scan_issr(char *seq, size_t seqlen, const unsigned char *map, int *params, band_matrix *matrix, Py_ssize_t offset, hit_buffer *buf, size_t *pos, Py_ssize_t limit, size_t *counters,
+	cigar_runs *runs)
 {
 	int i;
 	int j;
-	char *seq;
-	size_t seqlen;
+	int k;
 	int seed_start;
 	int seed_end;
 	int seed_length;
 	int seed_repeat;
-	int seed_repeats;
-	int seed_minlen;
-	int max_errors;
-	int size;
+	int seed_repeats = params[0];
+	int seed_minlen = params[1];
+	int max_errors = params[2];
+	int mis_penalty = params[3];
+	int gap_penalty = params[4];
+	int required_score = params[5];
+	int size = params[6];
 	char motif[7] = "\0";
 	int start;
 	int end;
 	int extend_start;
 	size_t extend_len;
 	size_t extend_max_len;
-	int *extend_end;
+	int extend_end[4];
+	int rest;
+	int room;
+	issr_slot slots[ISSR_SLOTS];
+	issr_slot *slot;
 	int length;
 	int matches;
 	int substitution;
 	int insertion;
 	int deletion;
-	int required_score;
-	int mis_penalty;
-	int gap_penalty;
 	int score;
+	int values[9];
+	int seed[SEED_FIELDS-1];
 
-	PyObject *result = PyList_New(0);
-	PyObject *tmp;
-
-	if (!PyArg_ParseTuple(args, "siiiiiii", &seq, &seed_repeats, &seed_minlen, &max_errors, &mis_penalty, &gap_penalty, &required_score, &size)){
-		return NULL;
+	for(k=0; k<ISSR_SLOTS; k++){
+		slots[k].seed_end = -1;
 	}
 
-	//create edit distance matrix
-	int **matrix = initial_matrix(size);
-
-	seqlen = strlen(seq);
-
-	for (i=0; i<seqlen; i++)
+	for (i=*pos; i<seqlen; i++)
 	{
-		if (seq[i] == 78)
+		if (BASE(i) == 78)
 		{
 			continue;
 		}
@@ -433,7 +1711,7 @@ static PyObject *search_issr(PyObject *self, PyObject *args)
 		{
 			seed_start = i;
 			seed_length = j;
-			while(seed_start+seed_length<seqlen && seq[i]==seq[i+j] && seq[i]!=78)
+			while(seed_start+seed_length<seqlen && BASE(i)==BASE(i+j) && BASE(i)!=78)
 			{
 				i++;
 				seed_length++;
@@ -441,7 +1719,9 @@ static PyObject *search_issr(PyObject *self, PyObject *args)
 			seed_repeat = seed_length/j;
 			if(seed_repeat >= seed_repeats && seed_length >= seed_minlen)
 			{
-				strncpy(motif, seq+seed_start, j);
+				for(k=0; k<j; k++){
+					motif[k] = BASE(seed_start+k);
+				}
 				motif[j] = '\0';
 
 				//seed end is the same to seed start 0-based coodinates
@@ -450,6 +1730,23 @@ static PyObject *search_issr(PyObject *self, PyObject *args)
 				insertion = 0;
 				deletion = 0;
 				substitution = 0;
+				counters[ISSR_SEEDS]++;
+
+				slot = &slots[slot_offset[j]+seed_start%j];
+				if(slot->seed_end != seed_end || strcmp(slot->motif, motif) != 0){
+					slot->seed_end = seed_end;
+					strcpy(slot->motif, motif);
+					slot->right_len = -1;
+				}else if(slot->left_x >= 0 && buf->seeds == NULL){
+					//skip seed in the rejected extension, only the rejection
+					//is known, so it is extended when seeds are kept
+					room = seed_start < size ? seed_start : size;
+					if(slot->left_x+seed_start-slot->seed_start <= room && slot->left_y+seed_start-slot->seed_start <= room){
+						counters[ISSR_SKIPPED]++;
+						i = seed_start;
+						continue;
+					}
+				}
 
 				//extend left
 				extend_start = seed_start;
@@ -457,38 +1754,105 @@ static PyObject *search_issr(PyObject *self, PyObject *args)
 				if(extend_max_len > size){
 					extend_max_len = size;
 				}
-				extend_end = build_left_matrix(seq, motif, matrix, extend_start, extend_max_len, max_errors);
-				extend_len = backtrace_matrix(matrix, extend_end, &matches, &substitution, &insertion, &deletion);
+				if(!extend_matrix(seq, map, motif, matrix, extend_start, -1, extend_max_len, max_errors, extend_end)){
+					return 0;
+				}
+				extend_len = backtrace_matrix(matrix, extend_end, &matches, &substitution, &insertion, &deletion, &rest);
 				start = extend_start - extend_len + 1;
 
+				slot->seed_start = seed_start;
+				slot->left_x = rest ? -1 : extend_end[2];
+				slot->left_y = extend_end[3];
+
 				//extend right
 				extend_start = seed_end;
-				extend_max_len = seqlen - extend_start - 1;
-				if(extend_max_len > size){
-					extend_max_len = size;
+				if(slot->right_len >= 0){
+					counters[ISSR_REUSED]++;
+				}else{
+					extend_max_len = seqlen - extend_start - 1;
+					if(extend_max_len > size){
+						extend_max_len = size;
+					}
+					if(!extend_matrix(seq, map, motif, matrix, extend_start, 1, extend_max_len, max_errors, extend_end)){
+						return 0;
+					}
+					memset(slot->right, 0, sizeof(slot->right));
+					slot->right_len = backtrace_matrix(matrix, extend_end, &slot->right[0], &slot->right[1], &slot->right[2], &slot->right[3], &rest);
 				}
-				extend_end = build_right_matrix(seq, motif, matrix, extend_start, extend_max_len, max_errors);
-				extend_len = backtrace_matrix(matrix, extend_end, &matches, &substitution, &insertion, &deletion);
-				end = extend_start + extend_len + 1;
+				matches += slot->right[0];
+				substitution += slot->right[1];
+				insertion += slot->right[2];
+				deletion += slot->right[3];
+				end = extend_start + slot->right_len + 1;
 
 				length = end - start + 1;
 				
 				score = matches - substitution*mis_penalty - (insertion+deletion)*gap_penalty;
+
+				if(buf->seeds != NULL){
+					seed[0] = j;
+					seed[1] = offset+seed_start+1;
+					seed[2] = seed_length;
+					seed[3] = offset+start;
+					seed[4] = offset+end;
+					seed[5] = matches;
+					seed[6] = substitution;
+					seed[7] = insertion;
+					seed[8] = deletion;
+					seed[9] = score>=required_score ? 1 : seed_length>=required_score ? 2 : 0;
+					if(!buffer_seed(buf, motif, j, seed, map)){
+						return 0;
+					}
+				}
 				
 				if(score>=required_score){
-					tmp = Py_BuildValue("(siiiiiiiii)", motif, j, start, end, length, matches, substitution, insertion, deletion, score);
-					PyList_Append(result, tmp);
-					Py_DECREF(tmp);
-					i = end;
-					j = 0;
+					values[0] = j;
+					values[1] = offset+start;
+					values[2] = offset+end;
+					values[3] = length;
+					values[4] = matches;
+					values[5] = substitution;
+					values[6] = insertion;
+					values[7] = deletion;
+					values[8] = score;
 				}else if(seed_length>=required_score){
 					start = seed_start + 1;
 					end = seed_start + seed_length;
-					tmp = Py_BuildValue("(siiiiiiiii)", motif, j, start, end, seed_length, seed_length, 0, 0, 0, seed_length);
-					PyList_Append(result, tmp);
-					Py_DECREF(tmp);
+					values[0] = j;
+					values[1] = offset+start;
+					values[2] = offset+end;
+					values[3] = seed_length;
+					values[4] = seed_length;
+					values[5] = 0;
+					values[6] = 0;
+					values[7] = 0;
+					values[8] = seed_length;
+				}
+
+				if(score>=required_score || seed_length>=required_score){
+					if(!buffer_add(buf, motif, j, values, map)){
+						return 0;
+					}
+
+					if(runs != NULL){
+						if(score>=required_score){
+							if(!issr_cigar(seq, seqlen, map, motif, matrix, seed_start, seed_end, size, max_errors, runs, buf)){
+								return 0;
+							}
+						}else{
+							runs[0].count = 0;
+							if(!cigar_push(&runs[0], '=', seed_length) || !cigar_text(buf, &runs[0], 0)){
+								return 0;
+							}
+						}
+					}
 					i = end;
 					j = 0;
+
+					if(limit > 0 && buf->count >= limit){
+						*pos = i;
+						return 1;
+					}
 				}else{
 					i = seed_start;
 				}
@@ -498,14 +1862,729 @@ static PyObject *search_issr(PyObject *self, PyObject *args)
 		}
 	}
 
-	release_matrix(matrix, size);
+	*pos = seqlen;
+	return 1;
+}
+
+#define SCAN_SSR 0
+#define SCAN_VNTR 1
+#define SCAN_ISSR 2
+
+//parameters and progress of a scan
+typedef struct {
+	int kind;
+	int params[9];
+	int legacy;
+	int columns;
+	int level;
+	const unsigned char *map;
+	PyObject *obj;
+	Py_buffer view;
+	char *seq;
+	size_t len;
+	Py_ssize_t offset;
+	size_t position;
+} scan_task;
+
+//parse arguments of search function, batch is only parsed for iterators
+static int parse_task(int kind, PyObject *args, PyObject *kwargs, scan_task *task, Py_ssize_t *batch){
+	PyObject *obj;
+	Py_ssize_t length = -1;
+	Py_ssize_t start = 0;
+	char *engine = "linear";
+	char *mask = "none";
+	int *p = task->params;
+	int ok = 0;
+
+	static char *ssr_keywords[] = {"seq", "repeats", "columns", "offset", "length", "mask", "level", "engine", NULL};
+	static char *ssr_iter_keywords[] = {"seq", "repeats", "columns", "offset", "length", "mask", "level", "engine", "batch", NULL};
+	static char *vntr_keywords[] = {"seq", "min_motif", "max_motif", "min_repeat", "columns", "offset", "length", "mask", "level", "compact", "engine", NULL};
+	static char *vntr_iter_keywords[] = {"seq", "min_motif", "max_motif", "min_repeat", "columns", "offset", "length", "mask", "level", "compact", "engine", "batch", NULL};
+	static char *issr_keywords[] = {"seq", "seed_repeat", "seed_length", "max_edits", "mis_penalty",
+		"gap_penalty", "min_score", "size", "columns", "offset", "length", "mask", "level", "cigar", "seeds", "start", NULL};
+	static char *issr_iter_keywords[] = {"seq", "seed_repeat", "seed_length", "max_edits", "mis_penalty",
+		"gap_penalty", "min_score", "size", "columns", "offset", "length", "mask", "level", "cigar", "seeds", "start", "batch", NULL};
+
+	task->kind = kind;
+	task->legacy = 0;
+	task->columns = 0;
+	task->level = 0;
+	task->offset = 0;
+	task->position = 0;
+	task->obj = NULL;
+	task->view.obj = NULL;
+
+	switch(kind){
+		case SCAN_SSR:
+			ok = PyArg_ParseTupleAndKeywords(args, kwargs, batch ? "O(iiiiii)|pnnsisn" : "O(iiiiii)|pnnsis", batch ? ssr_iter_keywords : ssr_keywords,
+				&obj, &p[0], &p[1], &p[2], &p[3], &p[4], &p[5], &task->columns, &task->offset, &length, &mask, &task->level, &engine, batch);
+			break;
+		case SCAN_VNTR:
+			//overlapping calls are resolved by default
+			p[3] = 1;
+			ok = PyArg_ParseTupleAndKeywords(args, kwargs, batch ? "Oiii|pnnsipsn" : "Oiii|pnnsips", batch ? vntr_iter_keywords : vntr_keywords,
+				&obj, &p[0], &p[1], &p[2], &task->columns, &task->offset, &length, &mask, &task->level, &p[3], &engine, batch);
+			break;
+		case SCAN_ISSR:
+			//alignments and extended seeds are not kept by default
+			p[7] = 0;
+			p[8] = 0;
+			ok = PyArg_ParseTupleAndKeywords(args, kwargs, batch ? "Oiiiiiii|pnnsippnn" : "Oiiiiiii|pnnsippn", batch ? issr_iter_keywords : issr_keywords,
+				&obj, &p[0], &p[1], &p[2], &p[3], &p[4], &p[5], &p[6], &task->columns, &task->offset, &length, &mask, &task->level, &p[7], &p[8],
+				&start, batch);
+			break;
+	}
+
+	if(!ok){
+		return 0;
+	}
+
+	if(strcmp(engine, "linear") == 0){
+		task->legacy = 0;
+	}else if(strcmp(engine, "legacy") == 0){
+		task->legacy = 1;
+	}else{
+		PyErr_SetString(PyExc_ValueError, "engine must be linear or legacy");
+		return 0;
+	}
+
+	task->map = get_mask(mask);
+	if(task->map == NULL){
+		return 0;
+	}
+
+	if(task->level < 0 || task->level > 4){
+		PyErr_SetString(PyExc_ValueError, "level must be in 0 to 4");
+		return 0;
+	}
+
+	if(kind == SCAN_VNTR && (p[0] < 1 || p[2] < 2)){
+		PyErr_SetString(PyExc_ValueError, "min_motif must be at least 1 and min_repeat at least 2");
+		return 0;
+	}
+
+	if(kind == SCAN_ISSR && p[8] && !task->columns){
+		PyErr_SetString(PyExc_ValueError, "seeds are only kept in columns mode");
+		return 0;
+	}
+
+	if(batch && *batch <= 0){
+		PyErr_SetString(PyExc_ValueError, "batch must be positive");
+		return 0;
+	}
+
+	if(!get_sequence(obj, task->offset, length, &task->view, &task->seq, &task->len)){
+		return 0;
+	}
+
+	//bases before start are only read by the extensions of imperfect ssr
+	if(start < 0 || start > task->len){
+		release_sequence(&task->view);
+		PyErr_SetString(PyExc_ValueError, "start out of region");
+		return 0;
+	}
+	task->position = start;
+
+	task->obj = obj;
+	return 1;
+}
+
+//hit buffer of the fields and kept items of task
+static int task_buffer(scan_task *task, hit_buffer *buf){
+	return buffer_init(buf, task->kind == SCAN_ISSR ? 10 : 6, task->level, task->kind == SCAN_ISSR && task->params[7],
+		task->kind == SCAN_ISSR && task->params[8]);
+}
+
+//scan from the task position until limit hits are found, called without
+//GIL, counters are added with the counters of imperfect ssr seeds
+static int scan_buffer(scan_task *task, hit_buffer *buf, Py_ssize_t limit, size_t *counters){
+	band_matrix matrix;
+	cigar_runs runs[2];
+	int cigar = task->kind == SCAN_ISSR && task->params[7];
+	int ok = 0;
+
+	switch(task->kind){
+		case SCAN_SSR:
+			if(task->legacy){
+				ok = scan_ssr_legacy(task->seq, task->len, task->map, task->params, task->offset, buf, &task->position, limit);
+			}else{
+				ok = scan_ssr_linear(task->seq, task->len, task->map, task->params, task->offset, buf, &task->position, limit);
+			}
+			break;
+		case SCAN_VNTR:
+			if(task->legacy){
+				ok = scan_vntr_legacy(task->seq, task->len, task->map, task->params[0], task->params[1], task->params[2],
+					task->params[3], task->offset, buf, &task->position, limit);
+			}else{
+				ok = scan_vntr_linear(task->seq, task->len, task->map, task->params[0], task->params[1], task->params[2],
+					task->params[3], task->offset, buf, &task->position, limit);
+			}
+			break;
+		case SCAN_ISSR:
+			//workspace of edit distance matrix for all extensions
+			band_init(&matrix, task->params[6]);
+			cigar_init(&runs[0]);
+			cigar_init(&runs[1]);
+			ok = scan_issr(task->seq, task->len, task->map, task->params, &matrix, task->offset, buf, &task->position, limit, counters,
+				cigar ? runs : NULL);
+			cigar_free(&runs[0]);
+			cigar_free(&runs[1]);
+			band_free(&matrix);
+			break;
+	}
+
+	return ok;
+}
+
+//scan from the task position until limit hits are found, count is set
+//to the number of hits in result
+static PyObject *run_task(scan_task *task, Py_ssize_t limit, Py_ssize_t *count){
+	hit_buffer buf;
+	PyObject *result;
+	size_t counters[3] = {0, 0, 0};
+	int failed = 0;
+	int k;
+
+	if(!task_buffer(task, &buf)){
+		buffer_free(&buf);
+		return PyErr_NoMemory();
+	}
+
+	//scan without GIL, the sequence is kept alive by the caller
+	Py_BEGIN_ALLOW_THREADS
+	failed = !scan_buffer(task, &buf, limit, counters);
+	Py_END_ALLOW_THREADS
+
+	for(k=0; k<3; k++){
+		issr_totals[k] += counters[k];
+	}
+
+	if(failed){
+		buffer_free(&buf);
+		return PyErr_NoMemory();
+	}
+
+	if(count != NULL){
+		*count = buf.count;
+	}
+
+	result = buffer_result(&buf, task->columns);
+	buffer_free(&buf);
+	return result;
+}
+
+static PyObject *search_task(int kind, PyObject *args, PyObject *kwargs){
+	scan_task task;
+	PyObject *result;
+
+	if(!parse_task(kind, args, kwargs, &task, NULL)){
+		return NULL;
+	}
+
+	result = run_task(&task, 0, NULL);
+	release_sequence(&task.view);
+	return result;
+}
+
+//search perfect microsatellites
+static PyObject *search_ssr(PyObject *self, PyObject *args, PyObject *kwargs){
+	return search_task(SCAN_SSR, args, kwargs);
+}
+
+//search perfect satellite variable number tandem repeat
+static PyObject *search_vntr(PyObject *self, PyObject *args, PyObject *kwargs){
+	return search_task(SCAN_VNTR, args, kwargs);
+}
+
+//search imperfect microsatellites
+static PyObject *search_issr(PyObject *self, PyObject *args, PyObject *kwargs){
+	return search_task(SCAN_ISSR, args, kwargs);
+}
+
+//scans of a batch shared by the threads of pool, the next scan is taken
+//in the order of sequence length from long to short, so that a long
+//sequence does not start last and keep the other threads waiting
+typedef struct {
+	scan_task *tasks;
+	hit_buffer *bufs;
+	size_t (*counters)[3];
+	int *failed;
+	Py_ssize_t *order;
+	Py_ssize_t count;
+	Py_ssize_t next;
+#ifdef _WIN32
+	CRITICAL_SECTION lock;
+#else
+	pthread_mutex_t lock;
+#endif
+} batch_pool;
+
+static Py_ssize_t batch_take(batch_pool *pool){
+	Py_ssize_t i;
+#ifdef _WIN32
+	EnterCriticalSection(&pool->lock);
+	i = pool->next++;
+	LeaveCriticalSection(&pool->lock);
+#else
+	pthread_mutex_lock(&pool->lock);
+	i = pool->next++;
+	pthread_mutex_unlock(&pool->lock);
+#endif
+	return i < pool->count ? pool->order[i] : -1;
+}
+
+static void batch_work(batch_pool *pool){
+	Py_ssize_t i;
+	while((i = batch_take(pool)) >= 0){
+		pool->failed[i] = !scan_buffer(&pool->tasks[i], &pool->bufs[i], 0, pool->counters[i]);
+	}
+}
+
+#ifdef _WIN32
+static DWORD WINAPI batch_thread(LPVOID arg){
+	batch_work((batch_pool *)arg);
+	return 0;
+}
+#else
+static void *batch_thread(void *arg){
+	batch_work((batch_pool *)arg);
+	return NULL;
+}
+#endif
+
+//run scans of pool on threads, the calling thread is one of them, the
+//threads failed to start are left to the others
+static void batch_run(batch_pool *pool, int threads){
+	int started = 0;
+	int k;
+#ifdef _WIN32
+	HANDLE *handles = (HANDLE *)malloc(sizeof(HANDLE)*threads);
+	InitializeCriticalSection(&pool->lock);
+	for(k=1; handles != NULL && k<threads; k++){
+		handles[started] = CreateThread(NULL, 0, batch_thread, pool, 0, NULL);
+		if(handles[started] != NULL){
+			started++;
+		}
+	}
+	batch_work(pool);
+	for(k=0; k<started; k++){
+		WaitForSingleObject(handles[k], INFINITE);
+		CloseHandle(handles[k]);
+	}
+	DeleteCriticalSection(&pool->lock);
+#else
+	pthread_t *handles = (pthread_t *)malloc(sizeof(pthread_t)*threads);
+	pthread_mutex_init(&pool->lock, NULL);
+	for(k=1; handles != NULL && k<threads; k++){
+		if(pthread_create(&handles[started], NULL, batch_thread, pool) == 0){
+			started++;
+		}
+	}
+	batch_work(pool);
+	for(k=0; k<started; k++){
+		pthread_join(handles[k], NULL);
+	}
+	pthread_mutex_destroy(&pool->lock);
+#endif
+	free(handles);
+}
+
+static scan_task *sort_tasks;
+
+static int longer_task(const void *a, const void *b){
+	size_t x = sort_tasks[*(const Py_ssize_t *)a].len;
+	size_t y = sort_tasks[*(const Py_ssize_t *)b].len;
+	return x < y ? 1 : (x > y ? -1 : 0);
+}
+
+//kind of scan from tandem search function
+static int func_kind(PyObject *func){
+	PyCFunction meth;
+
+	if(PyCFunction_Check(func)){
+		meth = PyCFunction_GetFunction(func);
+		if(meth == (PyCFunction)search_ssr){
+			return SCAN_SSR;
+		}else if(meth == (PyCFunction)search_vntr){
+			return SCAN_VNTR;
+		}else if(meth == (PyCFunction)search_issr){
+			return SCAN_ISSR;
+		}
+	}
+
+	PyErr_SetString(PyExc_TypeError, "func must be search_ssr, search_vntr or search_issr");
+	return -1;
+}
+
+//parse a batch item, the sequence or (seq, offset, length) tuple, with
+//the same arguments and options of search function
+static int parse_item(int kind, PyObject *item, PyObject *args, PyObject *options, scan_task *task){
+	PyObject *seq = item;
+	PyObject *call;
+	PyObject *kwargs;
+	PyObject *value;
+	Py_ssize_t k;
+	int ok = 0;
+
+	if(PyTuple_Check(item)){
+		if(PyTuple_GET_SIZE(item) != 3){
+			PyErr_SetString(PyExc_ValueError, "region must be (seq, offset, length)");
+			return 0;
+		}
+		seq = PyTuple_GET_ITEM(item, 0);
+	}
+
+	call = PyTuple_New(PyTuple_GET_SIZE(args)+1);
+	if(call == NULL){
+		return 0;
+	}
+	Py_INCREF(seq);
+	PyTuple_SET_ITEM(call, 0, seq);
+	for(k=0; k<PyTuple_GET_SIZE(args); k++){
+		value = PyTuple_GET_ITEM(args, k);
+		Py_INCREF(value);
+		PyTuple_SET_ITEM(call, k+1, value);
+	}
+
+	kwargs = options == NULL ? PyDict_New() : PyDict_Copy(options);
+	if(kwargs == NULL){
+		Py_DECREF(call);
+		return 0;
+	}
+
+	if(seq == item || (PyDict_SetItemString(kwargs, "offset", PyTuple_GET_ITEM(item, 1)) == 0
+		&& PyDict_SetItemString(kwargs, "length", PyTuple_GET_ITEM(item, 2)) == 0)){
+		ok = parse_task(kind, call, kwargs, task, NULL);
+	}
+
+	Py_DECREF(call);
+	Py_DECREF(kwargs);
+	return ok;
+}
+
+//search a batch of sequences or regions on a pool of native threads,
+//return the results of search function for each item in the same order
+static PyObject *search_batch(PyObject *self, PyObject *args, PyObject *kwargs){
+	PyObject *func;
+	PyObject *seqs;
+	PyObject *params = NULL;
+	PyObject *options = NULL;
+	PyObject *items;
+	PyObject *result = NULL;
+	PyObject *res;
+	batch_pool pool;
+	Py_ssize_t parsed = 0;
+	Py_ssize_t i;
+	int threads = 1;
+	int failed = 0;
+	int kind;
+	int k;
+
+	static char *keywords[] = {"func", "seqs", "args", "threads", "options", NULL};
+
+	if(!PyArg_ParseTupleAndKeywords(args, kwargs, "OO|O!iO!", keywords, &func, &seqs, &PyTuple_Type, &params,
+		&threads, &PyDict_Type, &options)){
+		return NULL;
+	}
+
+	kind = func_kind(func);
+	if(kind < 0){
+		return NULL;
+	}
+
+	if(threads < 1){
+		PyErr_SetString(PyExc_ValueError, "threads must be positive");
+		return NULL;
+	}
+
+	//the items keep the sequences alive while scanning
+	items = PySequence_Fast(seqs, "seqs must be iterable");
+	if(items == NULL){
+		return NULL;
+	}
+
+	if(params == NULL){
+		params = PyTuple_New(0);
+	}else{
+		Py_INCREF(params);
+	}
+
+	pool.count = PySequence_Fast_GET_SIZE(items);
+	pool.next = 0;
+	pool.tasks = (scan_task *)malloc(sizeof(scan_task)*(pool.count+1));
+	pool.bufs = (hit_buffer *)calloc(pool.count+1, sizeof(hit_buffer));
+	pool.counters = (size_t (*)[3])calloc(pool.count+1, sizeof(size_t)*3);
+	pool.failed = (int *)calloc(pool.count+1, sizeof(int));
+	pool.order = (Py_ssize_t *)malloc(sizeof(Py_ssize_t)*(pool.count+1));
+
+	if(params == NULL || pool.tasks == NULL || pool.bufs == NULL || pool.counters == NULL || pool.failed == NULL || pool.order == NULL){
+		PyErr_NoMemory();
+		goto done;
+	}
+
+	for(parsed=0; parsed<pool.count; parsed++){
+		if(!parse_item(kind, PySequence_Fast_GET_ITEM(items, parsed), params, options, &pool.tasks[parsed])){
+			goto done;
+		}
+		pool.order[parsed] = parsed;
+	}
+
+	for(i=0; i<pool.count; i++){
+		if(!task_buffer(&pool.tasks[i], &pool.bufs[i])){
+			PyErr_NoMemory();
+			goto done;
+		}
+	}
+
+	sort_tasks = pool.tasks;
+	qsort(pool.order, pool.count, sizeof(Py_ssize_t), longer_task);
+
+	if(threads > pool.count){
+		threads = pool.count;
+	}
+
+	Py_BEGIN_ALLOW_THREADS
+	batch_run(&pool, threads);
+	Py_END_ALLOW_THREADS
+
+	for(i=0; i<pool.count; i++){
+		for(k=0; k<3; k++){
+			issr_totals[k] += pool.counters[i][k];
+		}
+		failed |= pool.failed[i];
+	}
+
+	if(failed){
+		PyErr_NoMemory();
+		goto done;
+	}
+
+	result = PyList_New(pool.count);
+	if(result == NULL){
+		goto done;
+	}
+
+	for(i=0; i<pool.count; i++){
+		res = buffer_result(&pool.bufs[i], pool.tasks[i].columns);
+		if(res == NULL){
+			Py_CLEAR(result);
+			goto done;
+		}
+		PyList_SET_ITEM(result, i, res);
+	}
+
+done:
+	//buffers not initialized are zeroed and freed as empty
+	for(i=0; pool.bufs != NULL && i<pool.count; i++){
+		buffer_free(&pool.bufs[i]);
+	}
+	for(i=0; pool.tasks != NULL && i<parsed; i++){
+		release_sequence(&pool.tasks[i].view);
+	}
+	free(pool.tasks);
+	free(pool.bufs);
+	free(pool.counters);
+	free(pool.failed);
+	free(pool.order);
+	Py_XDECREF(params);
+	Py_DECREF(items);
+	return result;
+}
+
+//count soft-masked lowercase bases in sequence
+static PyObject *count_masked(PyObject *self, PyObject *args, PyObject *kwargs){
+	PyObject *obj;
+	Py_buffer view;
+	Py_ssize_t offset = 0;
+	Py_ssize_t length = -1;
+	char *seq;
+	size_t len;
+	size_t i;
+	size_t count = 0;
+
+	static char *keywords[] = {"seq", "offset", "length", NULL};
+
+	if(!PyArg_ParseTupleAndKeywords(args, kwargs, "O|nn", keywords, &obj, &offset, &length)){
+		return NULL;
+	}
+
+	if(!get_sequence(obj, offset, length, &view, &seq, &len)){
+		return NULL;
+	}
+
+	Py_BEGIN_ALLOW_THREADS
+	for(i=0; i<len; i++){
+		if(seq[i] >= 'a' && seq[i] <= 'z'){
+			count++;
+		}
+	}
+	Py_END_ALLOW_THREADS
+
+	release_sequence(&view);
+	return PyLong_FromSize_t(count);
+}
+
+//get counters of imperfect ssr seeds, extensions of skipped seeds and
+//reused right extensions are avoided
+static PyObject *issr_counters(PyObject *self, PyObject *args, PyObject *kwargs){
+	PyObject *result;
+	int reset = 0;
+
+	static char *keywords[] = {"reset", NULL};
+
+	if(!PyArg_ParseTupleAndKeywords(args, kwargs, "|p", keywords, &reset)){
+		return NULL;
+	}
+
+	result = Py_BuildValue("{s:n,s:n,s:n}", "seeds", (Py_ssize_t)issr_totals[ISSR_SEEDS],
+		"skipped", (Py_ssize_t)issr_totals[ISSR_SKIPPED], "reused", (Py_ssize_t)issr_totals[ISSR_REUSED]);
+
+	if(reset){
+		memset(issr_totals, 0, sizeof(issr_totals));
+	}
+	return result;
+}
+
+//get standard motif of motif with any length
+static PyObject *standard(PyObject *self, PyObject *args, PyObject *kwargs){
+	const char *motif;
+	int len;
+	int level = 2;
+	char *out;
+	PyObject *result;
+
+	static char *keywords[] = {"motif", "level", NULL};
+
+	if(!PyArg_ParseTupleAndKeywords(args, kwargs, "s|i", keywords, &motif, &level)){
+		return NULL;
+	}
+
+	len = strlen(motif);
+
+	if(level < 0 || level > 4){
+		PyErr_SetString(PyExc_ValueError, "level must be in 0 to 4");
+		return NULL;
+	}
+
+	out = (char *)malloc(len+1);
+	if(out == NULL){
+		return PyErr_NoMemory();
+	}
+
+	lookup_standard(motif, len, level, out);
+	result = PyUnicode_FromStringAndSize(out, len);
+	free(out);
+	return result;
+}
+
+//iterator yields hits in batches while scanning
+typedef struct {
+	PyObject_HEAD
+	scan_task task;
+	Py_ssize_t batch;
+	int running;
+} scanner_object;
+
+static void scanner_dealloc(scanner_object *self){
+	release_sequence(&self->task.view);
+	Py_XDECREF(self->task.obj);
+	PyObject_Del(self);
+}
+
+static PyObject *scanner_next(scanner_object *self){
+	PyObject *result;
+	Py_ssize_t count;
+
+	if(self->running){
+		PyErr_SetString(PyExc_ValueError, "scanner already executing");
+		return NULL;
+	}
+
+	if(self->task.position >= self->task.len){
+		return NULL;
+	}
+
+	self->running = 1;
+	result = run_task(&self->task, self->batch, &count);
+	self->running = 0;
+
+	//no more hits after the last batch, the batch is still returned when
+	//the extended seeds of imperfect ssr are kept
+	if(result != NULL && count == 0 && self->task.position >= self->task.len && !(self->task.kind == SCAN_ISSR && self->task.params[8])){
+		Py_DECREF(result);
+		return NULL;
+	}
+
 	return result;
 }
 
+//0-based position in sequence where the next batch starts
+static PyObject *scanner_position(scanner_object *self, void *closure){
+	return PyLong_FromSsize_t(self->task.offset + self->task.position);
+}
+
+static PyGetSetDef scanner_getset[] = {
+	{"position", (getter)scanner_position, NULL, "position where the next batch starts", NULL},
+	{NULL}
+};
+
+static PyTypeObject scanner_type = {
+	PyVarObject_HEAD_INIT(NULL, 0)
+	.tp_name = "tandem.Scanner",
+	.tp_basicsize = sizeof(scanner_object),
+	.tp_dealloc = (destructor)scanner_dealloc,
+	.tp_flags = Py_TPFLAGS_DEFAULT,
+	.tp_doc = "Iterator of tandem repeat hits in batches",
+	.tp_iter = PyObject_SelfIter,
+	.tp_iternext = (iternextfunc)scanner_next,
+	.tp_getset = scanner_getset
+};
+
+static PyObject *iter_task(int kind, PyObject *args, PyObject *kwargs){
+	scanner_object *scanner = PyObject_New(scanner_object, &scanner_type);
+
+	if(scanner == NULL){
+		return NULL;
+	}
+
+	scanner->batch = 10000;
+	scanner->running = 0;
+	scanner->task.obj = NULL;
+	scanner->task.view.obj = NULL;
+
+	if(!parse_task(kind, args, kwargs, &scanner->task, &scanner->batch)){
+		scanner->task.obj = NULL;
+		Py_DECREF(scanner);
+		return NULL;
+	}
+
+	Py_INCREF(scanner->task.obj);
+	return (PyObject *)scanner;
+}
+
+static PyObject *iter_ssr(PyObject *self, PyObject *args, PyObject *kwargs){
+	return iter_task(SCAN_SSR, args, kwargs);
+}
+
+static PyObject *iter_vntr(PyObject *self, PyObject *args, PyObject *kwargs){
+	return iter_task(SCAN_VNTR, args, kwargs);
+}
+
+static PyObject *iter_issr(PyObject *self, PyObject *args, PyObject *kwargs){
+	return iter_task(SCAN_ISSR, args, kwargs);
+}
+
 static PyMethodDef tandem_methods[] = {
-	{"search_ssr", search_ssr, METH_VARARGS},
-	{"search_vntr", search_vntr, METH_VARARGS},
-	{"search_issr", search_issr, METH_VARARGS},
+	{"search_ssr", (PyCFunction)search_ssr, METH_VARARGS | METH_KEYWORDS},
+	{"search_vntr", (PyCFunction)search_vntr, METH_VARARGS | METH_KEYWORDS},
+	{"search_issr", (PyCFunction)search_issr, METH_VARARGS | METH_KEYWORDS},
+	{"iter_ssr", (PyCFunction)iter_ssr, METH_VARARGS | METH_KEYWORDS},
+	{"iter_vntr", (PyCFunction)iter_vntr, METH_VARARGS | METH_KEYWORDS},
+	{"iter_issr", (PyCFunction)iter_issr, METH_VARARGS | METH_KEYWORDS},
+	{"search_batch", (PyCFunction)search_batch, METH_VARARGS | METH_KEYWORDS},
+	{"count_masked", (PyCFunction)count_masked, METH_VARARGS | METH_KEYWORDS},
+	{"standard", (PyCFunction)standard, METH_VARARGS | METH_KEYWORDS},
+	{"issr_counters", (PyCFunction)issr_counters, METH_VARARGS | METH_KEYWORDS},
 	{NULL, NULL, 0, NULL}
 };
 
@@ -519,5 +2598,13 @@ static struct PyModuleDef tandem_definition = {
 
 PyMODINIT_FUNC PyInit_tandem(void){
 	Py_Initialize();
+	init_masks();
+	init_standards();
+	init_kmer_bases();
+
+	if(PyType_Ready(&scanner_type) < 0){
+		return NULL;
+	}
+
 	return PyModule_Create(&tandem_definition);
 }
@@ -0,0 +1,302 @@
+#!/usr/bin/env python
+'''
+split long sequence into overlapping windows that can be scanned in
+parallel and stitch the window results back to the same result of a
+whole sequence scan.
+
+The tandem scanners are greedy, the scan visits every position that is
+not inside a reported repeat and the scan started from a visited position
+does not depend on what happened before it. Adjacent windows are therefore
+joined at the first position in their overlap that is visited by both
+scans, the hits ending before it are taken from the left window and the
+others from the right window.
+'''
+import pyfastx
+
+from . import tandem
+from .hits import Hits
+
+#default core size of window
+WINDOW_SIZE = 4000000
+
+#max bases of sequences scanned in a native batch
+BATCH_BASES = 256 * 1024 * 1024
+
+#how soft-masked lowercase bases are scanned, kept as they are, scanned
+#as uppercase or skipped like N
+MASK_MODES = ['none', 'upper', 'skip']
+
+#standardization level of VNTR motifs, rotation and reverse complement
+VNTR_LEVEL = 2
+
+def scan_window(func, seq, offset, args, options={}):
+	'''
+	scan a window of sequence and convert hit coordinates to the
+	coordinates in the whole sequence, called in pool processes
+	@para func callable, tandem search function
+	@para seq str, window sequence
+	@para offset int, 0-based start of window in the whole sequence
+	@para args tuple, extra search parameters
+	@para options dict, search keyword options, e.g. mask
+	@return Hits, hits with whole sequence coordinates
+	'''
+	hits = Hits.search(func, seq, *args, **options)
+
+	if not offset:
+		return hits
+
+	return hits.shift(offset)
+
+def scan_region(func, seq, start, stop, args, options={}):
+	'''
+	scan a region of the whole sequence in place without copying it,
+	used when the sequence memory is shared with the caller
+	@para func callable, tandem search function
+	@para seq str or bytes-like, the whole sequence
+	@para start int, 0-based start of region
+	@para stop int, 0-based end of region, exclusive
+	@para args tuple, extra search parameters
+	@para options dict, search keyword options, e.g. mask
+	@return Hits, hits with whole sequence coordinates
+	'''
+	return Hits.search(func, seq, *args, offset=start, length=stop-start, **options)
+
+def batch_groups(seqs, bases=BATCH_BASES):
+	'''
+	group sequences for native batches, a sequence longer than bases is
+	a group alone
+	@para seqs iterable, (name, seq) tuples
+	@para bases int, max bases of sequences in a group
+	@return generator, lists of (name, seq) tuples
+	'''
+	group = []
+	size = 0
+	for name, seq in seqs:
+		if group and size + len(seq) > bases:
+			yield group
+			group = []
+			size = 0
+
+		group.append((name, seq))
+		size += len(seq)
+
+	if group:
+		yield group
+
+def batch_detectors(detectors, seqs, threads=1):
+	'''
+	scan the same sequences with several window splitters, each detector
+	scans all sequences in a native batch
+	@para detectors list, Windows of search functions
+	@para seqs list, (name, seq) tuples
+	@para threads int, number of native threads
+	@return list, Hits of each sequence for each detector
+	'''
+	return [windows.batch(seqs, threads) for windows in detectors]
+
+def scan_fasta(windows, fasta_file, names, threads=1):
+	'''
+	scan sequences of fasta file in a native batch
+	@para windows Windows, window splitter of search function
+	@para fasta_file str, the fasta file path
+	@para names list, names of sequences to scan
+	@para threads int, number of native threads
+	@return list, Hits of each sequence in the order of names
+	'''
+	fa = pyfastx.Fasta(fasta_file)
+	return windows.batch([(name, fa[name].seq) for name in names], threads)
+
+class Windows:
+	'''
+	@para func callable, tandem search function
+	@para args tuple, extra search parameters
+	@para guard int, bases at the end of a window in which the scan may
+		be affected by the truncated sequence
+	@para context int, bases before the window core needed by the scan
+	@para safe callable, extra check for a position to join windows
+	@para size int, the core size of window, None to never split
+	@para options dict, search keyword options, e.g. mask
+	'''
+	def __init__(self, func, args, guard, context=0, safe=None, size=WINDOW_SIZE, options=None):
+		self.func = func
+		self.args = args
+		self.options = options or {}
+		self.guard = guard
+		self.context = context
+		self.safe = safe
+		self.overlap = guard * 2
+		self.size = size and max(size, self.overlap * 4)
+
+	def split(self, length, parts=1):
+		'''
+		split sequence into windows
+		@para length int, the sequence length
+		@para parts int, min number of windows, the core size is reduced
+			to split a sequence shorter than parts windows, so that a
+			long sequence keeps all workers busy, but not less than four
+			times of overlap
+		@return list, (core start, scan start, scan end) 0-based
+		'''
+		size = self.size
+		if size is not None and parts > 1:
+			size = max(min(size, -(-length // parts)), self.overlap * 4)
+
+		if size is None or length <= size + self.overlap:
+			return [(0, 0, length)]
+
+		regions = []
+		for begin in range(0, length, size):
+			regions.append((begin, max(0, begin-self.context), min(length, begin+size+self.overlap)))
+
+			if begin + size + self.overlap >= length:
+				break
+
+		return regions
+
+	def batch(self, seqs, threads=1):
+		'''
+		scan sequences on the native thread pool of tandem module, long
+		sequence is split into windows that are scanned in place and
+		stitched back, all windows are scanned in one call
+		@para seqs list, (name, seq) tuples
+		@para threads int, number of native threads
+		@return list, Hits of each sequence in the same order
+		'''
+		splits = [self.split(len(seq), threads) for _, seq in seqs]
+		items = [(seq, start, stop-start) for (_, seq), regions in zip(seqs, splits) for _, start, stop in regions]
+		parts = iter(Hits.batch(self.func, items, *self.args, threads=threads, **self.options))
+		return [self.stitch(seq, regions, [next(parts) for _ in regions]) for (_, seq), regions in zip(seqs, splits)]
+
+	def join_point(self, seq, left, right, lo, hi):
+		'''
+		find the first 0-based position in [lo, hi) visited by both scans
+		@para left Hits, hits from left window
+		@para right Hits, hits from right window
+		@return int or None
+		'''
+		covers = []
+		for hits in (left, right):
+			near = hits.select(lo)
+			for start, end in zip(near.starts.tolist(), near.ends.tolist()):
+				if start < hi:
+					covers.append((start, end-1))
+
+		covers.sort()
+
+		q = lo
+		for start, end in covers:
+			while q < start and q < hi:
+				if self.safe is None or self.safe(seq, q):
+					return q
+				q += 1
+
+			if end >= q:
+				q = end + 1
+
+		while q < hi:
+			if self.safe is None or self.safe(seq, q):
+				return q
+			q += 1
+
+	def merge(self, seq, regions, parts):
+		'''
+		merge hits of windows, hits before a join point are yielded as soon
+		as the windows around it are available, the region without join
+		point is rescanned
+		@para seq str, the whole sequence
+		@para regions list, windows from split
+		@para parts iterable, Hits of each window, may be lazy
+		@return generator, (Hits, position) tuples, position is the 0-based
+			position that all hits before it have been yielded
+		'''
+		parts = iter(parts)
+		prev = 0
+		_, start, stop = regions[0]
+		left = next(parts)
+
+		for k in range(1, len(regions)):
+			begin, next_start, next_stop = regions[k]
+			right = next(parts)
+			q = self.join_point(seq, left, right, begin, stop-self.guard)
+
+			if q is None:
+				#no join point in overlap, scan the merged windows again
+				left = scan_region(self.func, seq, start, next_stop, self.args, self.options)
+				stop = next_stop
+				continue
+
+			yield left.select(prev, q), q
+			prev = q
+			start, stop = next_start, next_stop
+			left = right
+
+		yield left.select(prev), regions[-1][2]
+
+	def stitch(self, seq, regions, parts):
+		'''
+		merge hits of windows into hits of whole sequence
+		@para seq str, the whole sequence
+		@para regions list, windows from split
+		@para parts list, Hits of each window
+		@return Hits, hits of whole sequence
+		'''
+		if len(parts) == 1:
+			return parts[0]
+
+		return Hits.concat([hits for hits, _ in self.merge(seq, regions, parts)])
+
+def ssr_windows(repeats, mask='none', level=0):
+	'''
+	windows for perfect SSR search, the scan at a position reads at
+	most the repeat length plus one motif length
+	@para repeats list, minimum repeats of mono to hexa
+	@para mask str, scan mode of soft-masked bases in MASK_MODES
+	@para level int, motif standardization level, 0 to not standardize
+	'''
+	guard = 6 * (max(repeats) + 2)
+	return Windows(tandem.search_ssr, (repeats,), guard, options=dict(mask=mask, level=level))
+
+def vntr_windows(min_motif, max_motif, min_repeat, mask='none', level=VNTR_LEVEL, compact=True):
+	'''
+	windows for VNTR search, runs with motif shorter than min motif and
+	longer than 6 bp are skipped by the scanner without reporting, a
+	join point must not be covered by such a run.
+	@para level int, motif standardization level, VNTR motifs of any
+		length are standardized by rotation and reverse complement
+	@para compact bool, report the primitive motif covering the most bases
+		at a position instead of the first found motif length, a hit
+		decided in front of the guard still covers more bases than any
+		truncated run, so the windows are joined in the same way
+	'''
+	args = (min_motif, max_motif, min_repeat)
+	options = dict(mask=mask, level=level, compact=compact)
+
+	#runs of all motifs shorter than min motif are skipped, a position
+	#not covered by any of them can hardly be found when min motif > 7,
+	#so the sequence is scanned as a whole
+	if min_motif > 7:
+		return Windows(tandem.search_vntr, args, 0, size=None, options=options)
+
+	#bases are compared ignoring case, a run in any mask mode is also
+	#a run of uppercase sequence, so the check is safe for all modes
+	def safe(seq, q):
+		for j in range(1, min_motif):
+			for x in range(max(0, q-1-j), q):
+				if x+j < len(seq) and seq[x].upper() == seq[x+j].upper():
+					return False
+		return True
+
+	guard = max_motif * (min_repeat + 2) + 6
+	return Windows(tandem.search_vntr, args, guard, safe=safe, options=options)
+
+def issr_windows(seed_repeat, seed_length, max_edits, mis_penalty, gap_penalty, score, size, mask='none', level=0, cigar=False, seeds=False):
+	'''
+	windows for imperfect SSR search, the seed is extended at most size
+	bases to both sides, so the same size of context is required before
+	the window core
+	@para cigar bool, keep the alignment of each hit as CIGAR
+	@para seeds bool, keep all extended seeds for rescoring
+	'''
+	guard = size + 6 * (seed_repeat + 2) + seed_length + score + 2
+	args = (seed_repeat, seed_length, max_edits, mis_penalty, gap_penalty, score, size)
+	return Windows(tandem.search_issr, args, guard, context=size, options=dict(mask=mask, level=level, cigar=cigar, seeds=seeds))
@@ -118,8 +118,10 @@ class StandardMotif:
 		#sort motifs as A>T>C>G
 		motifs = motif_sorted(motifs)
 
-		for motif in motifs:
-			self._motifs[motif] = motifs[0]
+		#the similar motifs at level 3 are not the same for each motif in
+		#them, only cache the queried motif to keep result independent of
+		#the order of queries, the same as the tandem module
+		self._motifs[motif] = motifs[0]
 
 		return motifs[0]
 
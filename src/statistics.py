@@ -168,14 +168,14 @@ class SSRStatistics(Statistics):
 		get total perfect SSR counts and frequency
 		'''
 		if not self._ssr_counts:
-			self._ssr_counts = self.db.get_one("SELECT COUNT(1) FROM ssr LIMIT 1")
+			self._ssr_counts = self.db.get_one("SELECT COUNT(1) FROM ssr_data LIMIT 1")
 		
 		return self._ssr_counts
 
 	@property
 	def length(self):
 		if not self._ssr_length:
-			self._ssr_length = self.db.get_one("SELECT SUM(length) FROM ssr LIMIT 1")
+			self._ssr_length = self.db.get_one("SELECT SUM(length) FROM ssr_data LIMIT 1")
 		
 		return self._ssr_length
 
@@ -188,7 +188,7 @@ class SSRStatistics(Statistics):
 		return self.rd(self.length)
 		
 	def motifTypeStatis(self):
-		sql = "SELECT type, SUM(length) AS length, COUNT(1) AS count FROM ssr GROUP BY type ORDER BY type"
+		sql = "SELECT type, SUM(length) AS length, COUNT(1) AS count FROM ssr_data GROUP BY type ORDER BY type"
 		rows = [('Type', 'Counts', 'Length (bp)', 'Percent (%)', 'Average Length (bp)', 'Relative Abundance (loci/%s)' % self.unit, 'Relative Density (bp/%s)' % self.unit)]
 		for row in self.db.query(sql):
 			percent = round(row.count/self.count*100, 2)
@@ -199,7 +199,10 @@ class SSRStatistics(Statistics):
 		return rows
 
 	def motifCategoryStatis(self):
-		sql = "SELECT standard, type, SUM(length) AS length, COUNT(1) AS count FROM ssr GROUP BY standard ORDER BY type,standard"
+		#group by motif id and then get the standard motif text
+		sql = ("SELECT motif.motif AS standard, s.type AS type, s.length AS length, s.count AS count FROM "
+			"(SELECT standard, type, SUM(length) AS length, COUNT(1) AS count FROM ssr_data GROUP BY standard) AS s "
+			"JOIN motif ON motif.id=s.standard ORDER BY s.type,motif.motif")
 		rows = [('Motif', 'Type', 'Counts', 'Length (bp)', 'Percent (%)', 'Average Length (bp)', 'Relative Abundance (loci/%s)' % self.unit, 'Relative Density (bp/%s)' % self.unit)]
 		for row in self.db.query(sql):
 			percent = round(row.count/self.count*100, 2)
@@ -210,7 +213,7 @@ class SSRStatistics(Statistics):
 		return rows
 
 	def motifRepeatsStatis(self):
-		sql = "SELECT repeat, SUM(length) AS length, COUNT(1) AS count FROM ssr GROUP BY repeat ORDER BY repeat"
+		sql = "SELECT repeat, SUM(length) AS length, COUNT(1) AS count FROM ssr_data GROUP BY repeat ORDER BY repeat"
 		rows = [('Repeat', 'Counts', 'Length (bp)', 'Percent (%)', 'Average Length (bp)', 'Relative Abundance (loci/%s)' % self.unit, 'Relative Density (bp/%s)' % self.unit)]
 		for row in self.db.query(sql):
 			percent = round(row.count/self.count*100, 2)
@@ -223,7 +226,7 @@ class SSRStatistics(Statistics):
 	def motifRepeatStatis(self):
 		rows = {}
 		for i in range(1,7):
-			sql = "SELECT repeat FROM ssr WHERE type=%s" % i
+			sql = "SELECT repeat FROM ssr_data WHERE type=%s" % i
 			r = self.db.get_column(sql)
 			if not r:
 				continue
@@ -235,7 +238,7 @@ class SSRStatistics(Statistics):
 	def SSRLengthStatis(self):
 		rows = {}
 		for i in range(1,7):
-			sql = "SELECT length FROM ssr WHERE type=%s" % i
+			sql = "SELECT length FROM ssr_data WHERE type=%s" % i
 			r = self.db.get_column(sql)
 			if not r:
 				continue
@@ -432,14 +435,14 @@ class ISSRStatistics(Statistics):
 	@property
 	def count(self):
 		if not self._issr_counts:
-			self._issr_counts = self.db.get_one("SELECT COUNT(1) FROM issr LIMIT 1")
+			self._issr_counts = self.db.get_one("SELECT COUNT(1) FROM issr_data LIMIT 1")
 
 		return self._issr_counts
 
 	@property
 	def length(self):
 		if not self._issr_length:
-			self._issr_length = self.db.get_one("SELECT SUM(length) FROM issr LIMIT 1")
+			self._issr_length = self.db.get_one("SELECT SUM(length) FROM issr_data LIMIT 1")
 
 		return self._issr_length
 
@@ -452,7 +455,7 @@ class ISSRStatistics(Statistics):
 		return self.rd(self.length)
 
 	def motifTypeStatis(self):
-		sql = "SELECT type, SUM(length) AS length, COUNT(1) AS count FROM issr GROUP BY type ORDER BY type"
+		sql = "SELECT type, SUM(length) AS length, COUNT(1) AS count FROM issr_data GROUP BY type ORDER BY type"
 		rows = [('Type', 'Counts', 'Length (bp)', 'Percent (%)', 'Average Length (bp)', 'Relative Abundance (loci/%s)' % self.unit, 'Relative Density (bp/%s)' % self.unit)]
 		for row in self.db.query(sql):
 			percent = round(row.count/self.count*100, 2)
@@ -463,7 +466,9 @@ class ISSRStatistics(Statistics):
 		return rows
 
 	def motifCategoryStatis(self):
-		sql = "SELECT standard, SUM(length) AS length, COUNT(1) AS count FROM issr GROUP BY standard ORDER BY type,standard"
+		sql = ("SELECT motif.motif AS standard, s.length AS length, s.count AS count FROM "
+			"(SELECT standard, type, SUM(length) AS length, COUNT(1) AS count FROM issr_data GROUP BY standard) AS s "
+			"JOIN motif ON motif.id=s.standard ORDER BY s.type,motif.motif")
 		rows = [('Motif', 'Counts', 'Length (bp)', 'Percent (%)', 'Average Length (bp)', 'Relative Abundance (loci/%s)' % self.unit, 'Relative Density (bp/%s)' % self.unit)]
 		for row in self.db.query(sql):
 			percent = round(row.count/self.count*100, 2)
@@ -476,7 +481,7 @@ class ISSRStatistics(Statistics):
 	def ISSRScoreStatis(self):
 		rows = []
 		for i in range(1,7):
-			sql = "SELECT score FROM issr WHERE type=%s" % i
+			sql = "SELECT score FROM issr_data WHERE type=%s" % i
 			r = self.db.get_column(sql)
 			if r: rows.append(r)
 		return rows
@@ -484,7 +489,7 @@ class ISSRStatistics(Statistics):
 	def ISSRLengthStatis(self):
 		rows = {}
 		for i in range(1,7):
-			sql = "SELECT length FROM issr WHERE type=%s" % i
+			sql = "SELECT length FROM issr_data WHERE type=%s" % i
 			r = self.db.get_column(sql)
 			if not r:
 				continue
@@ -557,6 +562,7 @@ class VNTRStatistics(Statistics):
 	def __init__(self):
 		super(VNTRStatistics, self).__init__()
 		self.type = self.motifTypeStatis()
+		self.category = self.motifCategoryStatis()
 		self.repeat = self.motifRepeatStatis()
 		self.vntrlen = self.VNTRLengthStatis()
 		self.location = self.region('vntr')
@@ -587,6 +593,17 @@ class VNTRStatistics(Statistics):
 		rows = [(row[0], row[1]) for row in self.db.query(sql)]
 		return rows
 
+	def motifCategoryStatis(self):
+		sql = "SELECT standard, type, SUM(length) AS length, COUNT(1) AS count FROM vntr GROUP BY standard ORDER BY type,standard"
+		rows = [('Motif', 'Type', 'Counts', 'Length (bp)', 'Percent (%)', 'Average Length (bp)', 'Relative Abundance (loci/%s)' % self.unit, 'Relative Density (bp/%s)' % self.unit)]
+		for row in self.db.query(sql):
+			percent = round(row.count/self.count*100, 2)
+			average = round(row.length/row.count, 2)
+			frequency = self.ra(row.count)
+			density = self.rd(row.length)
+			rows.append((row.standard, row.type, row.count, row.length, percent, average, frequency, density))
+		return rows
+
 	def motifRepeatStatis(self):
 		sql = "SELECT repeat, COUNT(1) AS count FROM vntr GROUP BY repeat ORDER BY repeat"
 		rows = [(row[0], row[1]) for row in self.db.query(sql)]
@@ -624,6 +641,7 @@ class VNTRStatistics(Statistics):
 			frequency = self.frequency,
 			density = self.density,
 			type = self.type,
+			category = self.category,
 			repeat = self.repeat,
 			vntrlen = self.vntrlen,
 			location = self.location,
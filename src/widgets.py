@@ -334,6 +334,11 @@ class SSRMainWindow(QMainWindow):
 		self.ISSRSetAct = QAction(self.tr("Specify Search Parameters"), self)
 		self.ISSRSetAct.triggered.connect(self.setPreference)
 
+		#search all types of repeats with reading sequences once
+		self.allSearchAct = QAction(self.tr("Search for All Tandem Repeats"), self)
+		self.allSearchAct.setShortcut(QKeySequence(Qt.CTRL+Qt.Key_5))
+		self.allSearchAct.triggered.connect(self.searchAll)
+
 		#locate ssrs
 		self.locateAct = QAction(QIcon(":/icons/locate.png"), self.tr("Mapping"), self)
 		self.locateAct.setToolTip(self.tr("Mapping tandem repeats to genic regions"))
@@ -461,6 +466,8 @@ class SSRMainWindow(QMainWindow):
 		self.searchMenu.addAction(self.CSSRForceAct)
 		self.searchMenu.addAction(self.ISSRForceAct)
 		self.searchMenu.addAction(self.VNTRForceAct)
+		self.searchMenu.addSeparator()
+		self.searchMenu.addAction(self.allSearchAct)
 
 		self.viewMenu.addAction(self.showInputAct)
 		self.viewMenu.addSeparator()
@@ -727,7 +734,7 @@ class SSRMainWindow(QMainWindow):
 		if not fasta:
 			return
 
-		tables = ['ssr', 'cssr', 'issr', 'vntr', 'fasta', 'seq', 'option',
+		tables = ['ssr', 'cssr', 'issr', 'issr_seed', 'vntr', 'fasta', 'seq', 'option',
 				  'meta', 'primer', 'primer_meta', 'gene', 'location']
 
 		for tb in tables:
@@ -966,6 +973,18 @@ class SSRMainWindow(QMainWindow):
 		else:
 			return self.db.get_all("SELECT * FROM fasta")
 
+	def getTargetRegions(self):
+		'''
+		get the region file and feature types of target regions, None to
+		search whole sequences
+		'''
+		region_file = self.settings.value('ssr/regions', '')
+		if not region_file:
+			return None
+
+		features = [f.strip() for f in self.settings.value('ssr/features', '').split(',') if f.strip()]
+		return (region_file, features or None)
+
 
 	#handle perfect SSRs search
 	def searchSSR(self):
@@ -973,7 +992,9 @@ class SSRMainWindow(QMainWindow):
 		if not fastas:
 			return
 
-		self.removeSSR()
+		#the ssrs of last search may be selected again by worker
+		if self.model.table == 'ssr':
+			self.model.clear()
 		
 		rules = [
 			int(self.settings.value('ssr/mono', 12)),
@@ -984,7 +1005,13 @@ class SSRMainWindow(QMainWindow):
 			int(self.settings.value('ssr/hexa', 4))
 		]
 		level = int(self.settings.value('ssr/level', 3))
-		worker = SSRWorker(fastas, rules, level)
+		cpus = int(self.settings.value('ssr/cpus', multiprocessing.cpu_count()))
+		memory = int(self.settings.value('ssr/memory', 1024))
+		mode = int(self.settings.value('ssr/threads', 0))
+		threads = mode == 1
+		native = mode == 2
+		mask = window.MASK_MODES[int(self.settings.value('ssr/mask', 0))]
+		worker = SSRWorker(fastas, rules, level, cpus, memory, threads, mask, native, self.getTargetRegions())
 		self.executeTask(worker, self.showSSR)
 
 	def searchOrShowSSR(self):
@@ -1033,12 +1060,21 @@ class SSRMainWindow(QMainWindow):
 		if not fastas:
 			return
 
-		self.removeVNTR()
+		#the vntrs of last search may be selected again by worker
+		if self.model.table == 'vntr':
+			self.model.clear()
 
 		min_motif = int(self.settings.value('ssr/vmin', 7))
 		max_motif = int(self.settings.value('ssr/vmax', 30))
 		min_repeat = int(self.settings.value('ssr/vrep', 2))
-		worker = VNTRWorker(fastas, min_motif, max_motif, min_repeat)
+		cpus = int(self.settings.value('ssr/cpus', multiprocessing.cpu_count()))
+		memory = int(self.settings.value('ssr/memory', 1024))
+		mode = int(self.settings.value('ssr/threads', 0))
+		threads = mode == 1
+		native = mode == 2
+		mask = window.MASK_MODES[int(self.settings.value('ssr/mask', 0))]
+		compact = int(self.settings.value('ssr/vall', 0)) == 0
+		worker = VNTRWorker(fastas, min_motif, max_motif, min_repeat, cpus, memory, threads, mask, compact, native, self.getTargetRegions())
 		self.executeTask(worker, self.showVNTR)
 
 	def searchOrShowVNTR(self):
@@ -1070,7 +1106,13 @@ class SSRMainWindow(QMainWindow):
 		gap_penalty = int(self.settings.value('ssr/gap', 2))
 		score = int(self.settings.value('ssr/score', 12))
 		level = int(self.settings.value('ssr/level', 3))
-		worker = ISSRWorker(fastas, seed_repeat, seed_length, max_eidts, mis_penalty, gap_penalty, score, level)
+		cpus = int(self.settings.value('ssr/cpus', multiprocessing.cpu_count()))
+		memory = int(self.settings.value('ssr/memory', 1024))
+		mode = int(self.settings.value('ssr/threads', 0))
+		threads = mode == 1
+		native = mode == 2
+		mask = window.MASK_MODES[int(self.settings.value('ssr/mask', 0))]
+		worker = ISSRWorker(fastas, seed_repeat, seed_length, max_eidts, mis_penalty, gap_penalty, score, level, cpus, memory, threads, mask, native, self.getTargetRegions())
 		self.executeTask(worker, self.showISSR)
 
 	def searchOrShowISSR(self):
@@ -1087,6 +1129,48 @@ class SSRMainWindow(QMainWindow):
 	def removeISSR(self):
 		self.model.remove('issr')
 
+	#handle all tandem repeats search
+	def searchAll(self):
+		fastas = self.getInputFastas()
+		if not fastas:
+			return
+
+		self.removeSSR()
+		self.removeCSSR()
+		self.removeISSR()
+		self.removeVNTR()
+
+		rules = [
+			int(self.settings.value('ssr/mono', 12)),
+			int(self.settings.value('ssr/di', 7)),
+			int(self.settings.value('ssr/tri', 5)),
+			int(self.settings.value('ssr/tetra', 4)),
+			int(self.settings.value('ssr/penta', 4)),
+			int(self.settings.value('ssr/hexa', 4))
+		]
+		level = int(self.settings.value('ssr/level', 3))
+		dmax = int(self.settings.value('ssr/dmax', 10))
+		issr = (
+			int(self.settings.value('ssr/srep', 3)),
+			int(self.settings.value('ssr/slen', 8)),
+			int(self.settings.value('ssr/error', 2)),
+			int(self.settings.value('ssr/mismatch', 1)),
+			int(self.settings.value('ssr/gap', 2)),
+			int(self.settings.value('ssr/score', 12)),
+			level
+		)
+		vntr = (
+			int(self.settings.value('ssr/vmin', 7)),
+			int(self.settings.value('ssr/vmax', 30)),
+			int(self.settings.value('ssr/vrep', 2)),
+			int(self.settings.value('ssr/vall', 0)) == 0
+		)
+		cpus = int(self.settings.value('ssr/cpus', multiprocessing.cpu_count()))
+		memory = int(self.settings.value('ssr/memory', 1024))
+		mask = window.MASK_MODES[int(self.settings.value('ssr/mask', 0))]
+		worker = AnalysisWorker(fastas, (rules, level), dmax, issr, vntr, cpus, memory, mask, self.getTargetRegions())
+		self.executeTask(worker, self.showSSR)
+
 	def getPrimerSettings(self):
 		p3_settings = dict(
 			PRIMER_TASK = 'generic',
@@ -1929,6 +2013,8 @@ class GeneralTab(QWidget):
 		self.min_tandem_repeat = QSpinBox()
 		self.min_tandem_repeat.setMinimum(2)
 
+		self.keep_tandem_calls = QCheckBox(self.tr("Keep all calls without resolving overlapping periods"))
+
 		satelliteLayout = QGridLayout()
 		satelliteLayout.addWidget(min_tandem_label, 0, 0)
 		satelliteLayout.addWidget(self.min_tandem_motif, 0, 1)
@@ -1936,6 +2022,7 @@ class GeneralTab(QWidget):
 		satelliteLayout.addWidget(self.max_tandem_motif, 0, 3)
 		satelliteLayout.addWidget(repeat_tandem_label, 0, 4)
 		satelliteLayout.addWidget(self.min_tandem_repeat, 0, 5)
+		satelliteLayout.addWidget(self.keep_tandem_calls, 1, 0, 1, 6)
 		satelliteGroup.setLayout(satelliteLayout)
 
 		issrGroup = QGroupBox(self.tr("Imperfect microsatellite, iSSR"))
@@ -1996,6 +2083,59 @@ class GeneralTab(QWidget):
 		flankLayout.addWidget(flankLabel)
 		flankLayout.addWidget(self.flankValue, 1)
 		flankGroup.setLayout(flankLayout)
+
+		performGroup = QGroupBox(self.tr("Search performance"))
+		modeLabel = QLabel("Run in")
+		self.modeSelect = QComboBox()
+		self.modeSelect.addItems(["Processes", "Threads", "Native threads"])
+		cpusLabel = QLabel("Workers")
+		self.cpusValue = QSpinBox()
+		self.cpusValue.setMinimum(1)
+		self.cpusValue.setMaximum(multiprocessing.cpu_count())
+		memoryLabel = QLabel("Memory for sequences in flight")
+		self.memoryValue = QSpinBox()
+		self.memoryValue.setMinimum(64)
+		self.memoryValue.setMaximum(1048576)
+		self.memoryValue.setSuffix(' MB')
+		performLayout = QHBoxLayout()
+		performLayout.addWidget(modeLabel)
+		performLayout.addWidget(self.modeSelect, 1)
+		performLayout.addWidget(cpusLabel)
+		performLayout.addWidget(self.cpusValue, 1)
+		performLayout.addWidget(memoryLabel)
+		performLayout.addWidget(self.memoryValue, 1)
+		performGroup.setLayout(performLayout)
+
+		maskGroup = QGroupBox(self.tr("Soft-masked bases"))
+		maskLabel = QLabel("Lowercase bases are")
+		self.maskSelect = QComboBox()
+		self.maskSelect.addItems(["Searched as they are", "Searched as uppercase", "Skipped like N"])
+		maskLayout = QHBoxLayout()
+		maskLayout.addWidget(maskLabel)
+		maskLayout.addWidget(self.maskSelect, 1)
+		maskGroup.setLayout(maskLayout)
+
+		regionGroup = QGroupBox(self.tr("Target regions"))
+		regionLabel = QLabel("BED, GFF or GTF file")
+		self.regionInput = QLineEdit()
+		self.regionInput.setReadOnly(True)
+		self.regionInput.setPlaceholderText("Search whole sequences")
+		regionBtn = QPushButton(self.tr("Select"))
+		regionBtn.clicked.connect(self.selectRegionFile)
+		clearBtn = QPushButton(self.tr("Clear"))
+		clearBtn.clicked.connect(self.regionInput.clear)
+		featureLabel = QLabel("Feature types")
+		self.featureInput = QLineEdit()
+		self.featureInput.setPlaceholderText("e.g. exon,CDS, all features if empty")
+		regionLayout = QGridLayout()
+		regionLayout.setColumnStretch(1, 1)
+		regionLayout.addWidget(regionLabel, 0, 0)
+		regionLayout.addWidget(self.regionInput, 0, 1)
+		regionLayout.addWidget(regionBtn, 0, 2)
+		regionLayout.addWidget(clearBtn, 0, 3)
+		regionLayout.addWidget(featureLabel, 1, 0)
+		regionLayout.addWidget(self.featureInput, 1, 1, 1, 3)
+		regionGroup.setLayout(regionLayout)
 		
 		mainLayout = QVBoxLayout()
 		mainLayout.addWidget(repeatsGroup)
@@ -2004,9 +2144,18 @@ class GeneralTab(QWidget):
 		mainLayout.addWidget(issrGroup)
 		mainLayout.addWidget(level_group)
 		mainLayout.addWidget(flankGroup)
+		mainLayout.addWidget(performGroup)
+		mainLayout.addWidget(maskGroup)
+		mainLayout.addWidget(regionGroup)
 		self.setLayout(mainLayout)
 		self.getSettings()
 
+	def selectRegionFile(self):
+		filters = "BED (*.bed *.bed.gz);;GFF or GTF (*.gtf *.gtf.gz *.gff *.gff3 *.gff.gz *.gff3.gz);;ALL (*.*)"
+		region_file, _ = QFileDialog.getOpenFileName(self, "Target regions file", filter=filters)
+		if region_file:
+			self.regionInput.setText(region_file)
+
 	def getSettings(self):
 		self.monoValue.setValue(int(self.settings.value('ssr/mono', 12)))
 		self.diValue.setValue(int(self.settings.value('ssr/di', 7)))
@@ -2019,6 +2168,7 @@ class GeneralTab(QWidget):
 		self.min_tandem_motif.setValue(int(self.settings.value('ssr/vmin', 7)))
 		self.max_tandem_motif.setValue(int(self.settings.value('ssr/vmax', 30)))
 		self.min_tandem_repeat.setValue(int(self.settings.value('ssr/vrep', 2)))
+		self.keep_tandem_calls.setChecked(int(self.settings.value('ssr/vall', 0)) == 1)
 		self.seed_min_repeat.setValue(int(self.settings.value('ssr/srep', 3)))
 		self.seed_min_length.setValue(int(self.settings.value('ssr/slen', 8)))
 		self.max_error.setValue(int(self.settings.value('ssr/error', 3)))
@@ -2026,7 +2176,12 @@ class GeneralTab(QWidget):
 		self.mis_penalty.setValue(int(self.settings.value('ssr/mismatch', 1)))
 		self.gap_penalty.setValue(int(self.settings.value('ssr/gap', 2)))
 		self.level_select.setCurrentIndex(int(self.settings.value('ssr/level', 3)))
-
+		self.cpusValue.setValue(int(self.settings.value('ssr/cpus', multiprocessing.cpu_count())))
+		self.memoryValue.setValue(int(self.settings.value('ssr/memory', 1024)))
+		self.modeSelect.setCurrentIndex(int(self.settings.value('ssr/threads', 0)))
+		self.maskSelect.setCurrentIndex(int(self.settings.value('ssr/mask', 0)))
+		self.regionInput.setText(self.settings.value('ssr/regions', ''))
+		self.featureInput.setText(self.settings.value('ssr/features', ''))
 
 	def saveSettings(self):
 		self.settings.setValue('ssr/mono', self.monoValue.value())
@@ -2040,6 +2195,7 @@ class GeneralTab(QWidget):
 		self.settings.setValue('ssr/vmin', self.min_tandem_motif.value())
 		self.settings.setValue('ssr/vmax', self.max_tandem_motif.value())
 		self.settings.setValue('ssr/vrep', self.min_tandem_repeat.value())
+		self.settings.setValue('ssr/vall', int(self.keep_tandem_calls.isChecked()))
 		self.settings.setValue('ssr/level', self.level_select.currentIndex())
 		self.settings.setValue('ssr/srep', self.seed_min_repeat.value())
 		self.settings.setValue('ssr/slen', self.seed_min_length.value())
@@ -2047,6 +2203,12 @@ class GeneralTab(QWidget):
 		self.settings.setValue('ssr/score', self.min_score.value())
 		self.settings.setValue('ssr/mismatch', self.mis_penalty.value())
 		self.settings.setValue('ssr/gap', self.gap_penalty.value())
+		self.settings.setValue('ssr/cpus', self.cpusValue.value())
+		self.settings.setValue('ssr/memory', self.memoryValue.value())
+		self.settings.setValue('ssr/threads', self.modeSelect.currentIndex())
+		self.settings.setValue('ssr/mask', self.maskSelect.currentIndex())
+		self.settings.setValue('ssr/regions', self.regionInput.text())
+		self.settings.setValue('ssr/features', self.featureInput.text())
 
 	#def showStandardLevelDetail(self, idx):
 	#	if idx == 0:
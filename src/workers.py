@@ -7,12 +7,14 @@ import pyfastx
 import requests
 import traceback
 import functools
+import itertools
+import collections
 import multiprocessing
+import multiprocessing.pool
 
 from PySide2.QtCore import *
 #from PySide.QtCore import *
 
-import motif
 from libs import *
 from db import *
 from gff import *
@@ -27,6 +29,92 @@ from primer3 import primerdesign
 def build_full_index(fafile):
 	_ = pyfastx.Fasta(fafile, full_index=True)
 
+def ssr_rows(db, name, ssrs, first=None):
+	'''
+	rows of ssr_data table, standard motifs are given by scanner with the
+	same motif ids, both are converted to the ids in motif table
+	@para db Database
+	@para name str, sequence name
+	@para ssrs Hits, perfect SSRs of sequence
+	@para first int, row id of the first SSR, None to assign by database
+	@return generator, rows
+	'''
+	motifs = db.get_motif_ids(ssrs.motifs)
+	standards = db.get_motif_ids(ssrs.standards) if ssrs.standards else motifs
+	return ((None if first is None else first+i, name, standards[ssr[0]], motifs[ssr[0]]) + ssr[1:]
+		for i, ssr in enumerate(ssrs.records.tolist()))
+
+def compound_row(name, cssrs):
+	'''
+	row of cssr table concatenated from adjacent perfect SSRs
+	@para name str, sequence name
+	@para cssrs list, (id, motif, repeat, start, end, length) tuples of
+		SSRs sorted by position
+	@return tuple, row
+	'''
+	return (None, name, cssrs[0][3], cssrs[-1][4],
+		"-".join(c[1] for c in cssrs),
+		len(cssrs),
+		sum(c[5] for c in cssrs),
+		sum(c[3]-cssrs[k][4]-1 for k, c in enumerate(cssrs[1:])),
+		"%s-%s" % (cssrs[0][0], cssrs[-1][0]),
+		"-".join("(%s)%s" % (c[1], c[2]) for c in cssrs)
+	)
+
+def cssr_rows(name, ssrs, first, dmax):
+	'''
+	rows of cssr table concatenated from the perfect SSRs of a sequence,
+	adjacent SSRs with distance not more than dmax are joined, the breaks
+	are found on the start and end columns, so only the SSRs in compound
+	SSRs are converted to tuples
+	@para ssrs Hits, perfect SSRs of sequence sorted by position
+	@para first int, row id of the first SSR in ssr table
+	@para dmax int, max distance between adjacent SSRs
+	@return generator, rows
+	'''
+	records = ssrs.records
+	breaks = numpy.flatnonzero(records['start'][1:] - records['end'][:-1] - 1 > dmax) + 1
+	bounds = numpy.concatenate(([0], breaks, [len(records)]))
+	heads = numpy.flatnonzero(numpy.diff(bounds) > 1)
+
+	for i, j in zip(bounds[heads].tolist(), bounds[heads+1].tolist()):
+		cssrs = [(first+i+k, ssrs.motifs[r[0]], r[2], r[3], r[4], r[5]) for k, r in enumerate(records[i:j].tolist())]
+		yield compound_row(name, cssrs)
+
+def issr_rows(db, name, issrs):
+	'''
+	rows of issr_data table with the CIGAR of each imperfect SSR
+	@para issrs Hits, imperfect SSRs of sequence with CIGARs
+	@return generator, rows
+	'''
+	motifs = db.get_motif_ids(issrs.motifs)
+	standards = db.get_motif_ids(issrs.standards) if issrs.standards else motifs
+	return ((None, name, standards[issr[0]], motifs[issr[0]]) + issr[1:] + (cigar,)
+		for issr, cigar in zip(issrs.records.tolist(), issrs.cigars))
+
+def seed_rows(db, name, issrs):
+	'''
+	rows of issr_seed table, the reported seeds are in the same order as
+	hits and keep their CIGARs
+	@para issrs Hits, imperfect SSRs of sequence with CIGARs and seeds
+	@return generator, rows
+	'''
+	motifs = db.get_motif_ids(issrs.motifs)
+	cigars = iter(issrs.cigars)
+	return ((None, name, motifs[seed[0]]) + seed[1:] + (next(cigars) if seed[-1] else None,)
+		for seed in issrs.seeds.tolist())
+
+def vntr_rows(name, vntrs):
+	'''
+	rows of vntr table, VNTR motifs are always standardized by scanner
+	@para vntrs Hits, VNTRs of sequence
+	@return generator, rows
+	'''
+	motifs = vntrs.motifs
+	standards = vntrs.standards
+	return ((None, name, standards[vntr[0]], motifs[vntr[0]]) + vntr[1:]
+		for vntr in vntrs.records.tolist())
+
 class Worker(QObject):
 	update_progress = Signal(int)
 	update_message = Signal(str)
@@ -38,6 +126,10 @@ class Worker(QObject):
 
 	def __init__(self):
 		super(Worker, self).__init__()
+		self.checkpoint = None
+		self.masked_seqs = {}
+		self.regions = None
+		self.targets = None
 
 	@property
 	def db(self):
@@ -89,6 +181,318 @@ class Worker(QObject):
 		seqs = pyfastx.Fasta(fasta_path, build_index=False)
 		return seqs
 
+	def search_sequences(self, seqs, windows, cpus, memory, threads=False, progress=None, native=False):
+		'''
+		search sequences concurrently in a process pool, long sequence is
+		split into overlapping windows that are scanned in parallel and
+		stitched back, several sequences are kept in flight and results
+		are yielded back in fasta order as soon as the windows before
+		them are stitched, so that database inserts overlap with the
+		scanning of next windows. With one cpu, sequence is scanned in
+		the current thread and hits are yielded in batches while scanning.
+		@para seqs iterable, (name, seq) tuples from fasta file
+		@para windows Windows, window splitter of search function
+		@para cpus int, number of worker processes
+		@para memory int, max megabytes of sequence kept in flight
+		@para threads bool, scan in a thread pool sharing the sequence
+			memory instead of copying sequence to processes, the tandem
+			scanners release GIL while scanning
+		@para progress callable, called with the bases of all sequences
+			that have been scanned, windows finished by pool workers are
+			counted before they are merged, may be called in the thread
+			handling pool results
+		@para native bool, scan on the native thread pool of tandem module
+			instead of a python pool
+		@return generator, (name, length, Hits, scanned) tuples, a sequence
+			may be yielded in several batches, scanned is the bases of the
+			sequence that have been scanned, the last batch of a sequence
+			has scanned equal to length
+		'''
+		if progress is None:
+			progress = lambda bases: None
+
+		if native and cpus > 1:
+			yield from self.search_native(seqs, windows, cpus, memory, progress)
+			return
+
+		if cpus == 1:
+			done = 0
+			for name, seq in seqs:
+				for batch, scanned in hits.Hits.iterate(windows.func, seq, *windows.args, **windows.options):
+					progress(done + scanned)
+					yield name, len(seq), batch, scanned
+				done += len(seq)
+			return
+
+		max_tasks = cpus * 2
+		max_bases = memory * 1024 * 1024
+		tasks = collections.deque()
+		windows_num = 0
+		bases = 0
+		done = [0]
+
+		#count the core bases of finished windows
+		def finished(core):
+			def callback(res):
+				done[0] += core
+				progress(done[0])
+			return callback
+
+		def get_results():
+			name, seq, regions, results = tasks.popleft()
+			parts = (res.get() for res in results)
+			for batch, scanned in windows.merge(seq, regions, parts):
+				yield name, len(seq), batch, scanned
+
+		#threads scan windows in place, processes receive a copy of window
+		if threads:
+			pool_class = multiprocessing.pool.ThreadPool
+		else:
+			pool_class = multiprocessing.Pool
+
+		def submit(pool, seq, start, stop, core):
+			if threads:
+				return pool.apply_async(window.scan_region, (windows.func, seq, start, stop, windows.args, windows.options),
+					callback=finished(core))
+			else:
+				return pool.apply_async(window.scan_window, (windows.func, seq[start:stop], start, windows.args, windows.options),
+					callback=finished(core))
+
+		with pool_class(cpus) as pool:
+			for name, seq in seqs:
+				size = len(seq)
+				regions = windows.split(size, cpus)
+
+				#wait for the earliest tasks until there is room for new one
+				while tasks and (windows_num + len(regions) > max_tasks or bases + size > max_bases):
+					prev_size = len(tasks[0][1])
+					prev_windows = len(tasks[0][2])
+					yield from get_results()
+					windows_num -= prev_windows
+					bases -= prev_size
+
+				begins = [begin for begin, _, _ in regions[1:]] + [size]
+				results = [submit(pool, seq, start, stop, end-begin) for (begin, start, stop), end in zip(regions, begins)]
+				tasks.append((name, seq, regions, results))
+				windows_num += len(regions)
+				bases += size
+
+			while tasks:
+				yield from get_results()
+
+	def search_native(self, seqs, windows, cpus, memory, progress):
+		'''
+		search groups of sequences on the native thread pool of tandem
+		module, a group is scanned in one call without python scheduling
+		@return generator, the same as search_sequences, a sequence is
+			yielded in one batch
+		'''
+		for group, (results,) in self.search_groups(seqs, [windows], cpus, memory, progress):
+			for (name, seq), batch in zip(group, results):
+				yield name, len(seq), batch, len(seq)
+
+	def search_groups(self, seqs, detectors, cpus, memory, progress):
+		'''
+		scan groups of sequences with several detectors on the native
+		thread pool, each sequence is read once and kept in memory until
+		all detectors have scanned it. The scan runs in a background
+		thread releasing GIL, so that the results of previous group are
+		handled while scanning the next one
+		@para seqs iterable, (name, seq) tuples from fasta file
+		@para detectors list, Windows of search functions
+		@para cpus int, number of native threads
+		@para memory int, max megabytes of sequence kept in flight, two
+			groups are in flight at most
+		@para progress callable, called with the bases of all sequences
+			that have been scanned
+		@return generator, (group, results) tuples, group is the list of
+			(name, seq) tuples and results the list of Hits of group
+			sequences for each detector
+		'''
+		done = 0
+		pending = None
+		groups = window.batch_groups(seqs, memory * 1024 * 1024 // 2)
+
+		with multiprocessing.pool.ThreadPool(1) as pool:
+			for group in itertools.chain(groups, [None]):
+				task = None
+				if group is not None:
+					task = pool.apply_async(window.batch_detectors, (detectors, group, cpus))
+
+				if pending is not None:
+					prev_group, prev_task = pending
+					results = prev_task.get()
+					done += sum(len(seq) for _, seq in prev_group)
+					progress(done)
+					yield prev_group, results
+
+				pending = (group, task)
+
+	def count_masked(self, seqs, mask):
+		'''
+		count the soft-masked bases that are skipped by scanners
+		@para seqs iterable, (name, seq) tuples from fasta file
+		@para mask str, scan mode of soft-masked bases
+		@return generator, the same (name, seq) tuples
+		'''
+		for name, seq in seqs:
+			if mask == 'skip':
+				self.masked_seqs[name] = tandem.count_masked(seq)
+				self.masked_bases += self.masked_seqs[name]
+			yield name, seq
+
+	def open_checkpoint(self, name, parameters, tables):
+		'''
+		open the checkpoint of search, the results of sequences finished
+		by the broken search with the same parameters are restored
+		@para name str, search name
+		@para parameters str, json of search parameters
+		@para tables list, tables filled by the search
+		'''
+		parameters = json.dumps([parameters, [fasta_file for _, fasta_file in self.fastas], self.mask, self.regions])
+		self.checkpoint = Checkpoint(self.db, name, parameters, tables)
+		self.masked_bases += self.checkpoint.restore()
+
+		if self.checkpoint.finished:
+			self.emit_message("Restored results of %d finished sequences" % len(self.checkpoint.finished))
+
+	def unfinished(self, seqs, fasta_file):
+		'''
+		skip the sequences finished before the search was broken
+		@para seqs iterable, (name, seq) tuples from fasta file
+		@para fasta_file str, fasta file path
+		@return generator, (name, seq) tuples of unfinished sequences
+		'''
+		for name, seq in seqs:
+			if (fasta_file, name) not in self.checkpoint.finished:
+				yield name, seq
+
+	def finish_sequences(self, fasta_file, names):
+		'''
+		save the results of sequences to checkpoint after they are inserted
+		'''
+		self.checkpoint.mark(fasta_file, names, [self.masked_seqs.pop(name, 0) for name in names])
+
+	def target_sequences(self, seqs, fasta_file):
+		'''
+		restrict the search to target regions, the regions are fetched
+		through fasta index instead of reading whole sequences
+		@para seqs iterable, (name, seq) tuples from fasta file
+		@para fasta_file str, indexed fasta file path
+		@return iterable, (name, seq) tuples, a region is named with its
+			position by region.label
+		'''
+		if not self.regions:
+			return seqs
+
+		if self.targets is None:
+			self.targets = region.read_regions(*self.regions)
+
+		seqs = region.RegionFasta(fasta_file, self.targets)
+		self.total_bases = seqs.size
+		return seqs
+
+	def locate(self, name, hits):
+		'''
+		@return tuple, (sequence name, Hits) hits of target region are
+			mapped back to the whole sequence
+		'''
+		if not self.regions:
+			return name, hits
+
+		return region.locate(name, hits)
+
+	def sequence_reader(self):
+		'''
+		@return callable, get the whole sequence by name from the indexed
+			fasta files, a fasta file is only opened when it is read
+		'''
+		fastas = {}
+		def get_sequence(name):
+			for _, fasta_file in self.fastas:
+				if fasta_file not in fastas:
+					fastas[fasta_file] = pyfastx.Fasta(fasta_file)
+
+				if name in fastas[fasta_file]:
+					return fastas[fasta_file][name].seq
+
+		return get_sequence
+
+	def reselect(self, table, windows, passed, rows):
+		'''
+		select the hits of last search again with stricter min repeats, the
+		hits are kept in table and only the sequences with rejected hits
+		are read to scan the regions around them again
+		@para table str, table of perfect SSRs or VNTRs
+		@para windows Windows, windows of search with new parameters
+		@para passed callable, bool array of records with new min repeats
+		@para rows callable, rows of table from sequence name and Hits
+		'''
+		get_sequence = self.sequence_reader()
+		total = self.db.get_one("SELECT COUNT(1) FROM %s LIMIT 1" % table)
+		columns = [row[1] for row in self.db.query("PRAGMA table_info(%s)" % table)]
+		removed = []
+		added = []
+		current = 0
+
+		#the order of sequences before the new hits are appended
+		self.db.query("DROP TABLE IF EXISTS temp.seq_order")
+		self.db.query("CREATE TEMP TABLE seq_order AS SELECT sequence, MIN(id) AS first FROM %s GROUP BY sequence" % table)
+
+		records = self.db.query("SELECT id,sequence,type,repeat,start,end,length FROM %s ORDER BY id" % table)
+		for name, group in itertools.groupby(records, key=lambda row: row[1]):
+			group = [tuple(row) for row in group]
+			olds = numpy.array([(0,) + row[2:] for row in group], dtype=hits.SSR_DTYPE)
+			keep, found = refilter.refilter(functools.partial(get_sequence, name), olds, passed(olds), windows)
+			removed.extend((row[0],) for row, k in zip(group, keep.tolist()) if not k)
+
+			if found is not None:
+				self.emit_message("Scan regions of rejected hits again in %s" % name)
+				added.append((name, found))
+
+			current += len(group)
+			self.emit_progress(int(current/total*100))
+
+		sql = "INSERT INTO %s VALUES (%s)" % (table, ",".join(["?"]*len(columns)))
+		self.db.begin()
+		self.db.get_cursor().executemany("DELETE FROM %s WHERE id=?" % table, removed)
+		for name, found in added:
+			self.db.get_cursor().executemany(sql, rows(name, found))
+		self.db.commit()
+
+		#ids are given in the same order as a new search
+		if added:
+			self.db.begin()
+			self.db.query("CREATE TEMP TABLE sorted_rows AS SELECT t.* FROM %s AS t JOIN seq_order AS o ON o.sequence=t.sequence ORDER BY o.first, t.start" % table)
+			self.db.query("DELETE FROM %s" % table)
+			self.db.query("INSERT INTO %s SELECT NULL,%s FROM sorted_rows ORDER BY rowid" % (table, ",".join(columns[1:])))
+			self.db.query("DROP TABLE temp.sorted_rows")
+			self.db.commit()
+
+		self.db.query("DROP TABLE temp.seq_order")
+
+	def masked_message(self, msg, mask, option):
+		'''
+		save the number of skipped soft-masked bases and append it to message
+		@para msg str, finish message
+		@para mask str, scan mode of soft-masked bases
+		@para option str, option name in database
+		@return str, finish message
+		'''
+		if mask != 'skip':
+			return msg
+
+		self.db.set_option(option, self.masked_bases)
+		return "%s, %d soft-masked bases skipped" % (msg, self.masked_bases)
+
+	def bases_progress(self, fasta_progress):
+		'''
+		progress callback of search_sequences
+		@para fasta_progress float, progress of fasta files
+		@return callable, emit progress with scanned bases of fasta
+		'''
+		return lambda bases: self.emit_progress(int(bases/self.total_bases*fasta_progress*100))
+
 	def emit_progress(self, percent):
 		self.update_progress.emit(percent)
 
@@ -121,13 +525,20 @@ class SSRWorker(Worker):
 	"""
 	perfect microsatellite search thread
 	"""
-	def __init__(self, fastas, min_repeats, standard_level):
+	def __init__(self, fastas, min_repeats, standard_level, cpus=None, memory=1024, threads=False, mask='none', native=False, regions=None):
 		super(SSRWorker, self).__init__()
 		self.fastas = fastas
 		self.min_repeats = min_repeats
-		self.motifs = motif.StandardMotif(standard_level)
+		self.standard_level = standard_level
 		self.fasta_counts = len(self.fastas)
 		self.progress = 0
+		self.cpus = cpus or multiprocessing.cpu_count()
+		self.memory = memory
+		self.threads = threads
+		self.native = native
+		self.mask = mask
+		self.regions = regions
+		self.masked_bases = 0
 
 		parameters = Data(
 			mono = min_repeats[0],
@@ -140,59 +551,123 @@ class SSRWorker(Worker):
 		)
 		self.db.set_option("ssr_parameters", json.dumps(parameters))
 
+		#the ssrs in table are reused by the search with the same scan
+		self.scan_parameters = json.dumps(Data(
+			repeats = list(min_repeats),
+			level = standard_level,
+			mask = mask,
+			fastas = [fasta_file for _, fasta_file in fastas],
+			regions = regions
+		))
+
 	def process(self):
 		self.db.set_option('ssr_start_time', int(time.time()))
+
+		last = self.reusable()
+		if last:
+			self.reuse(last)
+		else:
+			self.search()
+
+		#the whole sequence is scanned again around hits to reuse them
+		if not self.regions:
+			self.db.set_option('ssr_scan_parameters', self.scan_parameters)
+
+		self.db.set_option('ssr_end_time', int(time.time()))
+		self.emit_finish(self.masked_message('Perfect SSRs search completed', self.mask, 'ssr_masked_bases'))
+
+	def reusable(self):
+		'''
+		the perfect SSRs of last search can be selected again when min
+		repeats of all types are not less than last search
+		@return dict, parameters of last search, None if search is needed
+		'''
+		last = self.db.get_option('ssr_scan_parameters')
+		if not last or self.db.is_empty('ssr'):
+			return None
+
+		last = json.loads(last)
+		scan = json.loads(self.scan_parameters)
+		if any(last.get(k) != scan[k] for k in ('mask', 'fastas', 'regions')):
+			return None
+
+		if any(new < old for new, old in zip(scan['repeats'], last['repeats'])):
+			return None
+
+		return last
+
+	def reuse(self, last):
+		'''
+		select perfect SSRs of last search with stricter min repeats, the
+		standard motifs are changed without scanning
+		@para last dict, parameters of last search
+		'''
+		self.masked_bases = self.db.get_option('ssr_masked_bases') or 0
+
+		if list(self.min_repeats) != last['repeats']:
+			self.emit_message("Select perfect SSRs with new minimum repeats")
+			repeats = numpy.array(self.min_repeats)
+			windows = window.ssr_windows(self.min_repeats, self.mask, self.standard_level)
+			self.reselect('ssr_data', windows, lambda records: records['repeat'] >= repeats[records['type']-1],
+				lambda name, ssrs: ssr_rows(self.db, name, ssrs))
+
+		if self.standard_level != last['level']:
+			self.emit_message("Standardize perfect SSRs with new level")
+			motifs = self.db.get_all("SELECT DISTINCT s.motif, m.motif FROM ssr_data AS s JOIN motif AS m ON m.id=s.motif")
+			standards = self.db.get_motif_ids([tandem.standard(m, self.standard_level) if self.standard_level else m for _, m in motifs])
+			self.db.begin()
+			self.db.query("CREATE TEMP TABLE standard_map (motif INTEGER PRIMARY KEY, standard INTEGER)")
+			self.db.get_cursor().executemany("INSERT INTO standard_map VALUES (?,?)", [(row[0], i) for row, i in zip(motifs, standards)])
+			self.db.query("UPDATE ssr_data SET standard=(SELECT standard FROM standard_map WHERE motif=ssr_data.motif)")
+			self.db.query("DROP TABLE temp.standard_map")
+			self.db.commit()
+
+	def search(self):
+		#ssrs of an unfinished search are not used
+		self.db.query("DELETE FROM option WHERE name='ssr_scan_parameters'")
+		self.db.clear('ssr')
+		self.open_checkpoint('ssr', self.db.get_option('ssr_parameters'), ['ssr_data'])
 		current_fastas = 0
 		for fasta_id, fasta_file in self.fastas:
 			current_fastas += 1
 			fasta_progress = current_fastas/self.fasta_counts
 			
 			#use fasta and create fasta file index
-			seqs = self.build_fasta_index(fasta_id, fasta_file)
+			seqs = self.target_sequences(self.build_fasta_index(fasta_id, fasta_file), fasta_file)
 			#total_bases = seqs.get_total_length()
 
 			#insert ssr to database
-			sql = "INSERT INTO ssr VALUES (?,?,?,?,?,?,?,?,?)"
-
-			current_bases = 0
-			#start search perfect microsatellites
-			with multiprocessing.Pool() as pool:
-				for name, seq in seqs:
-				#for s in seqs:
-				#	name, seq = s.name, s.seq
+			sql = "INSERT INTO ssr_data VALUES (?,?,?,?,?,?,?,?,?)"
 
-					current_bases += len(seq)
-
-					seq_progress = current_bases/self.total_bases
+			current_name = None
 
+			#start search perfect microsatellites
+			windows = window.ssr_windows(self.min_repeats, self.mask, self.standard_level)
+			seqs = self.count_masked(self.unfinished(seqs, fasta_file), self.mask)
+			results = self.search_sequences(seqs, windows, self.cpus, self.memory, self.threads, self.bases_progress(fasta_progress), self.native)
+			for name, size, ssrs, scanned in results:
+				if name != current_name:
 					self.emit_message("Searching for perfect SSRs from %s" % name)
-					#ssrs = tandem.search_ssr(seq, self.min_repeats)
+					current_name = name
 
-					res = pool.apply_async(tandem.search_ssr, (seq, self.min_repeats))
-					ssrs = res.get()
+				self.db.insert(sql, ssr_rows(self.db, *self.locate(name, ssrs)))
 
-					def values():
-						for ssr in ssrs:
-							row = [None, name, self.motifs.standard(ssr[0])]
-							row.extend(ssr)
-							yield row
+				if scanned == size:
+					self.finish_sequences(fasta_file, [name])
 
-					self.db.insert(sql, values())
-
-					self.emit_progress(int(seq_progress*fasta_progress*100))
-
-		self.db.set_option('ssr_end_time', int(time.time()))
-		self.emit_finish('Perfect SSRs search completed')
+		self.checkpoint.close()
 
 
 class ISSRWorker(Worker):
 	'''
-	perfect microsatellite search thread
+	perfect microsatellite search thread, the extended seeds are kept, so
+	that the search with only penalties, min score or standard level changed
+	selects imperfect SSRs again from the seeds without rescanning
 	'''
-	def __init__(self, fastas, seed_repeat, seed_length, max_edits, mis_penalty, gap_penalty, score, standard_level):
+	def __init__(self, fastas, seed_repeat, seed_length, max_edits, mis_penalty, gap_penalty, score, standard_level, cpus=None, memory=1024, threads=False, mask='none', native=False, regions=None):
 		super(ISSRWorker, self).__init__()
 		self.fastas = fastas
-		self.motifs = motif.StandardMotif(standard_level)
+		self.standard_level = standard_level
 		self.fasta_counts = len(self.fastas)
 		self.seed_repeat = seed_repeat
 		self.seed_length = seed_length
@@ -200,6 +675,13 @@ class ISSRWorker(Worker):
 		self.mis_penalty = mis_penalty
 		self.gap_penalty = gap_penalty
 		self.score = score
+		self.cpus = cpus or multiprocessing.cpu_count()
+		self.memory = memory
+		self.threads = threads
+		self.native = native
+		self.mask = mask
+		self.regions = regions
+		self.masked_bases = 0
 
 		parameters = Data(
 			seed_repeat = seed_repeat,
@@ -208,43 +690,98 @@ class ISSRWorker(Worker):
 			mis_penalty = mis_penalty,
 			gap_penalty = gap_penalty,
 			min_score = score,
-			level = standard_level
+			level = standard_level,
+			mask = mask
 		)
 		self.db.set_option('issr_parameters', json.dumps(parameters))
 
+		#the extended seeds only depend on these parameters
+		self.seed_parameters = json.dumps(Data(
+			seed_repeat = seed_repeat,
+			seed_length = seed_length,
+			max_edits = max_edits,
+			mask = mask,
+			fastas = [fasta_file for _, fasta_file in fastas],
+			regions = regions
+		))
+
 	def process(self):
 		self.db.set_option('issr_start_time', int(time.time()))
+
+		if self.db.get_option('issr_seed_parameters') == self.seed_parameters and not self.db.is_empty('issr_seed'):
+			self.rescore()
+		else:
+			self.search()
+
+		self.db.set_option("issr_end_time", int(time.time()))
+		self.emit_finish(self.masked_message('Imperfect SSRs search completed', self.mask, 'issr_masked_bases'))
+
+	def search(self):
+		#seeds of an unfinished search are not used
+		self.db.query("DELETE FROM option WHERE name='issr_seed_parameters'")
+		self.db.clear('issr_seed')
+		self.open_checkpoint('issr', self.db.get_option('issr_parameters'), ['issr_data', 'issr_seed'])
+
 		current_fastas = 0
 		for fasta_id, fasta_file in self.fastas:
 			current_fastas += 1
 			fasta_progress = current_fastas/self.fasta_counts
 			
 			#use fasta and create fasta file index
-			seqs = self.build_fasta_index(fasta_id, fasta_file)
+			seqs = self.target_sequences(self.build_fasta_index(fasta_id, fasta_file), fasta_file)
 			#total_bases = seqs.get_total_length()
 			#insert ssr to database
-			sql = "INSERT INTO issr VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)"
-
-			current_bases = 0
-			#start search perfect microsatellites
-			for name, seq in seqs:
-				current_bases += len(seq)
-				seq_progress = current_bases/self.total_bases
+			sql = "INSERT INTO issr_data VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)"
+			seed_sql = "INSERT INTO issr_seed VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)"
+
+			current_name = None
+			#start search perfect microsatellites, the alignments are kept
+			#for viewing details and the extended seeds for rescoring
+			windows = window.issr_windows(self.seed_repeat, self.seed_length, self.max_edits, self.mis_penalty, self.gap_penalty, self.score, 500, self.mask, self.standard_level, True, True)
+			seqs = self.count_masked(self.unfinished(seqs, fasta_file), self.mask)
+			results = self.search_sequences(seqs, windows, self.cpus, self.memory, self.threads, self.bases_progress(fasta_progress), self.native)
+			for name, size, issrs, scanned in results:
+				if name != current_name:
+					self.emit_message("Search imperfect SSRs from %s" % name)
+					current_name = name
+
+				seqname, issrs = self.locate(name, issrs)
+				self.db.insert(sql, issr_rows(self.db, seqname, issrs))
+				self.db.insert(seed_sql, seed_rows(self.db, seqname, issrs))
+
+				if scanned == size:
+					self.finish_sequences(fasta_file, [name])
+
+		self.checkpoint.close()
+
+		#the whole sequence is scanned again around seeds to rescore them
+		if not self.regions:
+			self.db.set_option('issr_seed_parameters', self.seed_parameters)
+
+	def rescore(self):
+		self.masked_bases = self.db.get_option('issr_masked_bases') or 0
+		motifs = {row[0]: row[1] for row in self.db.get_all("SELECT id, motif FROM motif")}
+		total = self.db.get_one("SELECT COUNT(1) FROM issr_seed LIMIT 1")
+		sql = "INSERT INTO issr_data VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)"
+		windows = window.issr_windows(self.seed_repeat, self.seed_length, self.max_edits, self.mis_penalty, self.gap_penalty, self.score, 500, self.mask, self.standard_level, True)
+
+		#the sequence is only read when some regions are scanned again
+		get_sequence = self.sequence_reader()
+
+		rows = self.db.query("SELECT sequence,motif,type,position,seed,start,end,match,subsitution,insertion,deletion,hit,cigar FROM issr_seed ORDER BY id")
+		current = 0
+		for name, group in itertools.groupby(rows, key=lambda row: row[0]):
+			self.emit_message("Rescore imperfect SSRs from %s" % name)
+			group = [tuple(row) for row in group]
+			seeds = numpy.array([row[1:12] for row in group], dtype=hits.SEED_DTYPE)
+			ids, seeds['motif'] = numpy.unique(seeds['motif'], return_inverse=True)
+			issrs = rescore.rescore(functools.partial(get_sequence, name), seeds, [motifs[i] for i in ids.tolist()],
+				windows, [row[12] for row in group])
 
-				self.emit_message("Search imperfect SSRs from %s" % name)
+			self.db.insert(sql, issr_rows(self.db, name, issrs))
 
-				issrs = tandem.search_issr(seq, self.seed_repeat, self.seed_length, self.max_edits, self.mis_penalty, self.gap_penalty, self.score, 500)
-				
-				def values():
-					for issr in issrs:
-						row = [None, name, self.motifs.standard(issr[0])]
-						row.extend(issr)
-						yield row
-
-				self.db.insert(sql, values())
-				self.emit_progress(int(seq_progress*fasta_progress*100))
-		self.db.set_option("issr_end_time", int(time.time()))
-		self.emit_finish('Imperfect SSRs search completed')
+			current += len(group)
+			self.emit_progress(int(current/total*100))
 
 
 class CSSRWorker(Worker):
@@ -257,96 +794,348 @@ class CSSRWorker(Worker):
 
 	def process(self):
 		self.db.set_option('cssr_start_time', int(time.time()))
-		ssrs = self.db.query("SELECT * FROM ssr")
-		total = self.db.get_one("SELECT COUNT(1) FROM ssr LIMIT 1")
 		self.emit_message("Concatenate compound SSRs...")
-		cssrs = [next(ssrs)]
-		prev_progress = 0
-		#self.db.begin()
-		for ssr in ssrs:
-			d = ssr.start - cssrs[-1].end - 1
-			if ssr.sequence == cssrs[-1].sequence and d <= self.dmax:
-				cssrs.append(ssr)
-			else:
-				if len(cssrs) > 1:
-					self.concatenate(cssrs)
-					progress = int(cssrs[-1].id/total*100)
-					if progress > prev_progress:
-						self.emit_progress(progress)
-						prev_progress = progress
-				cssrs = [ssr]
 
-		if len(cssrs) > 1:
-			self.concatenate(cssrs)
+		#pairs of adjacent ssrs are found by a join on the next ssr, so
+		#that only the ssrs in compound ssrs are read, a pair continues
+		#the compound ssr ending with its first ssr
+		if self.db.get_one("SELECT MAX(id)-MIN(id)+1=COUNT(1) FROM ssr_data"):
+			next_id = "a.id+1"
+		else:
+			next_id = "(SELECT MIN(id) FROM ssr_data WHERE id>a.id)"
 
-		#self.db.commit()
+		links = self.db.get_cursor().execute(CSSR_LINKS_SQL.format(next_id=next_id), (self.dmax,))
+		self.emit_progress(50)
+
+		cssrs = []
+		members = []
+		for link in links:
+			if not members or members[-1][0] != link[0]:
+				if members:
+					cssrs.append(compound_row(name, members))
+				name = link[1]
+				members = [(link[0],) + tuple(link[2:7])]
+			members.append(tuple(link[7:]))
+
+		if members:
+			cssrs.append(compound_row(name, members))
+
+		self.db.insert(self.sql, cssrs)
 		self.db.set_option('cssr_end_time', int(time.time()))
 		self.emit_finish("Compound SSRs search completed")
 
-	def concatenate(self, cssrs):
-		seqname = cssrs[-1].sequence
-		start = cssrs[0].start
-		end = cssrs[-1].end
-		complexity = len(cssrs)
-		component = "%s-%s" % (cssrs[0].id, cssrs[-1].id)
-		motif = "-".join([cssr.motif for cssr in cssrs])
-		length = sum(cssr.length for cssr in cssrs)
-		gap = sum(cssr.start-cssrs[idx].end-1 for idx, cssr in enumerate(cssrs[1:]))
-		structure = "-".join(["(%s)%s" % (cssr.motif, cssr.repeat) for cssr in cssrs])
-		self.db.get_cursor().execute(self.sql,
-			(None, seqname, start, end, motif, complexity, length, gap, component, structure)
-		)
-
 
 class VNTRWorker(Worker):
-	def __init__(self, fastas, min_motif, max_motif, repeats):
+	def __init__(self, fastas, min_motif, max_motif, repeats, cpus=None, memory=1024, threads=False, mask='none', compact=True, native=False, regions=None):
 		super(VNTRWorker, self).__init__()
 		self.fastas = fastas
 		self.min_motif = min_motif
 		self.max_motif = max_motif
 		self.repeats = repeats
+		self.compact = compact
 		self.fasta_counts = len(self.fastas)
+		self.cpus = cpus or multiprocessing.cpu_count()
+		self.memory = memory
+		self.threads = threads
+		self.native = native
+		self.mask = mask
+		self.regions = regions
+		self.masked_bases = 0
 
 		parameters = Data(
 			min_motif = min_motif,
 			max_motif = max_motif,
-			min_repeat = repeats
+			min_repeat = repeats,
+			compact = compact
 		)
 
 		self.db.set_option('vntr_parameters', json.dumps(parameters))
 
+		#the vntrs in table are reused by the search with the same scan
+		self.scan_parameters = json.dumps(Data(
+			min_motif = min_motif,
+			max_motif = max_motif,
+			min_repeat = repeats,
+			compact = compact,
+			mask = mask,
+			fastas = [fasta_file for _, fasta_file in fastas],
+			regions = regions
+		))
+
 	def process(self):
 		self.db.set_option('vntr_start_time', int(time.time()))
+
+		last = self.reusable()
+		if last:
+			self.reuse(last)
+		else:
+			self.search()
+
+		#the whole sequence is scanned again around hits to reuse them
+		if not self.regions:
+			self.db.set_option('vntr_scan_parameters', self.scan_parameters)
+
+		self.db.set_option('vntr_end_time', int(time.time()))	
+		self.emit_finish(self.masked_message('VNTRs search completed', self.mask, 'vntr_masked_bases'))
+
+	def reusable(self):
+		'''
+		the VNTRs of last search can be selected again when only min repeat
+		is not less than last search, runs of motifs longer than hexa and
+		shorter than min motif are skipped by min repeat, so min motif must
+		not be more than 7
+		@return dict, parameters of last search, None if search is needed
+		'''
+		last = self.db.get_option('vntr_scan_parameters')
+		if not last or self.db.is_empty('vntr') or self.min_motif > 7:
+			return None
+
+		last = json.loads(last)
+		scan = json.loads(self.scan_parameters)
+		if any(last.get(k) != scan[k] for k in scan if k != 'min_repeat'):
+			return None
+
+		if scan['min_repeat'] < last['min_repeat']:
+			return None
+
+		return last
+
+	def reuse(self, last):
+		'''
+		select VNTRs of last search with stricter min repeat
+		@para last dict, parameters of last search
+		'''
+		self.masked_bases = self.db.get_option('vntr_masked_bases') or 0
+
+		if self.repeats != last['min_repeat']:
+			self.emit_message("Select VNTRs with new minimum repeat")
+			windows = window.vntr_windows(self.min_motif, self.max_motif, self.repeats, self.mask, compact=self.compact)
+			self.reselect('vntr', windows, lambda records: records['repeat'] >= self.repeats, vntr_rows)
+
+	def search(self):
+		#vntrs of an unfinished search are not used
+		self.db.query("DELETE FROM option WHERE name='vntr_scan_parameters'")
+		self.db.clear('vntr')
+		self.open_checkpoint('vntr', self.db.get_option('vntr_parameters'), ['vntr'])
 		current_fastas = 0
 		for fasta_id, fasta_file in self.fastas:
 			current_fastas += 1
 			fasta_progress = current_fastas/self.fasta_counts
 			
 			#use fasta and create fasta file index
-			seqs = self.build_fasta_index(fasta_id, fasta_file)
+			seqs = self.target_sequences(self.build_fasta_index(fasta_id, fasta_file), fasta_file)
 			#total_bases = seqs.get_total_length()
 			#insert ssr to database
-			sql = "INSERT INTO vntr VALUES (?,?,?,?,?,?,?,?)"
+			sql = "INSERT INTO vntr VALUES (?,?,?,?,?,?,?,?,?)"
 
-			current_bases = 0
 			#start search perfect microsatellites
-			for name, seq in seqs:
-				current_bases += len(seq)
-				seq_progress = current_bases/self.total_bases
+			windows = window.vntr_windows(self.min_motif, self.max_motif, self.repeats, self.mask, compact=self.compact)
+			current_name = None
+			seqs = self.count_masked(self.unfinished(seqs, fasta_file), self.mask)
+			results = self.search_sequences(seqs, windows, self.cpus, self.memory, self.threads, self.bases_progress(fasta_progress), self.native)
+			for name, size, vntrs, scanned in results:
+				if name != current_name:
+					self.emit_message("Search VNTRs from %s" % name)
+					current_name = name
 
-				self.emit_message("Search VNTRs from %s" % name)
-				vntrs = tandem.search_vntr(seq, self.min_motif, self.max_motif, self.repeats)
-				
-				def values():
-					for vntr in vntrs:
-						row = [None, name]
-						row.extend(vntr)
-						yield row
-
-				self.db.insert(sql, values())
-				self.emit_progress(int(seq_progress*fasta_progress*100))
-		self.db.set_option('vntr_end_time', int(time.time()))	
-		self.emit_finish('VNTRs search completed')
+				self.db.insert(sql, vntr_rows(*self.locate(name, vntrs)))
+
+				if scanned == size:
+					self.finish_sequences(fasta_file, [name])
+
+		self.checkpoint.close()
+
+class AnalysisWorker(Worker):
+	'''
+	combined search thread, each sequence is read once and scanned in
+	memory by all enabled detectors, compound SSRs are concatenated from
+	the perfect SSRs of each sequence, and the results of a group of
+	sequences are inserted in one transaction
+	@para ssr tuple, (min_repeats, standard_level), None to skip
+	@para dmax int, max distance of compound SSRs, None to skip, only used
+		with perfect SSRs
+	@para issr tuple, (seed_repeat, seed_length, max_edits, mis_penalty,
+		gap_penalty, score, standard_level), None to skip
+	@para vntr tuple, (min_motif, max_motif, repeats, compact), None to skip
+	@para regions tuple, (region_file, features) of target regions given to
+		region.read_regions, None to search whole sequences
+	'''
+	def __init__(self, fastas, ssr=None, dmax=None, issr=None, vntr=None, cpus=None, memory=1024, mask='none', regions=None):
+		super(AnalysisWorker, self).__init__()
+		self.fastas = fastas
+		self.fasta_counts = len(self.fastas)
+		self.ssr = ssr
+		self.dmax = dmax if ssr else None
+		self.issr = issr
+		self.vntr = vntr
+		self.cpus = cpus or multiprocessing.cpu_count()
+		self.memory = memory
+		self.mask = mask
+		self.regions = regions
+		self.masked_bases = 0
+
+		#the same options as the search of each type
+		self.kinds = []
+		if ssr:
+			min_repeats, level = ssr
+			self.kinds.append('ssr')
+			self.db.set_option('ssr_parameters', json.dumps(Data(
+				mono = min_repeats[0],
+				di = min_repeats[1],
+				tri = min_repeats[2],
+				tetra = min_repeats[3],
+				penta = min_repeats[4],
+				hexa = min_repeats[5],
+				level = level
+			)))
+			self.ssr_scan_parameters = json.dumps(Data(
+				repeats = list(min_repeats),
+				level = level,
+				mask = mask,
+				fastas = [fasta_file for _, fasta_file in fastas],
+				regions = regions
+			))
+
+		if self.dmax is not None:
+			self.kinds.append('cssr')
+			self.db.set_option('cssr_parameters', json.dumps(Data(dmax = dmax)))
+
+		if issr:
+			seed_repeat, seed_length, max_edits, mis_penalty, gap_penalty, score, level = issr
+			self.kinds.append('issr')
+			self.db.set_option('issr_parameters', json.dumps(Data(
+				seed_repeat = seed_repeat,
+				seed_length = seed_length,
+				max_edits = max_edits,
+				mis_penalty = mis_penalty,
+				gap_penalty = gap_penalty,
+				min_score = score,
+				level = level,
+				mask = mask
+			)))
+			self.seed_parameters = json.dumps(Data(
+				seed_repeat = seed_repeat,
+				seed_length = seed_length,
+				max_edits = max_edits,
+				mask = mask,
+				fastas = [fasta_file for _, fasta_file in fastas],
+				regions = regions
+			))
+
+		if vntr:
+			min_motif, max_motif, repeats, compact = vntr
+			self.kinds.append('vntr')
+			self.db.set_option('vntr_parameters', json.dumps(Data(
+				min_motif = min_motif,
+				max_motif = max_motif,
+				min_repeat = repeats,
+				compact = compact
+			)))
+			self.vntr_scan_parameters = json.dumps(Data(
+				min_motif = min_motif,
+				max_motif = max_motif,
+				min_repeat = repeats,
+				compact = compact,
+				mask = mask,
+				fastas = [fasta_file for _, fasta_file in fastas],
+				regions = regions
+			))
+
+	def detectors(self):
+		'''
+		@return list, (type, Windows) of enabled detectors
+		'''
+		detectors = []
+		if self.ssr:
+			detectors.append(('ssr', window.ssr_windows(self.ssr[0], self.mask, self.ssr[1])))
+
+		if self.issr:
+			#alignments are kept for viewing details and seeds for rescoring
+			detectors.append(('issr', window.issr_windows(*self.issr[:6], 500, self.mask, self.issr[6], True, True)))
+
+		if self.vntr:
+			min_motif, max_motif, repeats, compact = self.vntr
+			detectors.append(('vntr', window.vntr_windows(min_motif, max_motif, repeats, self.mask, compact=compact)))
+
+		return detectors
+
+	def save(self, kind, name, hits):
+		cursor = self.db.get_cursor()
+		if kind == 'ssr':
+			#ssr ids are assigned here to be the components of cssrs
+			first = (self.db.get_one("SELECT MAX(id) FROM ssr_data") or 0) + 1
+			cursor.executemany("INSERT INTO ssr_data VALUES (?,?,?,?,?,?,?,?,?)", ssr_rows(self.db, name, hits, first))
+
+			if self.dmax is not None:
+				cursor.executemany("INSERT INTO cssr VALUES (?,?,?,?,?,?,?,?,?,?)", cssr_rows(name, hits, first, self.dmax))
+
+		elif kind == 'issr':
+			cursor.executemany("INSERT INTO issr_data VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)", issr_rows(self.db, name, hits))
+			cursor.executemany("INSERT INTO issr_seed VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)", seed_rows(self.db, name, hits))
+
+		elif kind == 'vntr':
+			cursor.executemany("INSERT INTO vntr VALUES (?,?,?,?,?,?,?,?,?)", vntr_rows(name, hits))
+
+	def process(self):
+		for kind in self.kinds:
+			self.db.set_option('%s_start_time' % kind, int(time.time()))
+
+		#seeds and hits of an unfinished search are not used
+		if self.issr:
+			self.db.query("DELETE FROM option WHERE name='issr_seed_parameters'")
+			self.db.clear('issr_seed')
+
+		if self.ssr:
+			self.db.query("DELETE FROM option WHERE name='ssr_scan_parameters'")
+
+		if self.vntr:
+			self.db.query("DELETE FROM option WHERE name='vntr_scan_parameters'")
+
+		#the checkpoint is shared by all detectors
+		tables = {'ssr': ['ssr_data'], 'cssr': ['cssr'], 'issr': ['issr_data', 'issr_seed'], 'vntr': ['vntr']}
+		self.open_checkpoint('analysis', json.dumps([self.db.get_option('%s_parameters' % kind) for kind in self.kinds]),
+			[table for kind in self.kinds for table in tables[kind]])
+
+		kinds, detectors = zip(*self.detectors())
+		current_fastas = 0
+		for fasta_id, fasta_file in self.fastas:
+			current_fastas += 1
+			fasta_progress = current_fastas/self.fasta_counts
+
+			#use fasta and create fasta file index
+			seqs = self.target_sequences(self.build_fasta_index(fasta_id, fasta_file), fasta_file)
+			seqs = self.count_masked(self.unfinished(seqs, fasta_file), self.mask)
+			groups = self.search_groups(seqs, detectors, self.cpus, self.memory, self.bases_progress(fasta_progress))
+			for group, results in groups:
+				self.emit_message("Saving tandem repeats from %d sequences" % len(group))
+				self.db.begin()
+				for k, (name, _) in enumerate(group):
+					for kind, hits in zip(kinds, results):
+						self.save(kind, *self.locate(name, hits[k]))
+				self.db.commit()
+				self.finish_sequences(fasta_file, [name for name, _ in group])
+
+		self.checkpoint.close()
+
+		#the whole sequence is scanned again to reuse hits or seeds
+		if self.issr and not self.regions:
+			self.db.set_option('issr_seed_parameters', self.seed_parameters)
+
+		if self.ssr and not self.regions:
+			self.db.set_option('ssr_scan_parameters', self.ssr_scan_parameters)
+
+		if self.vntr and not self.regions:
+			self.db.set_option('vntr_scan_parameters', self.vntr_scan_parameters)
+
+		for kind in self.kinds:
+			self.db.set_option('%s_end_time' % kind, int(time.time()))
+
+		#all detectors skip the same soft-masked bases
+		if self.mask == 'skip':
+			for kind in kinds[1:]:
+				self.db.set_option('%s_masked_bases' % kind, self.masked_bases)
+
+		self.emit_finish(self.masked_message('Tandem repeats search completed', self.mask, '%s_masked_bases' % kinds[0]))
 
 class StatisWorker(Worker):
 	def __init__(self, unit='Mb', letter='ATGC', dpi=300):